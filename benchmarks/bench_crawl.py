@@ -0,0 +1,184 @@
+"""End-to-end crawl throughput, tail latency and recovery against the mock.
+
+Runs the full crawl of `uss.py` against the local stub server (see
+`mock_wiki.py`): `sswiki.scrapeForGroupListsURLs()` on the list of lists
+page, `sswiki.getVesselLinks()` on the group list pages, and
+`sswiki.getVesselData()` on the vessel articles, then
+`sswiki.retryErrors()` on the errors. Latency, server errors, HTTP 429s and
+slow responses are injected into the vessel article requests as per the
+`--latency`, `--error-rate`, `--throttle-rate` and `--drip-rate` arguments.
+Reports pages per second, vessel fetch latency percentiles, errors of the
+first pass, and vessels recovered on retry. The scale is the number of
+scrape threads. With `--hedge-percent`, each crawl is run again with hedged
+vessel requests (see `fetch.Hedger`), and the latency percentiles are
+reported before hedging i.e. of the first requests, and after i.e. of the
+first answers.
+
+Usage, from the repository root:
+    python benchmarks/bench_crawl.py --pages 200 --scrape-workers 1 4 8 \
+        --latency lognormal --latency-ms 20 --error-rate 0.05 \
+        --throttle-rate 0.02 --drip-rate 0.01
+    python benchmarks/bench_crawl.py --pages 200 --scrape-workers 8 \
+        --latency lognormal --latency-ms 20 --sigma 1.5 --hedge-percent 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import harness
+from mock_wiki import LISTS_OF_LISTS, MockWiki, addFaultArguments, \
+    faultsFromArgs
+
+import sswiki.constants as const
+import sswiki.errorlog as errorlog
+import sswiki.fetch as fetch
+import sswiki.metrics as metrics
+import sswiki.sswiki as sswiki
+
+ARTICLE_PATTERN = "wiki/USS_"
+FN_ERRORS = 'errors.csv'
+
+
+def vessels(gc):
+    """Number of vessels in a general characteristics data frame"""
+    return gc['vessel_url'].nunique() if 'vessel_url' in gc else 0
+
+
+def percentiles(result, name, prefix=''):
+    """Add the vessel latency percentiles of a histogram to a result"""
+    latencies = metrics.METRICS.samples(name, stage='vessel')
+    for q in (50, 95, 99, 100):
+        ms = metrics.percentile(latencies, q)
+        result[f"{prefix}p{q}_ms"] = None if ms is None else round(ms * 1000,
+                                                                   1)
+
+
+def crawl(mock, workers, args, hedge=False):
+    """Benchmark result of a crawl of the mock with `workers` threads,
+    hedging the vessel requests if `hedge`"""
+    metrics.METRICS.reset()
+    fetch.HEDGER = fetch.Hedger(max_fraction=args.hedge_percent / 100,
+                                workers=2 * workers) if hedge else None
+    fetch.CONTROLLER = fetch.RateController(rate=args.rate,
+                                            max_rate=args.max_rate,
+                                            concurrency=workers,
+                                            max_concurrency=workers)
+    mock.faults = faultsFromArgs(args, args.seed)
+    mock.requests.clear()
+    scraped = {}
+
+    def run():
+        group_lists = sswiki.scrapeForGroupListsURLs(
+            mock.articleURL(LISTS_OF_LISTS))
+        vls = sswiki.getVesselLinks(group_lists, ARTICLE_PATTERN,
+                                    args.links_mode)
+        scraped['gc'], _ = sswiki.getVesselData(vls, error_csv=FN_ERRORS,
+                                                workers=workers,
+                                                mode=args.fetch_mode)
+        scraped['crawl_seconds'] = time.perf_counter() - start
+        scraped['errors'] = len(errorlog.ErrorLog.read(FN_ERRORS))
+        scraped['recovered'], _ = sswiki.retryErrors(
+            FN_ERRORS, retries=args.retries, backoff=args.backoff,
+            workers=workers, mode=args.fetch_mode)
+
+    start = time.perf_counter()
+    name = f"crawl {args.fetch_mode}" + (" hedged" if hedge else "")
+    result = harness.timeOnly(name, run, 0, workers)
+
+    pages = sum(mock.requests.values())
+    report = metrics.report()
+    result['rows'] = pages
+    result['rows_per_sec'] = round(pages / result['seconds'], 1)
+    result['crawl_seconds'] = round(scraped['crawl_seconds'], 6)
+    percentiles(result, 'fetch_seconds')
+    if hedge:
+        percentiles(result, 'fetch_effective_seconds', 'hedged_')
+    result['vessels'] = vessels(scraped['gc']) + vessels(scraped['recovered'])
+    result['errors'] = scraped['errors']
+    result['recovered'] = vessels(scraped['recovered'])
+    result['remaining'] = len(errorlog.ErrorLog.read(FN_ERRORS))
+    result['throttled'] = sum(c['value'] for c in report['counters']
+                              if c['name'] == 'fetch_throttled_total')
+    result['hedges'] = sum(c['value'] for c in report['counters']
+                           if c['name'] == 'fetch_hedges_total')
+    result['injected'] = dict(mock.faults.injected)
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200,
+                        help="synthetic vessel pages; default 200")
+    parser.add_argument('--filler', type=int, default=50,
+                        help="paragraphs of article text per page; default 50")
+    parser.add_argument('--scrape-workers', type=int, nargs='+',
+                        default=[1, 4, 8],
+                        help="scrape threads of each crawl; default 1 4 8")
+    parser.add_argument('--fetch-mode', choices=['page', 'lead', 'wikitext'],
+                        default='page')
+    parser.add_argument('--links-mode', choices=['page', 'api'],
+                        default='page')
+    parser.add_argument('--rate', type=float, default=50.0,
+                        help="initial requests per second of the rate "
+                        + "controller; default 50")
+    parser.add_argument('--max-rate', type=float, default=1000.0,
+                        help="maximum requests per second of the rate "
+                        + "controller; default 1000")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="tries of each error url; default 3")
+    parser.add_argument('--backoff', type=float, default=0.5,
+                        help="seconds before the second try; default 0.5")
+    parser.add_argument('--deadline', type=float,
+                        help="seconds to get the whole of each response in; "
+                        + f"default {const.FETCH_DEADLINE}")
+    parser.add_argument('--hedge-percent', type=float,
+                        help="also crawl with hedged vessel requests, for at "
+                        + "most this percent of requests")
+    parser.add_argument('--seed', type=int, default=0)
+    addFaultArguments(parser)
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            MockWiki.fromSynthetic(args.pages, args.seed,
+                                   args.filler) as mock:
+        const.DATA_DIR = tmp_dir + os.sep
+        if args.deadline:
+            const.FETCH_DEADLINE = args.deadline
+        for workers in args.scrape_workers:
+            results.append(crawl(mock, workers, args))
+            if args.hedge_percent:
+                results.append(crawl(mock, workers, args, hedge=True))
+        fetch.HEDGER = None
+
+    print(f"{'benchmark':<20}{'workers':>8}{'pages/s':>9}{'p50 ms':>8}"
+          + f"{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}{'vessels':>9}"
+          + f"{'errors':>8}{'recovered':>10}{'remaining':>10}")
+    for r in results:
+        print(f"{r['name']:<20}{r['scale']:>8}{r['rows_per_sec']:>9,.1f}"
+              + "".join(f"{r[k] or 0:>8,.1f}"
+                        for k in ('p50_ms', 'p95_ms', 'p99_ms', 'p100_ms'))
+              + f"{r['vessels']:>9,}{r['errors']:>8,}{r['recovered']:>10,}"
+              + f"{r['remaining']:>10,}")
+    print()
+
+    hedged = [r for r in results if 'hedged_p50_ms' in r]
+    if hedged:
+        print(f"{'benchmark':<20}{'workers':>8}{'hedges':>8}"
+              + "".join(f"{f'{w} p{q} ms':>15}" for q in (50, 95, 99)
+                        for w in ('before', 'after')))
+        for r in hedged:
+            print(f"{r['name']:<20}{r['scale']:>8}{r['hedges']:>8,}"
+                  + "".join(f"{r[f'{w}p{q}_ms'] or 0:>15,.1f}"
+                            for q in (50, 95, 99) for w in ('', 'hedged_')))
+        print()
+
+    return harness.runSuite('crawl', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Throughput of reading vessel data from 'pages-articles' XML dumps.
+
+Writes a synthetic multistream dump (see `synthetic.writeDump()`) of vessel
+articles, redirects and other pages, reads it with `dump.ingestDump()` with
+the index and worker processes, without the index, and as a single bz2
+stream, checks all find the same vessels, and reports pages per hour. The
+scale is the number of vessel articles; there are `--others` other pages
+for each.
+
+Usage, from the repository root:
+    python benchmarks/bench_dump.py --vessels 500 2000 --others 30
+"""
+import argparse
+import bz2
+from pathlib import Path
+import sys
+import tempfile
+
+import harness
+import synthetic
+
+import sswiki.dump as dump
+import sswiki.metrics as metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vessels', type=int, nargs='+', default=[500],
+                        help="vessel articles in the dump; default 500")
+    parser.add_argument('--others', type=int, default=30,
+                        help="other pages for each vessel article; "
+                        + "default 30")
+    parser.add_argument('--filler', type=int, default=5,
+                        help="paragraphs of article text per page; default 5")
+    parser.add_argument('--dump-workers', type=int, default=4,
+                        help="worker processes; default 4")
+    parser.add_argument('--seed', type=int, default=0)
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.vessels:
+            pages = synthetic.syntheticDumpPages(n, args.seed, args.filler,
+                                                 args.others)
+            dump_path = str(Path(tmp) / f"dump-{n}.xml.bz2")
+            index_path = str(Path(tmp) / f"dump-{n}-index.txt.bz2")
+            synthetic.writeDump(pages, dump_path, index_path)
+
+            single_path = str(Path(tmp) / f"single-{n}.xml.bz2")
+            with bz2.open(dump_path) as f, open(single_path, 'wb') as out:
+                out.write(bz2.compress(f.read()))
+
+            runs = [('dump index', dump_path, index_path, args.dump_workers),
+                    ('dump scan', dump_path, None, args.dump_workers),
+                    ('dump single', single_path, None, 1)]
+            found = {}
+            for name, path, index, workers in runs:
+                metrics.METRICS.reset()
+                result = harness.timeOnly(
+                    name,
+                    lambda: found.__setitem__(name, dump.ingestDump(
+                        path, index, workers=workers)[0]),
+                    len(pages), n)
+                result['vessels'] = len(found[name])
+                result['pages_per_hour'] = round(
+                    result['rows'] * 3600 / result['seconds'])
+                results.append(result)
+
+            urls = [sorted(gc['vessel_url']) for gc in found.values()]
+            assert all(u == urls[0] for u in urls), \
+                "dump reads found different vessels"
+            assert len(urls[0]) == n, "dump reads missed vessels"
+
+    print(f"{'benchmark':<14}{'vessels':>9}{'pages':>9}{'seconds':>10}"
+          + f"{'pages/hour':>14}")
+    for r in results:
+        print(f"{r['name']:<14}{r['vessels']:>9,}{r['rows']:>9,}"
+              + f"{r['seconds']:>10,.2f}{r['pages_per_hour']:>14,}")
+    print()
+
+    return harness.runSuite('dump', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Bytes transferred and parse time of the vessel article fetch modes.
+
+Scrapes synthetic vessel pages from the local stub server (see
+`mock_wiki.py`) with `sswiki.scrapeVesselData()` in 'page' mode (the full
+rendered article), 'lead' mode (the lead section from the parse API) and
+'wikitext' mode (the wikitext of the lead section), checks all give the same
+infobox data, and reports bytes on the wire and infobox parse milliseconds
+per vessel. The scale is the number of
+paragraphs of article text per page.
+
+Also finds the vessel links in the synthetic group list pages with
+`sswiki.getVesselLinks()` in 'page' mode (the list article html) and 'api'
+mode (the links API), checks both find the same links, and reports requests
+and bytes on the wire per list.
+
+Also scrapes a mix of vessel pages, redirects to them, and disambiguation
+and museum pages with `sswiki.getVesselData()`, with and without
+`prefilter.prefilterVesselLinks()`, and reports requests, bytes on the wire
+and vessels scraped, counting a redirect and its target as one vessel; fails
+if the prefilter drops a vessel scraped without it.
+
+Usage, from the repository root:
+    python benchmarks/bench_fetch.py --pages 50 --filler 50 150 400
+"""
+import argparse
+import sys
+from urllib.parse import unquote, urlsplit
+
+import harness
+from mock_wiki import LISTS_OF_LISTS, MockWiki, titleKey
+
+import pandas as pd
+
+import sswiki.fetch as fetch
+import sswiki.metrics as metrics
+import sswiki.prefilter as prefilter
+import sswiki.sswiki as sswiki
+
+MODES = ('page', 'lead', 'wikitext')
+LINK_MODES = ('page', 'api')
+ARTICLE_PATTERN = "wiki/USS_"
+
+
+def sections(vd):
+    """Infobox data of 'page' or 'lead' mode split as in 'wikitext' mode,
+    with the rows renumbered"""
+    vd = vd.copy()
+    gc = sswiki.getVesselGenCharacteristics(vd)
+    sh = sswiki.getVesselServiceHistory(vd)
+
+    return (gc.reset_index(drop=True),
+            [shn.reset_index(drop=True) for shn in sh])
+
+
+def linkBenchmarks(mock):
+    """Benchmark results of the link modes on the mock's group list pages"""
+    lists = [title for title in mock.pages if title.startswith('List_of_')
+             and title != LISTS_OF_LISTS]
+    group_lists = pd.DataFrame({'group_type': lists,
+                                'url': [mock.articleURL(t) for t in lists]})
+
+    results, found = [], {}
+    for mode in LINK_MODES:
+        metrics.METRICS.reset()
+        result = harness.timeOnly(
+            f"links {mode}",
+            lambda: found.__setitem__(
+                mode, sswiki.getVesselLinks(group_lists, ARTICLE_PATTERN,
+                                            mode)),
+            0, len(lists))
+
+        requests = metrics.METRICS.counter('fetch_responses_total',
+                                           stage='group_list', status=200)
+        wire = metrics.METRICS.counter('fetch_wire_bytes_total',
+                                       stage='group_list')
+        result['rows'] = len(found[mode])
+        result['rows_per_sec'] = round(result['rows'] / result['seconds'], 1)
+        result['requests_per_list'] = round(requests / len(lists), 1)
+        result['wire_bytes_per_list'] = round(wire / len(lists))
+        results.append(result)
+
+    paths = [set(vls['vessel_url'].map(lambda url: urlsplit(url).path))
+             for vls in found.values()]
+    assert paths[0] == paths[1], "page and api modes found different links"
+
+    return results
+
+
+def targetTitles(mock, urls):
+    """Titles of the pages on the mock that article urls resolve to,
+    following redirects"""
+    titles = (titleKey(unquote(urlsplit(url).path.rsplit('/', 1)[-1]))
+              for url in urls)
+
+    return {mock.redirects.get(title, title) for title in titles}
+
+
+def prefilterBenchmarks(mock):
+    """Benchmark results of crawling the mock's vessel, redirect,
+    disambiguation and museum pages with and without the prefilter; the
+    prefilter must keep every vessel scraped without it"""
+    ships = mock.shipTitles()
+    others = [title for title in mock.pages
+              if title not in ships and not title.startswith('List_of_')]
+    titles = ships + others + list(mock.redirects)[:len(ships) // 10]
+    vls = pd.DataFrame({'group_type': 'mixed', 'group_type_url': '',
+                        'vessel_url': [mock.articleURL(t) for t in titles]})
+
+    results, vessels = [], {}
+    for name, filtered in [('crawl all', False), ('crawl prefilter', True)]:
+        metrics.METRICS.reset()
+        scraped = {}
+
+        def crawl():
+            links = prefilter.prefilterVesselLinks(vls) if filtered else vls
+            scraped['gc'], _ = sswiki.getVesselData(links)
+
+        result = harness.timeOnly(name, crawl, len(vls), len(vls))
+        report = metrics.report()
+        result['requests'] = sum(h['count'] for h in report['histograms']
+                                 if h['name'] == 'fetch_seconds')
+        result['wire_bytes'] = sum(c['value'] for c in report['counters']
+                                   if c['name'] == 'fetch_wire_bytes_total')
+        vessels[name] = targetTitles(mock, scraped['gc']['vessel_url'])
+        result['vessels'] = len(vessels[name])
+        results.append(result)
+
+    lost = vessels['crawl all'] - vessels['crawl prefilter']
+    assert not lost, f"prefilter dropped vessels {sorted(lost)}"
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50,
+                        help="synthetic pages; default 50")
+    parser.add_argument('--filler', type=int, nargs='+', default=[150],
+                        help="paragraphs of article text per page; "
+                        + "default 150")
+    parser.add_argument('--api-limit', type=int, default=500,
+                        help="links API results per request; default 500")
+    parser.add_argument('--seed', type=int, default=0)
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    # Do not pace requests to the local server
+    fetch.CONTROLLER = fetch.RateController(rate=1e6, max_rate=1e6)
+
+    results = []
+    for filler in args.filler:
+        with MockWiki.fromSynthetic(args.pages, args.seed, filler,
+                                    limit=args.api_limit) as mock:
+            vls = pd.DataFrame({'vessel_url': [
+                mock.articleURL(title) for title in mock.shipTitles()]})
+            scraped = {}
+            for mode in MODES:
+                metrics.METRICS.reset()
+                result = harness.timeOnly(
+                    f"scrape {mode}",
+                    lambda: scraped.__setitem__(
+                        mode, [sswiki.scrapeVesselData(vl, mode)
+                               for _, vl in vls.iterrows()]),
+                    len(vls), filler)
+
+                wire = metrics.METRICS.counter('fetch_wire_bytes_total',
+                                               stage='vessel')
+                parse = sum(metrics.METRICS.samples('parse_seconds',
+                                                    stage='vessel'))
+                result['wire_bytes_per_vessel'] = round(wire / len(vls))
+                result['parse_ms_per_vessel'] = round(
+                    parse * 1000 / len(vls), 3)
+                results.append(result)
+
+            for page_vd, lead_vd, (gc, sh) in zip(*scraped.values()):
+                pd.testing.assert_frame_equal(page_vd, lead_vd)
+                page_gc, page_sh = sections(page_vd)
+                pd.testing.assert_frame_equal(page_gc, gc)
+                assert len(page_sh) == len(sh)
+                for page_shn, shn in zip(page_sh, sh):
+                    pd.testing.assert_frame_equal(page_shn, shn)
+
+    with MockWiki.fromSynthetic(args.pages, args.seed,
+                                limit=args.api_limit) as mock:
+        link_results = linkBenchmarks(mock)
+        prefilter_results = prefilterBenchmarks(mock)
+
+    print(f"{'benchmark':<16}{'filler':>8}{'KB/vessel':>12}"
+          + f"{'parse ms/vessel':>18}")
+    for r in results:
+        print(f"{r['name']:<16}{r['scale']:>8}"
+              + f"{r['wire_bytes_per_vessel'] / 1024:>12,.1f}"
+              + f"{r['parse_ms_per_vessel']:>18,.2f}")
+    print()
+
+    print(f"{'benchmark':<16}{'lists':>8}{'links':>8}{'KB/list':>10}"
+          + f"{'requests/list':>16}")
+    for r in link_results:
+        print(f"{r['name']:<16}{r['scale']:>8}{r['rows']:>8,}"
+              + f"{r['wire_bytes_per_list'] / 1024:>10,.1f}"
+              + f"{r['requests_per_list']:>16,.1f}")
+    print()
+
+    print(f"{'benchmark':<16}{'links':>8}{'requests':>10}{'KB':>10}"
+          + f"{'vessels':>10}")
+    for r in prefilter_results:
+        print(f"{r['name']:<16}{r['scale']:>8}{r['requests']:>10,}"
+              + f"{r['wire_bytes'] / 1024:>10,.1f}{r['vessels']:>10,}")
+    print()
+
+    return harness.runSuite('fetch', results + link_results
+                            + prefilter_results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# Hacky way to import modules instead of using setup.py or similiar
+from pathlib import Path
+import sys
+
+path = str(Path(Path(__file__).parent.absolute()).parent.absolute())
+sys.path.insert(0, path)
+
+DATA_DIR = Path(path) / 'data'
+BENCH_DIR = Path(path) / 'benchmarks'
@@ -0,0 +1,90 @@
+"""Read and write throughput of the vessel data csv engines.
+
+Writes seeded synthetic service history data (see `synthetic.py`) to a
+temporary directory, then times `utils.loadVesselData()` with the 'c' and
+'pyarrow' parsers, and `to_csv` against `utils.writeVesselData()` with no,
+gzip and zstd compression. Reports rows and megabytes of csv per second;
+the scale is the number of rows.
+
+Usage, from the repository root:
+    python benchmarks/bench_io.py --rows 100000 500000 --workers 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import harness
+import synthetic
+
+import sswiki.constants as const
+import sswiki.utils as utils
+
+
+def available(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000],
+                        help="synthetic rows; default 100000")
+    parser.add_argument('--workers', type=int,
+                        help="writer threads; default the CPU count")
+    parser.add_argument('--chunksize', type=int, default=100000,
+                        help="writer rows per chunk; default 100000")
+    parser.add_argument('--seed', type=int, default=0)
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    engines = ['c'] + (['pyarrow'] if available('pyarrow') else [])
+    compressions = [None, 'gzip'] + (['zstd'] if available('zstandard')
+                                     else [])
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        const.DATA_DIR = tmp_dir + os.sep
+        for rows in args.rows:
+            df = synthetic.syntheticSH(rows, args.seed)
+            df.index.name = 'uuid'
+            df.to_csv(const.DATA_DIR + 'sh.csv')
+            csv_bytes = os.path.getsize(const.DATA_DIR + 'sh.csv')
+
+            for engine in engines:
+                results.append(harness.timeOnly(
+                    f"read {engine}",
+                    lambda: utils.loadVesselData('sh.csv', engine,
+                                                 index_col='uuid'),
+                    rows, rows))
+
+            results.append(harness.timeOnly(
+                "write to_csv", lambda: df.to_csv(const.DATA_DIR + 'w.csv'),
+                rows, rows))
+
+            for compression in compressions:
+                suffix = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+                results.append(harness.timeOnly(
+                    f"write {compression or 'csv'} chunked",
+                    lambda: utils.writeVesselData(
+                        df, 'w.csv' + suffix[compression], args.chunksize,
+                        args.workers),
+                    rows, rows))
+
+            for result in results[-len(engines) - len(compressions) - 1:]:
+                result['csv_mb_per_sec'] = round(
+                    csv_bytes / 2**20 / result['seconds'], 1)
+
+    print(f"{'benchmark':<28}{'rows':>10}{'csv MB/sec':>12}")
+    for r in results:
+        print(f"{r['name']:<28}{r['rows']:>10,}{r['csv_mb_per_sec']:>12,.1f}")
+    print()
+
+    return harness.runSuite('io', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Micro-benchmarks for the vessel data normalizers.
+
+Runs each normalizer over `data/gc_data.csv` and synthetic service history
+data with as many rows (see `synthetic.syntheticSH()`), replicated 1x and 10x
+by default; 100x is opt-in with `--scales`, as the service history
+normalizers take minutes at that scale. Reports rows per second, timed without
+tracing memory, and peak memory, traced in a second run. With `--sh-fixture`,
+the shipped service history fixture `data/sh_fixture.csv` is used instead of
+synthetic data, e.g. for a quick check. With `--workers`, the whole frame
+normalizers are also run with `sswiki.parallel`; peak memory is not traced for
+these as it is in the worker processes.
+
+Usage, from the repository root:
+    python benchmarks/bench_normalize.py --output results.json
+    python benchmarks/bench_normalize.py --scales 1 10 100
+    python benchmarks/bench_normalize.py --sh-fixture --scales 1
+    python benchmarks/bench_normalize.py --baseline baseline.json
+    python benchmarks/bench_normalize.py --only normalizeSH --workers 16
+"""
+import argparse
+import sys
+
+from bench_imports import DATA_DIR
+import harness
+import synthetic
+
+import pandas as pd
+
+import sswiki.constants as const
+import sswiki.date_formatting as dfmt
+import sswiki.linear_mes_formatting as lmfmt
+import sswiki.parallel as parallel
+import sswiki.speed_formatting as spfmt
+import sswiki.sswiki as sswiki
+import sswiki.weight_formatting as wfmt
+
+
+def loadData(file_name):
+    return pd.read_csv(DATA_DIR / file_name, dtype='str', encoding='utf-8',
+                       index_col='uuid')
+
+
+def replicate(df, scale):
+    """Replicate rows keeping the 'uuid' index unique as the converters
+    expect"""
+    if scale == 1:
+        return df
+    return pd.concat([df.set_axis(df.index + f"_{n}") for n in range(scale)])
+
+
+def benchmarks(gc, sh):
+    """Benchmarks as tuples (name, function, data frame); the function is
+    passed a copy of the data frame"""
+    return [
+        ('seriesToMetres', lambda df: lmfmt.seriesToMetres(df['Length']), gc),
+        ('seriesToTonnes',
+         lambda df: wfmt.seriesToTonnes(df['Displacement']), gc),
+        ('seriesToKnots', lambda df: spfmt.seriesToKnots(df['Speed']), gc),
+        ('findDates', lambda df: dfmt.findDates(df, 'Launched'), sh),
+        ('convertDates',
+         lambda df: sswiki.convertDates(df, const.DT_SH_COLS), sh),
+        ('convertHullNo', sswiki.convertHullNo, sh),
+        ('getFates', sswiki.getFates, sh),
+        ('normalizeGC', sswiki.normalizeGC, gc),
+        ('normalizeSH', sswiki.normalizeSH, sh),
+    ]
+
+
+def parallelBenchmarks(gc, sh, workers):
+    """As per `benchmarks()` for `parallel.normalizeParallel()`"""
+    return [
+        ('normalizeGC', lambda df: parallel.normalizeParallel(df, 'gc',
+                                                              workers), gc),
+        ('normalizeSH', lambda df: parallel.normalizeParallel(df, 'sh',
+                                                              workers), sh),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help="replication factors; default 1 10")
+    parser.add_argument('--only', nargs='+',
+                        help="only run the named benchmarks")
+    parser.add_argument('--workers', type=int,
+                        help="also run the parallel normalizers with this "
+                        + "many worker processes")
+    parser.add_argument('--sh-rows', type=int,
+                        help="synthetic service history rows; default as "
+                        + "many as data/gc_data.csv")
+    parser.add_argument('--sh-fixture', action='store_true',
+                        help="use data/sh_fixture.csv instead of synthetic "
+                        + "service history data")
+    parser.add_argument('--seed', type=int, default=0)
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    gc = loadData('gc_data.csv')
+    if args.sh_fixture:
+        sh = loadData('sh_fixture.csv')
+    else:
+        sh = synthetic.syntheticSH(args.sh_rows or len(gc), args.seed)
+
+    results = []
+    for scale in args.scales:
+        gc_scaled, sh_scaled = replicate(gc, scale), replicate(sh, scale)
+        for name, func, df in benchmarks(gc_scaled, sh_scaled):
+            if args.only and name not in args.only:
+                continue
+            results.append(harness.measure(name, func, len(df), scale,
+                                           setup=df.copy))
+
+        if not args.workers:
+            continue
+
+        for name, func, df in parallelBenchmarks(gc_scaled, sh_scaled,
+                                                 args.workers):
+            if args.only and name not in args.only:
+                continue
+            results.append(harness.timeOnly(
+                f"{name} x{args.workers} workers", func, len(df), scale,
+                setup=df.copy))
+
+    return harness.runSuite('normalize', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Worst case latency of the cascade patterns on adversarially long strings.
+
+Runs `sswiki.regex.extract()` with each available backend ('re', and 're2'
+if google-re2 is installed) on long strings built to make backtracking
+patterns slow e.g. a 'Fate' of repeated "Sunk, " with no date for the lazy
+`PAT_SUNK + '.*?' + date` composition. The scale is the string length in
+characters; with a linear time engine seconds grow linearly with it.
+
+Usage, from the repository root:
+    python benchmarks/bench_regex.py --lengths 1000 10000 100000
+"""
+import argparse
+import re
+import sys
+
+import bench_imports  # noqa: F401
+import harness
+
+import pandas as pd
+
+import sswiki.constants as const
+import sswiki.regex as regex
+
+
+def cases(length):
+    """Benchmark cases as tuples (name, pattern, flags, string)"""
+    date = const.DATE_PATS['DD MMMMMM YYYY']
+    return [
+        ('fate no date', const.PAT_SUNK + r'.*?' + date, re.IGNORECASE,
+         ("Sunk, " * length)[:length]),
+        ('hull no number', const.HULL_ID_PATS[1], 0, "A" * length),
+        ('months no day', const.DATE_PATS['MMMMMM DD, YYYY'], re.IGNORECASE,
+         ("March " * length)[:length]),
+        ('typical fate', const.PAT_SUNK + r'.*?' + date, re.IGNORECASE,
+         ("Sunk by gunfire off Guadalcanal, 13 November 1942 "
+          * length)[:length]),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lengths', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help="string lengths; default 1000 10000 100000")
+    parser.add_argument('--rows', type=int, default=3,
+                        help="strings per benchmark; default 3")
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help="skip longer strings for a case and backend "
+                        + "once a run takes longer than this")
+    harness.addArguments(parser)
+    args = parser.parse_args(argv)
+
+    backends = ['re'] + (['re2'] if regex.re2Available() else [])
+    if len(backends) == 1:
+        print("google-re2 is not installed; running the 're' backend only")
+
+    results = []
+    for backend in backends:
+        regex.setBackend(backend)
+        too_slow = set()
+        for length in sorted(args.lengths):
+            for name, pat, flags, text in cases(length):
+                if name in too_slow:
+                    continue
+
+                sf = pd.Series([text] * args.rows, dtype=object)
+                result = harness.timeOnly(
+                    f"{name} ({backend})",
+                    lambda: regex.extract(sf, pat, flags), args.rows, length)
+                results.append(result)
+
+                if result['seconds'] > args.max_seconds:
+                    too_slow.add(name)
+
+    regex.setBackend('re')
+
+    return harness.runSuite('regex', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Import time benchmark of the sswiki modules against a time budget.
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+reports the median cumulative import time of the module, and any heavy
+dependencies e.g. pandas that were actually loaded rather than left for
+first use.
+
+Usage, from the repository root:
+    python benchmarks/bench_startup.py --budget-ms 150
+    python benchmarks/bench_startup.py --module sswiki.catalog --repeat 10
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+from bench_imports import BENCH_DIR
+
+MODULES = ['sswiki.constants', 'sswiki.utils', 'sswiki.sswiki']
+HEAVY = ['pandas', 'numpy', 'requests', 'bs4']
+
+# Prints the heavy modules that were loaded, not only registered lazily
+CHECK = "import sys, {module}; print(' '.join(m for m in {heavy} " \
+    + "if m in sys.modules and " \
+    + "type(sys.modules[m]).__name__ != '_LazyModule'))"
+
+
+def importTime(module):
+    """Cumulative import time of a module in a fresh interpreter
+
+    Keyword arguments:
+    module -- Module name e.g. 'sswiki.sswiki'
+
+    Return:
+    A tuple (import time in milliseconds, list of heavy modules loaded)
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         CHECK.format(module=module, heavy=HEAVY)],
+        cwd=BENCH_DIR.parent, capture_output=True, text=True, check=True)
+
+    micros = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            micros = int(cumulative)
+
+    return micros / 1000, proc.stdout.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', action='append',
+                        help="module to import; may be repeated; default "
+                        + f"{', '.join(MODULES)}")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="imports per module; the median is reported")
+    parser.add_argument('--budget-ms', type=float, default=150,
+                        help="import time budget per module in milliseconds")
+    parser.add_argument('--output', help="json file to write results to")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.module or MODULES:
+        times = []
+        for _ in range(args.repeat):
+            ms, loaded = importTime(module)
+            times.append(ms)
+
+        results.append({'name': module,
+                        'median_ms': round(statistics.median(times), 1),
+                        'min_ms': round(min(times), 1),
+                        'heavy_loaded': loaded})
+
+    print(f"{'module':<28}{'median ms':>11}{'min ms':>9}  heavy loaded")
+    for r in results:
+        print(f"{r['name']:<28}{r['median_ms']:>11.1f}{r['min_ms']:>9.1f}  "
+              + " ".join(r['heavy_loaded']))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'suite': 'startup',
+                       'timestamp': datetime.now(timezone.utc).isoformat(),
+                       'python': platform.python_version(),
+                       'budget_ms': args.budget_ms,
+                       'results': results}, f, indent=2)
+
+    over = [r for r in results if r['median_ms'] > args.budget_ms]
+    for r in over:
+        print(f"OVER BUDGET {r['name']}: {r['median_ms']:.1f} ms vs "
+              + f"{args.budget_ms:.0f} ms")
+
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
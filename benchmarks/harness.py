@@ -0,0 +1,170 @@
+from datetime import datetime, timezone
+import json
+import platform
+import time
+import tracemalloc
+
+
+def measure(name, func, rows, scale=1, setup=None):
+    """Time a function call and trace its peak memory
+
+    The function is called twice: once timed, without tracing memory, which
+    slows down allocation heavy code, then again with memory traced for the
+    peak.
+
+    Keyword arguments:
+    name -- Name of the benchmark
+    func -- Function to call; passed the return of `setup` if provided
+    rows -- Number of rows processed by the call
+    scale -- Replication factor of the input data
+    setup -- Function called before each call e.g. to copy the input data
+
+    Return:
+    A dictionary with the benchmark name, scale, rows, seconds, rows per
+    second and peak traced memory in bytes
+    """
+    result = timeOnly(name, func, rows, scale, setup)
+
+    args = () if setup is None else (setup(),)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result['peak_mem_bytes'] = peak
+
+    return result
+
+
+def timeOnly(name, func, rows, scale=1, setup=None):
+    """As per `measure()` but only the timed call e.g. for code run in other
+    processes, or too slow to run twice; 'peak_mem_bytes' is `None`
+    """
+    args = () if setup is None else (setup(),)
+
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+
+    return {'name': name,
+            'scale': scale,
+            'rows': rows,
+            'seconds': round(seconds, 6),
+            'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+            'peak_mem_bytes': None}
+
+
+def writeResults(results, path, suite):
+    """Write benchmark results as json
+
+    Keyword arguments:
+    results -- List of dictionaries from `measure()`
+    path -- File path to write to
+    suite -- Name of the benchmark suite
+    """
+    import pandas as pd
+    import numpy as np
+
+    report = {'suite': suite,
+              'timestamp': datetime.now(timezone.utc).isoformat(),
+              'python': platform.python_version(),
+              'pandas': pd.__version__,
+              'numpy': np.__version__,
+              'machine': platform.machine(),
+              'results': results}
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def compareResults(results, baseline_path, threshold=0.2):
+    """Compare benchmark results against stored baseline results
+
+    A result regresses if its rows per second is more than `threshold`
+    below, or its peak memory more than `threshold` above, the baseline
+    result with the same name and scale.
+
+    Keyword arguments:
+    results -- List of dictionaries from `measure()`
+    baseline_path -- File path of the baseline json from `writeResults()`
+    threshold -- Allowed relative change e.g. 0.2 for 20%
+
+    Return:
+    A list of strings describing each regression; empty if none
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['name'], r['scale']): r
+                    for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        base = baseline.get((result['name'], result['scale']))
+        if base is None:
+            continue
+
+        min_rate = (base['rows_per_sec'] or 0) * (1 - threshold)
+        if result['rows_per_sec'] and result['rows_per_sec'] < min_rate:
+            regressions.append(
+                f"{result['name']} x{result['scale']}: "
+                + f"{result['rows_per_sec']:,.0f} rows/sec vs baseline "
+                + f"{base['rows_per_sec']:,.0f}")
+
+        if base['peak_mem_bytes'] and result['peak_mem_bytes'] and \
+                result['peak_mem_bytes'] > \
+                base['peak_mem_bytes'] * (1 + threshold):
+            regressions.append(
+                f"{result['name']} x{result['scale']}: "
+                + f"{result['peak_mem_bytes']:,.0f} peak bytes vs baseline "
+                + f"{base['peak_mem_bytes']:,.0f}")
+
+    return regressions
+
+
+def printResults(results):
+    """Print benchmark results as a table"""
+    print(f"{'benchmark':<28}{'scale':>7}{'rows':>10}{'seconds':>10}"
+          + f"{'rows/sec':>14}{'peak MB':>10}")
+    for r in results:
+        peak = '' if r['peak_mem_bytes'] is None else \
+            f"{r['peak_mem_bytes'] / 2**20:,.1f}"
+        rate = '' if r['rows_per_sec'] is None else f"{r['rows_per_sec']:,.0f}"
+        print(f"{r['name']:<28}{r['scale']:>7}{r['rows']:>10,}"
+              + f"{r['seconds']:>10.3f}{rate:>14}{peak:>10}")
+
+
+def runSuite(suite, results, args):
+    """Print, write and compare results as per the common benchmark command
+    line arguments from `addArguments()`
+
+    Return:
+    Exit code; 1 if any regression against the baseline, else 0
+    """
+    printResults(results)
+
+    if args.output:
+        writeResults(results, args.output, suite)
+
+    if args.save_baseline:
+        writeResults(results, args.save_baseline, suite)
+
+    if args.baseline:
+        regressions = compareResults(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+def addArguments(parser):
+    """Add the common benchmark command line arguments to an argparse parser
+    """
+    parser.add_argument('--output', help="json file to write results to")
+    parser.add_argument('--baseline',
+                        help="json results file to compare results against")
+    parser.add_argument('--save-baseline',
+                        help="json file to write results to as a baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative regression; default 0.2")
@@ -0,0 +1,552 @@
+"""Local stub of the Wikipedia article and MediaWiki API endpoints.
+
+Serves the list of lists, vessel article and group list html pages at
+'/wiki/<title>', and the parse API (html or wikitext) and the links and page
+metadata queries at '/w/api.php', with gzip transfer encoding when
+requested, so the scraper can be tested and benchmarked without the network.
+Pages are either synthetic (see `synthetic.py`) or recorded html files e.g.
+saved from Wikipedia. Latency, server errors, HTTP 429 responses and slow
+drip responses can be injected; see `Faults`.
+
+Usage, from the repository root:
+    python benchmarks/mock_wiki.py --pages 100 --port 8000
+    python benchmarks/mock_wiki.py --html-dir /tmp/synthetic/html
+    python benchmarks/mock_wiki.py --latency lognormal --error-rate 0.05
+"""
+import argparse
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import html
+import json
+from pathlib import Path
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import synthetic
+
+import sswiki.fetch as fetch
+
+# Links to articles, and to missing articles ("red links")
+PAT_LINK = re.compile(r'href="/wiki/([^"#?]+)"')
+PAT_REDLINK = re.compile(r'href="/w/index\.php\?title=([^"&]+)&amp;'
+                         + r'action=edit&amp;redlink=1"')
+
+# Page metadata is inferred from the html: ship articles have an infobox
+# with general characteristics, disambiguation pages the disambiguation box,
+# and ship index pages the "Ships grouped alphabetically" row
+SHIP_INFOBOX = ('class="infobox', 'General characteristics')
+DISAMBIGUATION = 'id="disambigbox"'
+SHIP_INDEX = 'Ships grouped alphabetically'
+
+NAMESPACES = ('Category', 'File', 'Help', 'Portal', 'Special', 'Template',
+              'Wikipedia')
+
+# Title of the synthetic list of lists page
+LISTS_OF_LISTS = 'List_of_United_States_Navy_ships'
+
+# Statuses of injected server errors
+ERROR_STATUS = (500, 502, 503)
+
+# Chunks a slow drip response is sent in
+DRIP_CHUNKS = 10
+
+
+def titleKey(title):
+    """Page title as in article urls e.g. 'USS_Kirk_(FF-1087)'"""
+    return title.strip().replace(' ', '_')
+
+
+def leadWikitext(text):
+    """Wikitext of the lead section i.e. before the first section heading"""
+    match = re.search(r'^==', text, re.MULTILINE)
+
+    return text if match is None else text[:match.start()]
+
+
+def leadSection(page):
+    """Html of the lead section of a page i.e. the body before the first
+    section heading"""
+    start = page.find('<body>')
+    body = page[start + len('<body>'):] if start >= 0 else page
+    end = body.find('<h2')
+
+    return body if end < 0 else body[:end]
+
+
+class Faults:
+    """Faults injected into the responses of a `MockWiki`.
+
+    Every request is delayed by a latency drawn from a distribution: 'none',
+    'constant' (`latency_ms`), 'exponential' (mean `latency_ms`) or
+    'lognormal' (median `latency_ms` and shape `sigma`, for a long tail).
+    Requests for titles starting with `prefix` are then, at the given
+    rates, answered with a server error (HTTP 500, 502 or 503), an HTTP 429
+    with a 'Retry-After' of `retry_after` seconds, or sent slowly in chunks
+    over `drip_seconds`. Counts of the faults injected are in `injected`.
+    """
+
+    LATENCIES = ('none', 'constant', 'exponential', 'lognormal')
+
+    def __init__(self, latency='none', latency_ms=20.0, sigma=1.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 drip_rate=0.0, drip_seconds=2.0, prefix=None, seed=0):
+        """
+        Keyword arguments:
+        latency -- Latency distribution, one of `LATENCIES`
+        latency_ms -- Scale of the latency distribution in milliseconds
+        sigma -- Shape of the 'lognormal' latency distribution
+        error_rate -- Fraction of requests answered with a server error
+        throttle_rate -- Fraction of requests answered with HTTP 429
+        retry_after -- 'Retry-After' seconds of HTTP 429 responses
+        drip_rate -- Fraction of responses sent slowly
+        drip_seconds -- Seconds to send a slow response over
+        prefix -- Title prefix of the requests to inject errors, HTTP 429s
+            and slow responses into e.g. 'USS_'; if None, then all requests
+        seed -- Random seed
+        """
+        if latency not in self.LATENCIES:
+            raise ValueError(f"latency must be one of {self.LATENCIES}, "
+                             + f"not {latency!r}")
+
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.drip_rate = drip_rate
+        self.drip_seconds = drip_seconds
+        self.prefix = prefix
+        self.injected = {'error': 0, 'throttle': 0, 'drip': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Seconds of latency for a request"""
+        scale = self.latency_ms / 1000
+        with self._lock:
+            if self.latency == 'constant':
+                return scale
+            if self.latency == 'exponential':
+                return self._rng.expovariate(1 / scale) if scale > 0 else 0.0
+            if self.latency == 'lognormal':
+                return scale * self._rng.lognormvariate(0, self.sigma)
+
+        return 0.0
+
+    def fault(self, title):
+        """Fault to inject for a request for a title: 'error', 'throttle',
+        'drip' or None"""
+        if self.prefix is not None and not title.startswith(self.prefix):
+            return None
+
+        with self._lock:
+            draw = self._rng.random()
+            for fault, rate in [('error', self.error_rate),
+                                ('throttle', self.throttle_rate),
+                                ('drip', self.drip_rate)]:
+                if draw < rate:
+                    self.injected[fault] += 1
+                    return fault
+                draw -= rate
+
+        return None
+
+    def errorStatus(self):
+        """HTTP status of an injected server error"""
+        with self._lock:
+            return self._rng.choice(ERROR_STATUS)
+
+
+class MockWiki:
+    """Stub Wikipedia server on a local port, run in a daemon thread.
+
+    Use as a context manager, or call `start()` and `stop()`. Counts of the
+    requests served and the bytes sent by path ('/wiki' or '/w/api.php') are
+    in `requests` and `bytes_sent`. Set `faults` to a `Faults` to inject
+    latency and errors.
+    """
+
+    def __init__(self, pages, limit=500, redirects=None, wikitext=None):
+        """
+        Keyword arguments:
+        pages -- Dictionary of page title to html page
+        limit -- Maximum results for each links API request i.e. for
+            'gpllimit=max'
+        redirects -- Dictionary of redirect page title to target page title
+        wikitext -- Dictionary of page title to wikitext, for the parse API
+            'wikitext' prop; pages without are empty
+        """
+        self.pages = {titleKey(title): page for title, page in pages.items()}
+        self.wikitext = {titleKey(title): text
+                         for title, text in (wikitext or {}).items()}
+        self.redirects = {titleKey(k): titleKey(v)
+                          for k, v in (redirects or {}).items()}
+        self.pageids = {title: n for n, title in enumerate(self.pages, 1)}
+        self.limit = limit
+        self.faults = Faults()
+        self.requests = {}
+        self.bytes_sent = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @classmethod
+    def fromSynthetic(cls, n, seed=0, filler=150, list_filler=30,
+                      limit=500):
+        """Mock with `n` synthetic vessel pages with `filler` paragraphs of
+        article text, their group list pages with `list_filler` words of
+        description for each vessel, and disambiguation and museum pages;
+        see `synthetic.syntheticInfoboxes()`,
+        `synthetic.syntheticListPages()` and
+        `synthetic.syntheticOtherPages()`, the list of lists page linking to
+        the group list pages, see `synthetic.syntheticListOfLists()`, and
+        the wikitext of the vessel pages, see
+        `synthetic.syntheticWikitexts()`. Each vessel title
+        without the hyphen in its hull number e.g. 'USS_Lang_(DD399)'
+        redirects to the vessel page.
+        """
+        wikitext = synthetic.syntheticWikitexts(n, seed, filler=filler)
+        wikitext = {unquote(url.rsplit('/wiki/', 1)[-1]): text
+                    for url, text in wikitext.items()}
+
+        pages = synthetic.syntheticInfoboxes(n, seed, filler=filler)
+        pages.update(synthetic.syntheticListPages(n, seed,
+                                                  filler=list_filler))
+        pages.update(synthetic.syntheticOtherPages(n, seed, filler=filler))
+        pages.update(synthetic.syntheticListOfLists(n, seed))
+        pages = {unquote(url.rsplit('/wiki/', 1)[-1]): page
+                 for url, page in pages.items()}
+
+        redirects = {title.replace('-', '', 1): title for title in pages
+                     if title.startswith('USS_') and '(' in title}
+
+        return cls(pages, limit, redirects, wikitext)
+
+    @classmethod
+    def fromDirectory(cls, html_dir):
+        """Mock with the recorded '<title>.html' pages in a directory"""
+        return cls({path.stem: path.read_text(encoding='utf-8')
+                    for path in Path(html_dir).glob('*.html')})
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def shipTitles(self):
+        """Titles of the pages that are individual ship articles"""
+        return [title for title, page in self.pages.items()
+                if all(s in page for s in SHIP_INFOBOX)]
+
+    def articleURL(self, title):
+        """Url of a page on the mock"""
+        return self.base_url + fetch.articlePath(title)
+
+    def start(self, port=0):
+        """Start serving on a local port; 0 for any free port
+
+        Return:
+        The base url e.g. 'http://127.0.0.1:8000'
+        """
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+
+        return self.base_url
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send(self, handler, status, body, content_type, path, headers=None,
+              drip=0.0):
+        body = body.encode('utf-8')
+        gzipped = 'gzip' in handler.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzip.compress(body, mtime=0)
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        if gzipped:
+            handler.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+
+        if drip > 0:
+            size = -(-len(body) // DRIP_CHUNKS)
+            try:
+                for start in range(0, len(body), size):
+                    handler.wfile.write(body[start:start + size])
+                    handler.wfile.flush()
+                    time.sleep(drip / DRIP_CHUNKS)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on the response e.g. at its deadline
+                handler.close_connection = True
+        else:
+            handler.wfile.write(body)
+
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.bytes_sent[path] = self.bytes_sent.get(path, 0) + len(body)
+
+    def _handle(self, handler):
+        url = urlsplit(handler.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path.startswith('/wiki/'):
+            path, title = '/wiki', unquote(url.path[len('/wiki/'):])
+        else:
+            path = url.path
+            title = params.get('page', params.get('titles', ''))
+
+        time.sleep(self.faults.delay())
+        fault = self.faults.fault(titleKey(title))
+        if fault == 'error':
+            self._send(handler, self.faults.errorStatus(),
+                       "<html>Server error</html>",
+                       'text/html; charset=utf-8', path)
+            return
+        if fault == 'throttle':
+            self._send(handler, 429, "<html>Too many requests</html>",
+                       'text/html; charset=utf-8', path,
+                       {'Retry-After': str(self.faults.retry_after)})
+            return
+        drip = self.faults.drip_seconds if fault == 'drip' else 0.0
+
+        if path == '/wiki':
+            title = titleKey(title)
+            page = self.pages.get(self.redirects.get(title, title))
+            if page is None:
+                self._send(handler, 404, "<html>Not found</html>",
+                           'text/html; charset=utf-8', '/wiki', drip=drip)
+            else:
+                self._send(handler, 200, page, 'text/html; charset=utf-8',
+                           '/wiki', drip=drip)
+        elif url.path == '/w/api.php':
+            self._send(handler, 200, json.dumps(self.api(params)),
+                       'application/json; charset=utf-8', '/w/api.php',
+                       drip=drip)
+        else:
+            self._send(handler, 404, "<html>Not found</html>",
+                       'text/html; charset=utf-8', url.path)
+
+    def api(self, params):
+        """Response of the API for the query parameters, as a dictionary"""
+        action = params.get('action')
+        if action == 'parse':
+            return self.parse(params)
+        if action == 'query' and params.get('generator') == 'links':
+            return self.links(params)
+        if action == 'query' and 'titles' in params:
+            return self.query(params)
+
+        return {'error': {'code': 'badvalue',
+                          'info': f"Unrecognized action: {action}"}}
+
+    def parse(self, params):
+        """Response of the parse API; the 'text' or 'wikitext' prop, and the
+        lead section if 'section' is 0"""
+        title = params.get('page', '')
+        page = self.pages.get(titleKey(title))
+        if page is None:
+            return {'error': {'code': 'missingtitle',
+                              'info': "The page you specified doesn't exist."}}
+
+        if params.get('prop') == 'wikitext':
+            text = self.wikitext.get(titleKey(title), '')
+            if params.get('section') == '0':
+                text = leadWikitext(text)
+            return {'parse': {'title': title.replace('_', ' '),
+                              'pageid': self.pageids[titleKey(title)],
+                              'wikitext': text}}
+
+        if params.get('section') == '0':
+            text = leadSection(page)
+        else:
+            text = page[page.find('<body>') + len('<body>'):]
+
+        return {'parse': {'title': title.replace('_', ' '),
+                          'pageid': self.pageids[titleKey(title)],
+                          'text': ('<div class="mw-parser-output">' + text
+                                   + '</div>')}}
+
+    def query(self, params):
+        """Response of the query API for titles, with the 'pageprops',
+        'templates' and 'categories' props filtered by 'ppprop',
+        'tltemplates' and 'clcategories', and redirects resolved if
+        'redirects' is set; see the module comments for how metadata is
+        inferred"""
+        props = params.get('prop', '').split('|')
+        templates = params.get('tltemplates', '').split('|')
+        categories = params.get('clcategories', '').split('|')
+
+        normalized, redirects, pages = [], [], {}
+        for title in params['titles'].split('|'):
+            if '_' in title:
+                normalized.append({'from': title,
+                                   'to': title.replace('_', ' ')})
+                title = title.replace('_', ' ')
+
+            key = titleKey(title)
+            if 'redirects' in params and key in self.redirects:
+                key = self.redirects[key]
+                redirects.append({'from': title,
+                                  'to': key.replace('_', ' ')})
+
+            page = self.pages.get(key)
+            if page is None:
+                pages[key] = {'ns': 0, 'title': key.replace('_', ' '),
+                              'missing': True}
+                continue
+
+            info = {'pageid': self.pageids[key], 'ns': 0,
+                    'title': key.replace('_', ' ')}
+            if 'pageprops' in props and DISAMBIGUATION in page:
+                info['pageprops'] = {'disambiguation': ''}
+            if 'templates' in props and all(s in page for s in SHIP_INFOBOX):
+                info['templates'] = [{'ns': 10, 'title': t}
+                                     for t in templates
+                                     if t.startswith('Template:Infobox ship')]
+            if 'categories' in props and SHIP_INDEX in page:
+                info['categories'] = [{'ns': 14, 'title': c}
+                                      for c in categories if c]
+            pages[key] = info
+
+        query = {'pages': list(pages.values())}
+        if normalized:
+            query['normalized'] = normalized
+        if redirects:
+            query['redirects'] = redirects
+
+        return {'batchcomplete': True, 'query': query}
+
+    def links(self, params):
+        """Response of the query API with the links generator; pages linked
+        from the first of 'titles', sorted by title, with continuation"""
+        title = params.get('titles', '').split('|')[0]
+        page = self.pages.get(titleKey(title))
+        if page is None:
+            return {'query': {'pages': [{'ns': 0, 'title': title,
+                                         'missing': True}]}}
+
+        linked = {unquote(t): False for t in PAT_LINK.findall(page)}
+        linked.update({unquote(html.unescape(t)): True
+                       for t in PAT_REDLINK.findall(page)})
+        if params.get('gplnamespace') == '0':
+            linked = {t: missing for t, missing in linked.items()
+                      if t.split(':', 1)[0] not in NAMESPACES}
+        titles = sorted(linked)
+
+        limit = params.get('gpllimit', '10')
+        limit = self.limit if limit == 'max' else min(int(limit), self.limit)
+        start = int(params.get('gplcontinue', 0))
+        batch = titles[start:start + limit]
+
+        pages = []
+        for t in batch:
+            if linked[t]:
+                pages.append({'ns': 0, 'title': t.replace('_', ' '),
+                              'missing': True})
+            else:
+                pages.append({'pageid': self.pageids.get(t, 0), 'ns': 0,
+                              'title': t.replace('_', ' ')})
+
+        data = {'query': {'pages': pages}}
+        if start + limit < len(titles):
+            data['continue'] = {'gplcontinue': str(start + limit),
+                                'continue': 'gplcontinue||'}
+        else:
+            data['batchcomplete'] = True
+
+        return data
+
+
+def addFaultArguments(parser):
+    """Add command line arguments for the `Faults` of a mock to an argparse
+    parser"""
+    parser.add_argument('--latency', choices=Faults.LATENCIES,
+                        default='none', help="latency distribution")
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help="scale of the latency distribution in ms; "
+                        + "default 20")
+    parser.add_argument('--sigma', type=float, default=1.0,
+                        help="shape of the lognormal latency; default 1.0")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="fraction of requests answered with HTTP "
+                        + "500, 502 or 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="fraction of requests answered with HTTP 429")
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help="'Retry-After' seconds of HTTP 429; default 1")
+    parser.add_argument('--drip-rate', type=float, default=0.0,
+                        help="fraction of responses sent slowly")
+    parser.add_argument('--drip-seconds', type=float, default=2.0,
+                        help="seconds to send a slow response over; "
+                        + "default 2")
+    parser.add_argument('--fault-prefix', default='USS_',
+                        help="title prefix of the requests to inject faults "
+                        + "into; default 'USS_' i.e. the vessel articles")
+
+
+def faultsFromArgs(args, seed=0):
+    """`Faults` from the arguments added by `addFaultArguments()`"""
+    return Faults(args.latency, args.latency_ms, args.sigma, args.error_rate,
+                  args.throttle_rate, args.retry_after, args.drip_rate,
+                  args.drip_seconds, args.fault_prefix or None, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100,
+                        help="number of synthetic pages; default 100")
+    parser.add_argument('--filler', type=int, default=150,
+                        help="paragraphs of article text per synthetic page")
+    parser.add_argument('--html-dir',
+                        help="serve the recorded '<title>.html' pages in this "
+                        + "directory instead of synthetic pages")
+    parser.add_argument('--port', type=int, default=8000)
+    addFaultArguments(parser)
+    args = parser.parse_args(argv)
+
+    mock = MockWiki.fromDirectory(args.html_dir) if args.html_dir else \
+        MockWiki.fromSynthetic(args.pages, filler=args.filler)
+    mock.faults = faultsFromArgs(args)
+    base_url = mock.start(args.port)
+    print(f"Serving {len(mock.pages):,} pages at {base_url}; e.g. "
+          + mock.articleURL(next(iter(mock.pages), '')))
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.stop()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Pattern hit-rate and cost profile for the normalizer pattern cascades.
+
+Runs the normalizers with `sswiki.profiling` enabled over `data/gc_data.csv`
+and the service history fixture `data/sh_fixture.csv`, or synthetic data,
+and prints the patterns ranked by cumulative time.
+
+Usage, from the repository root:
+    python benchmarks/profile_patterns.py --output patterns.csv
+    python benchmarks/profile_patterns.py --synthetic 100000
+"""
+import argparse
+import sys
+
+from bench_imports import DATA_DIR
+
+import pandas as pd
+
+import sswiki.constants as const
+import sswiki.profiling as profiling
+import sswiki.sswiki as sswiki
+import sswiki.utils as utils
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="number of synthetic rows to profile instead of "
+                        + "the shipped data")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output',
+                        help="file to write the report to; json if the file "
+                        + "name ends in .json, else csv")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        import synthetic
+        gc = synthetic.syntheticGC(args.synthetic, args.seed)
+        sh = synthetic.syntheticSH(args.synthetic, args.seed)
+    else:
+        gc = pd.read_csv(DATA_DIR / 'gc_data.csv', dtype='str',
+                         index_col='uuid')
+        sh = pd.read_csv(DATA_DIR / 'sh_fixture.csv', dtype='str',
+                         index_col='uuid')
+
+    profiling.enable()
+    profiling.reset()
+
+    gc = utils.dfStrNormalize(gc)
+    gc = sswiki.convertLinearMeasures(gc, const.LNMES_GC_COLS)
+    gc = sswiki.convertWeightMeasures(gc, const.WTMES_GC_COLS)
+    gc = sswiki.convertSpeedMeasures(gc, const.SPMES_GC_COLS)
+
+    sh = utils.dfStrNormalize(sh)
+    sh = sswiki.convertDates(sh, const.DT_SH_COLS)
+    sh = sswiki.convertHullNo(sh)
+    sh = sswiki.getFates(sh)
+
+    report = profiling.report()
+    with pd.option_context('display.max_rows', None,
+                           'display.width', 200,
+                           'display.max_colwidth', 40):
+        print(report.drop(columns='regex').to_string())
+
+    if args.output:
+        profiling.writeReport(args.output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,750 @@
+"""Synthetic vessel data generator for scale testing.
+
+Generates general characteristics (gc) and service history (sh) data frames
+with raw values shaped like scraped Wikipedia infobox data, and infobox HTML
+pages for the scraper, and multistream XML dumps for `sswiki.dump`. Output
+is deterministic for a given seed.
+
+Usage, from the repository root:
+    python benchmarks/synthetic.py --rows 1000000 --out-dir /tmp/synthetic
+    python benchmarks/synthetic.py --rows 100 --html --out-dir /tmp/synthetic
+    python benchmarks/synthetic.py --rows 1000 --dump --out-dir /tmp/synthetic
+"""
+import argparse
+import bz2
+from datetime import datetime
+import html
+import sys
+from urllib.parse import unquote
+from xml.sax.saxutils import escape
+import zlib
+
+from bench_imports import DATA_DIR  # noqa: F401 - sets up sswiki imports
+
+import numpy as np
+import pandas as pd
+
+import sswiki.constants as const
+import sswiki.country_names as cnames
+
+MONTHS = [datetime(1970, m, 1).strftime("%B") for m in range(1, 13)]
+
+# Group type to vessel type and hull types
+GROUP_TYPES = {
+    "Aircraft carriers": ("aircraft carrier", ["CV", "CVE", "CVL", "CVN"]),
+    "Battleships": ("battleship", ["BB"]),
+    "Cruisers": ("cruiser", ["CA", "CL", "CG"]),
+    "Destroyers": ("destroyer", ["DD", "DDG"]),
+    "Destroyer escorts": ("destroyer escort", ["DE"]),
+    "Submarines": ("submarine", ["SS", "SSN", "SSBN"]),
+    "Mine warfare vessels": ("minesweeper", ["AM", "AMc", "MSO", "YMS"]),
+    "Patrol vessels": ("patrol vessel", ["PC", "PG", "SP"]),
+    "Auxiliaries": ("auxiliary", ["AK", "AO", "AT", "ID", "IX"]),
+    "Amphibious warfare ships": ("landing ship", ["LST", "LSM(R)", "APA",
+                                                  "AKA"]),
+}
+
+BUILDERS = ["Bath Iron Works",
+            "Bath Iron Works, Bath, Maine",
+            "Newport News Shipbuilding",
+            "New York Navy Yard",
+            "Federal Shipbuilding and Drydock Company",
+            "Bethlehem Shipbuilding Corporation, Quincy",
+            "Electric Boat",
+            "Ingalls Shipbuilding",
+            "Mare Island Navy Yard",
+            "Consolidated Steel Corporation, Orange, Texas"]
+
+FATES = {
+    'fate_scrapped': ["Sold for scrap, {}", "Broken up {}", "Scrapped {}",
+                      "Dismantled {}", "Stricken {}"],
+    'fate_transferred': ["Transferred to Greece, {}", "Loaned to Brazil {}",
+                         "Museum ship since {}"],
+    'fate_sunk': ["Sunk by torpedo, {}", "Scuttled {}",
+                  "Struck mine off Normandy, {}", "Sunk as target {}",
+                  "Lost at sea with all hands {}"],
+    'fate_sold': ["Sold {}", "Sold into mercantile service {}"],
+    'fate_captured': ["Captured by Japanese forces, {}"],
+    'fate_cancelled': ["Cancelled {}"],
+}
+
+# Vocabulary for article text, so pages compress like prose
+WORDS = ("the ship was laid down launched commissioned decommissioned by at "
+         "in of and to from with for on after during before her she crew "
+         "captain navy fleet squadron task force convoy escort patrol duty "
+         "Pacific Atlantic Mediterranean Okinawa Guadalcanal Norfolk Boston "
+         "Pearl Harbor San Diego yard overhaul refit trials shakedown cruise "
+         "operations assigned returned sailed arrived departed reported "
+         "battle stars awarded service war reserve struck sold scrapped "
+         "torpedo gunfire aircraft attack damage repaired anchored port "
+         "harbor coast island squadron division flagship officer men").split()
+
+NAMES = ["Lang", "Fletcher", "Hornet", "Enterprise", "Hopper", "Kirk",
+         "Murrelet", "Token", "Vigilant", "Stamford", "Connole", "Power",
+         "Melvin", "Aloha", "Alsea", "Camden", "Heron", "Guide", "Richey"]
+
+
+def formatDates(rng, n, ref_rate=0.05):
+    """Random dates formatted as per the `const.DATE_PATS` formats
+
+    Keyword arguments:
+    rng -- numpy random generator
+    n -- Number of dates
+    ref_rate -- Proportion of dates with a Wikipedia reference marker e.g.
+        '[1]'
+
+    Return:
+    A numpy array of date strings
+    """
+    day = rng.integers(1, 29, n)
+    month = rng.integers(1, 13, n)
+    year = rng.integers(1797, 2024, n)
+    fmt = rng.choice(list(const.DATE_PATS), n)
+    ref = np.where(rng.random(n) < ref_rate,
+                   np.char.add('[', np.char.add(
+                       rng.integers(1, 10, n).astype(str), ']')), '')
+
+    seasons = {'Winter YYYY': 'Winter ', 'Early YYYY': 'Early ',
+               'Spring YYYY': 'Spring ', 'Mid YYYY': 'Mid-',
+               'Summer YYYY': 'Summer ', 'Late YYYY': 'Late ',
+               'End YYYY': 'End of '}
+
+    d = pd.Series(day.astype(str))
+    dd = pd.Series(np.char.zfill(day.astype(str), 2))
+    mm = pd.Series(np.char.zfill(month.astype(str), 2))
+    y = pd.Series(year.astype(str))
+    name = pd.Series(np.array(MONTHS, dtype=object)[month - 1])
+    r = pd.Series(ref)
+
+    formats = {
+        'DD MMMMMM YYYY': d + r + ' ' + name + ' ' + y,
+        'MMMMMM DD, YYYY': name + ' ' + d + r + ', ' + y,
+        'MMM. DD, YYYY': name.str[:3] + '. ' + d + ', ' + y,
+        'YYYY-MM-DD': y + '-' + mm + '-' + dd,
+        'DD/MM/YYYY': d + '/' + mm + '/' + y,
+        'MMMMMM YYYY': name + ' ' + y + r,
+        'YYYY': y + r,
+    }
+    formats.update({f: season + y for f, season in seasons.items()})
+
+    dates = np.empty(n, dtype=object)
+    for f, values in formats.items():
+        dates[fmt == f] = values.values[fmt == f]
+
+    return dates
+
+
+def formatLengths(rng, n):
+    """Random linear measures in feet and inches or metres"""
+    ft = rng.integers(20, 1100, n)
+    inch = rng.integers(0, 12, n)
+    metres = np.round(ft * const.FT_TO_M + inch * const.IN_TO_M, 1)
+    fmt = rng.integers(0, 5, n)
+    refs = rng.choice(['', ' [1]'], n)
+
+    values = []
+    for f, i, m, k, r in zip(ft, inch, metres, fmt, refs):
+        if k == 0:
+            values.append(f"{f} ft {i} in ({m} m)")
+        elif k == 1:
+            values.append(f"{f} ft ({m:.0f} m)")
+        elif k == 2:
+            values.append(f"{m} m ({f} ft)")
+        elif k == 3:
+            values.append(f"{f}' {i}\"")
+        else:
+            values.append(f"{f} feet{r}")
+
+    return np.array(values, dtype=object)
+
+
+def formatWeights(rng, n):
+    """Random displacements in long, short or metric tons"""
+    tons = rng.integers(10, 100000, n)
+    fmt = rng.integers(0, 5, n)
+
+    values = []
+    for t, k in zip(tons, fmt):
+        qty = f"{t:,}"
+        if k == 0:
+            values.append(f"{qty} long tons ({t * const.LTONS_TO_MTONS:,.0f}"
+                          + " t) standard")
+        elif k == 1:
+            values.append(f"{qty} tons light; {t * 1.3:,.0f} tons full load")
+        elif k == 2:
+            values.append(f"{qty} t")
+        elif k == 3:
+            values.append(f"{qty} short tons")
+        else:
+            values.append(f"{t}")
+
+    return np.array(values, dtype=object)
+
+
+def formatSpeeds(rng, n):
+    """Random speeds in knots or miles per hour"""
+    knots = np.round(rng.uniform(4, 35, n), 1)
+    fmt = rng.integers(0, 4, n)
+
+    values = []
+    for s, k in zip(knots, fmt):
+        if k == 0:
+            values.append(f"{s} knots ({s * 1.852:.0f} km/h; "
+                          + f"{s / const.MPH_TO_KNTS:.0f} mph)")
+        elif k == 1:
+            values.append(f"{s / const.MPH_TO_KNTS:.0f} mph")
+        elif k == 2:
+            values.append(f"{s:.0f} kn[1]")
+        else:
+            values.append(f"{s:.0f}+ knots")
+
+    return np.array(values, dtype=object)
+
+
+def choiceByKey(rng, keys, options):
+    """Random choice from `options[key]` for each key in `keys`
+
+    Keyword arguments:
+    rng -- numpy random generator
+    keys -- A numpy array of keys
+    options -- Dictionary of key to list of options
+
+    Return:
+    A numpy array of the chosen options
+    """
+    chosen = np.empty(len(keys), dtype=object)
+    picks = rng.random(len(keys))
+    for key, values in options.items():
+        mask = keys == key
+        values = np.array(values, dtype=object)
+        chosen[mask] = values[(picks[mask] * len(values)).astype(int)]
+
+    return chosen
+
+
+def vesselNames(rng, n):
+    """Random vessel names, hull types and numbers"""
+    groups = rng.choice(list(GROUP_TYPES), n)
+    hts = choiceByKey(rng, groups,
+                      {g: hts for g, (_, hts) in GROUP_TYPES.items()})
+    hns = rng.integers(1, 2000, n)
+    names = rng.choice(NAMES, n)
+
+    return groups, hts, hns, names
+
+
+def vesselURLs(groups, hts, hns, names, base_url=const.BASE_URL):
+    """Vessel article and group list urls"""
+    urls = [f"{base_url}/wiki/USS_{name}_({ht}-{hn})"
+            for name, ht, hn in zip(names, hts, hns)]
+    group_urls = [f"{base_url}/wiki/List_of_"
+                  + f"{g.lower().replace(' ', '_')}_of_the_United_States_Navy"
+                  for g in groups]
+
+    return np.array(urls, dtype=object), np.array(group_urls, dtype=object)
+
+
+def uuids(rng, n):
+    """Random 32 character hex uuids"""
+    return np.array([f"{a:016x}{b:016x}" for a, b in
+                     rng.integers(0, 2**63, (n, 2), dtype=np.int64)],
+                    dtype=object)
+
+
+def syntheticGC(n, seed=0, base_url=const.BASE_URL):
+    """Synthetic general characteristics data
+
+    Keyword arguments:
+    n -- Number of rows
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+
+    Return:
+    A pandas data frame indexed by 'uuid' with the `const.GC_COLS` columns
+    and vessel links
+    """
+    rng = np.random.default_rng(seed)
+    groups, hts, hns, names = vesselNames(rng, n)
+    urls, group_urls = vesselURLs(groups, hts, hns, names, base_url)
+
+    gc = pd.DataFrame({
+        'Beam': formatLengths(rng, n),
+        'Draft': formatLengths(rng, n),
+        'Length': formatLengths(rng, n),
+        'Displacement': formatWeights(rng, n),
+        'Speed': formatSpeeds(rng, n),
+        'Class and type': [f"{name}-class {GROUP_TYPES[g][0]}"
+                           for name, g in zip(rng.choice(NAMES, n), groups)],
+        'Type': [GROUP_TYPES[g][0].capitalize() for g in groups],
+        'vessel_url': urls,
+        'group_type': groups,
+        'group_type_url': group_urls,
+    }, index=pd.Index(uuids(rng, n), name='uuid'))
+
+    return gc.reindex(columns=const.GC_COLS + const.VL_COLS).astype(object)
+
+
+def syntheticSH(n, seed=0, base_url=const.BASE_URL):
+    """Synthetic service history data
+
+    Keyword arguments:
+    n -- Number of rows
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+
+    Return:
+    A pandas data frame indexed by 'uuid' with the `const.SH_COLS` columns,
+    vessel links and country
+    """
+    rng = np.random.default_rng(seed + 1)
+    groups, hts, hns, names = vesselNames(rng, n)
+    urls, group_urls = vesselURLs(groups, hts, hns, names, base_url)
+
+    fate_cols = rng.choice(list(FATES), n)
+    fates = [fate.format(date) for fate, date in
+             zip(choiceByKey(rng, fate_cols, FATES), formatDates(rng, n))]
+
+    operators = rng.choice(list(cnames.REPL) + cnames.IN_USE, n)
+    blank = rng.random((n, 3)) < 0.2
+
+    sh = pd.DataFrame({
+        'Laid down': formatDates(rng, n),
+        'Launched': formatDates(rng, n),
+        'Commissioned': formatDates(rng, n),
+        'Decommissioned': np.where(blank[:, 0], None, formatDates(rng, n)),
+        'Recommissioned': np.where(~blank[:, 1], None, formatDates(rng, n)),
+        'Stricken': np.where(blank[:, 2], None, formatDates(rng, n)),
+        'Builder': rng.choice(BUILDERS, n),
+        'Fate': fates,
+        'Identification': [f"Hull symbol: {ht}-{hn}" if k else
+                           f"{ht}-{hn}" for ht, hn, k in
+                           zip(hts, hns, rng.integers(0, 2, n))],
+        'Name': [f"USS {name}" for name in names],
+        'Operator': operators,
+        'vessel_url': urls,
+        'group_type': groups,
+        'group_type_url': group_urls,
+        'country': [cnames.resolveCountry(op) for op in operators],
+    }, index=pd.Index(uuids(rng, n), name='uuid'))
+
+    return sh.reindex(columns=const.SH_COLS + const.VL_COLS + ['country']).\
+        astype(object)
+
+
+def infoboxRow(desc, data):
+    """Html infobox table row"""
+    return (f"<tr><th>{html.escape(str(desc))}</th>"
+            + f"<td>{html.escape(str(data))}</td></tr>")
+
+
+def infoboxHeader(text):
+    """Html infobox table section header row"""
+    return f'<tr><th colspan="2">{html.escape(text)}</th></tr>'
+
+
+def syntheticInfobox(gc_row, sh_rows, filler=0):
+    """Synthetic vessel article html page with an infobox
+
+    Keyword arguments:
+    gc_row -- A pandas series of general characteristics data
+    sh_rows -- List of pandas series of service history data, one for each
+        service history section of the infobox
+    filler -- Number of paragraphs of article text after the infobox; the
+        first in the lead section, the rest in a 'Service history' section
+
+    Return:
+    String html page
+    """
+    rows = ['<tr><td colspan="2">[image]</td></tr>',
+            infoboxHeader("History")]
+    for sh_row in sh_rows:
+        rows.append(infoboxHeader(sh_row.get('country') or "United States"))
+        for col in ['Name'] + [c for c in const.SH_COLS if c != 'Name']:
+            if isinstance(sh_row.get(col), str):
+                rows.append(infoboxRow(col, sh_row[col]))
+
+    rows.append(infoboxHeader("General characteristics"))
+    for col in const.GC_COLS:
+        if isinstance(gc_row.get(col), str):
+            rows.append(infoboxRow(col, gc_row[col]))
+
+    name = html.escape(str(sh_rows[0].get('Name', 'USS Vessel')))
+
+    rng = np.random.default_rng(zlib.crc32(name.encode()))
+    paragraphs = ["<p>" + " ".join(rng.choice(WORDS, 100)) + ".</p>"
+                  for _ in range(filler)]
+    body = "".join(paragraphs[:1])
+    if filler > 1:
+        body += "<h2>Service history</h2>" + "".join(paragraphs[1:])
+
+    return ("<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            + f"<title>{name} - Wikipedia</title></head><body>"
+            + f"<h1>{name}</h1>"
+            + '<table class="infobox">' + "".join(rows) + "</table>"
+            + body
+            + "</body></html>")
+
+
+def syntheticInfoboxes(n, seed=0, base_url=const.BASE_URL, filler=0):
+    """Synthetic vessel article html pages
+
+    Keyword arguments:
+    n -- Number of pages
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+    filler -- Number of paragraphs of article text after each infobox
+
+    Return:
+    A dictionary of vessel article url to string html page
+    """
+    gc = syntheticGC(n, seed, base_url)
+    sh = syntheticSH(n, seed, base_url)
+    sh['vessel_url'] = gc['vessel_url'].values
+
+    pages = {}
+    for (_, gc_row), (_, sh_row) in zip(gc.iterrows(), sh.iterrows()):
+        pages[gc_row['vessel_url']] = syntheticInfobox(gc_row, [sh_row],
+                                                       filler)
+
+    return pages
+
+
+def syntheticListPages(n, seed=0, base_url=const.BASE_URL, filler=0):
+    """Synthetic vessel group list html pages, e.g. 'List of destroyers of
+    the United States Navy', linking to the vessel pages from
+    `syntheticInfoboxes()`
+
+    Each page has a table with a row for each vessel in the group, a missing
+    vessel ("red link"), and a navigation box linking to the other group
+    list pages.
+
+    Keyword arguments:
+    n -- Number of vessels
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+    filler -- Number of words of description for each vessel
+
+    Return:
+    A dictionary of group list url to string html page
+    """
+    rng = np.random.default_rng(seed)
+    groups, hts, hns, names = vesselNames(rng, n)
+    urls, group_urls = vesselURLs(groups, hts, hns, names, base_url)
+
+    rows = {}
+    for url, group_url, ht, hn in zip(urls, group_urls, hts, hns):
+        href = url[len(base_url):]
+        text = " ".join(rng.choice(WORDS, filler))
+        rows.setdefault(group_url, []).append(
+            f'<tr><td><a href="{html.escape(href)}">'
+            + f"{html.escape(unquote(href.rsplit('/', 1)[-1]))}</a></td>"
+            + f"<td>{ht}-{hn}</td><td>{text}</td></tr>")
+
+    navbox = ('<table class="navbox">'
+              + "".join(f'<a href="{g[len(base_url):]}">{g.rsplit("/", 1)[-1]}'
+                        + "</a>" for g in sorted(rows))
+              + '<a href="/wiki/United_States_Navy">United States Navy</a>'
+              + '<a href="/wiki/Category:Lists_of_ships">Lists of ships</a>'
+              + "</table>")
+
+    pages = {}
+    for group_url, group_rows in rows.items():
+        title = html.escape(group_url.rsplit('/', 1)[-1].replace('_', ' '))
+        redlink = ('<tr><td><a href="/w/index.php?title=USS_Unbuilt_(XX-0)'
+                   + '&amp;action=edit&amp;redlink=1" class="new">'
+                   + "USS Unbuilt</a></td><td>XX-0</td><td></td></tr>")
+        pages[group_url] = (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            + f"<title>{title} - Wikipedia</title></head><body>"
+            + f"<h1>{title}</h1>"
+            + '<table class="wikitable">' + "".join(group_rows) + redlink
+            + "</table>" + navbox
+            + "</body></html>")
+
+    return pages
+
+
+def syntheticListOfLists(n, seed=0, base_url=const.BASE_URL):
+    """Synthetic 'List of United States Navy ships' html page, with an
+    infobox row of links to the group list pages from
+    `syntheticListPages()` after the "by type" row, as read by
+    `sswiki.scrapeForGroupListsURLs()`
+
+    Keyword arguments:
+    n -- Number of vessels
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+
+    Return:
+    A dictionary of the list of lists url to string html page
+    """
+    rng = np.random.default_rng(seed)
+    groups, hts, hns, names = vesselNames(rng, n)
+    _, group_urls = vesselURLs(groups, hts, hns, names, base_url)
+
+    links = "".join(
+        f'<a href="{html.escape(g[len(base_url):])}">'
+        + f"{html.escape(unquote(g.rsplit('/', 1)[-1]).replace('_', ' '))}"
+        + "</a> " for g in sorted(set(group_urls)))
+    title = "List of United States Navy ships"
+
+    return {f"{base_url}/wiki/{title.replace(' ', '_')}": (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        + f"<title>{title} - Wikipedia</title></head><body>"
+        + f"<h1>{title}</h1>"
+        + '<table class="infobox"><tr><th>Lists of ships</th></tr>'
+        + "<tr><th>Ships by type</th></tr>"
+        + f"<tr><td>{links}</td></tr></table>"
+        + "</body></html>")}
+
+
+def syntheticOtherPages(n, seed=0, base_url=const.BASE_URL, filler=150):
+    """Synthetic html pages that are linked like vessel articles but are not
+    individual ships: a disambiguation page for each vessel name listing
+    the vessels of that name, and a museum page with a non ship infobox for
+    each of the first `n` // 10 vessels
+
+    Keyword arguments:
+    n -- Number of vessels, as for `syntheticInfoboxes()`
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+    filler -- Number of paragraphs of article text on museum pages
+
+    Return:
+    A dictionary of url to string html page
+    """
+    rng = np.random.default_rng(seed)
+    groups, hts, hns, names = vesselNames(rng, n)
+    urls, _ = vesselURLs(groups, hts, hns, names, base_url)
+
+    vessels = {}
+    for url, name in zip(urls, names):
+        vessels.setdefault(name, []).append(url)
+
+    pages = {}
+    for name, name_urls in vessels.items():
+        links = "".join(f'<li><a href="{html.escape(u[len(base_url):])}">'
+                        + f"{html.escape(unquote(u.rsplit('/', 1)[-1]))}"
+                        + "</a></li>" for u in name_urls)
+        pages[f"{base_url}/wiki/USS_{name}"] = (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            + f"<title>USS {name} - Wikipedia</title></head><body>"
+            + f"<h1>USS {name}</h1><p>USS {name} may refer to:</p>"
+            + f"<ul>{links}</ul>"
+            + '<div id="disambigbox">This page lists ships with the same '
+            + "name.</div></body></html>")
+
+    for url, name in zip(urls[:n // 10], names):
+        rows = [infoboxRow("Established", "1975"),
+                infoboxRow("Location", "Pier 1, Norfolk, Virginia"),
+                infoboxRow("Type", "Maritime museum")]
+        museum = f"USS {name} Museum"
+        rng_text = np.random.default_rng(zlib.crc32(museum.encode()))
+        body = "".join("<p>" + " ".join(rng_text.choice(WORDS, 100))
+                       + ".</p>" for _ in range(filler))
+        pages[f"{base_url}/wiki/USS_{name}_Museum"] = (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            + f"<title>{museum} - Wikipedia</title></head><body>"
+            + f"<h1>{museum}</h1>"
+            + '<table class="infobox vcard">' + "".join(rows) + "</table>"
+            + body + "</body></html>")
+
+    return pages
+
+
+def infoboxParam(col):
+    """Ship infobox template parameter of an infobox row label e.g.
+    'Class and type' as 'Ship class'; see `const.WIKITEXT_LABELS`"""
+    params = {label: key for key, label in const.WIKITEXT_LABELS.items()}
+
+    return params.get(col, "Ship " + col[:1].lower() + col[1:])
+
+
+def syntheticWikitext(gc_row, sh_rows, filler=0):
+    """Synthetic vessel article wikitext with ship infobox templates, with
+    the same data as `syntheticInfobox()`
+
+    Keyword arguments:
+    gc_row -- A pandas series of general characteristics data
+    sh_rows -- List of pandas series of service history data, one for each
+        {{Infobox ship career}}
+    filler -- Number of paragraphs of article text after the infobox
+
+    Return:
+    String wikitext
+    """
+    lines = ["{{Infobox ship begin}}",
+             "{{Infobox ship image", "|Ship image=", "}}"]
+    for sh_row in sh_rows:
+        lines += ["{{Infobox ship career", "|Hide header=",
+                  f"|Ship country={sh_row.get('country') or 'United States'}",
+                  "|Ship flag={{USN flag|1945}}"]
+        lines += [f"|{infoboxParam(col)}={sh_row[col]}"
+                  for col in ['Name'] + [c for c in const.SH_COLS
+                                         if c != 'Name']
+                  if isinstance(sh_row.get(col), str)]
+        lines.append("}}")
+
+    lines += ["{{Infobox ship characteristics", "|Hide header=",
+              "|Header caption="]
+    lines += [f"|{infoboxParam(col)}={gc_row[col]}" for col in const.GC_COLS
+              if isinstance(gc_row.get(col), str)]
+    lines.append("}}")
+
+    name = str(sh_rows[0].get('Name', 'USS Vessel'))
+    rng = np.random.default_rng(zlib.crc32(html.escape(name).encode()))
+    paragraphs = [" ".join(rng.choice(WORDS, 100)) + "." for _ in
+                  range(filler)]
+    if filler > 1:
+        paragraphs.insert(1, "==Service history==")
+
+    return "\n".join(lines) + "\n" + "\n\n".join(paragraphs)
+
+
+def syntheticWikitexts(n, seed=0, base_url=const.BASE_URL, filler=0):
+    """Synthetic vessel article wikitext, of the same vessels as
+    `syntheticInfoboxes()`
+
+    Keyword arguments:
+    n -- Number of pages
+    seed -- Random seed
+    base_url -- Base url of vessel article urls
+    filler -- Number of paragraphs of article text after each infobox
+
+    Return:
+    A dictionary of vessel article url to string wikitext
+    """
+    gc = syntheticGC(n, seed, base_url)
+    sh = syntheticSH(n, seed, base_url)
+
+    return {gc_row['vessel_url']: syntheticWikitext(gc_row, [sh_row], filler)
+            for (_, gc_row), (_, sh_row) in zip(gc.iterrows(), sh.iterrows())}
+
+
+def syntheticDumpPages(n, seed=0, filler=0, others=20):
+    """Synthetic pages of a 'pages-articles' dump: vessel articles with the
+    data of `syntheticInfoboxes()`, redirects to them, and `others` pages of
+    other articles for each vessel, in random order as in page id order
+
+    Keyword arguments:
+    n -- Number of vessel articles
+    seed -- Random seed
+    filler -- Number of paragraphs of article text of each page
+    others -- Number of other pages for each vessel article
+
+    Return:
+    A list of dictionaries with keys 'title', 'ns', 'redirect' (the title
+    of the redirect target, or None) and 'text'
+    """
+    gc = syntheticGC(n, seed)
+    sh = syntheticSH(n, seed)
+
+    pages = []
+    for (_, gc_row), (_, sh_row) in zip(gc.iterrows(), sh.iterrows()):
+        title = unquote(gc_row['vessel_url'].rsplit('/wiki/', 1)[-1]).\
+            replace('_', ' ')
+        pages.append({'title': title, 'ns': '0', 'redirect': None,
+                      'text': syntheticWikitext(gc_row, [sh_row], filler)})
+        if '(' in title:
+            pages.append({'title': title.replace('-', '', 1), 'ns': '0',
+                          'redirect': title,
+                          'text': f"#REDIRECT [[{title}]]"})
+
+    rng = np.random.default_rng(seed)
+    for k in range(n * others):
+        words = rng.choice(WORDS, 2 + k % 3)
+        text = "\n\n".join(" ".join(rng.choice(WORDS, 100))
+                           for _ in range(filler))
+        pages.append({'title': " ".join(words).capitalize() + f" {k}",
+                      'ns': '0' if k % 10 else '14', 'redirect': None,
+                      'text': text})
+
+    return [pages[i] for i in rng.permutation(len(pages))]
+
+
+def writeDump(pages, dump_path, index_path=None, pages_per_stream=100):
+    """Write pages as a bz2 multistream 'pages-articles' XML dump, and its
+    index, as per the Wikimedia dumps
+
+    The site info and the closing tag are in streams of their own, and each
+    page stream has `pages_per_stream` pages; the index has a line
+    'offset:page id:title' for each page.
+
+    Keyword arguments:
+    pages -- List of page dictionaries as per `syntheticDumpPages()`
+    dump_path -- File name of the dump
+    index_path -- File name of the index, bz2 compressed; ignored if None
+    pages_per_stream -- Number of pages in each stream
+    """
+    header = ('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" '
+              + 'version="0.11" xml:lang="en">\n  <siteinfo>\n'
+              + '    <sitename>Wikipedia</sitename>\n'
+              + '    <dbname>enwiki</dbname>\n  </siteinfo>\n')
+
+    index = []
+    with open(dump_path, 'wb') as f:
+        f.write(bz2.compress(header.encode('utf-8')))
+        for start in range(0, len(pages), pages_per_stream):
+            offset = f.tell()
+            xml = []
+            for pageid, page in enumerate(
+                    pages[start:start + pages_per_stream], start + 1):
+                redirect = '' if page['redirect'] is None else \
+                    f'    <redirect title="{escape(page["redirect"])}" />\n'
+                xml.append(
+                    f"  <page>\n    <title>{escape(page['title'])}</title>\n"
+                    + f"    <ns>{page['ns']}</ns>\n"
+                    + f"    <id>{pageid}</id>\n{redirect}"
+                    + f"    <revision>\n      <id>{pageid}</id>\n"
+                    + '      <text bytes="'
+                    + f'{len(page["text"].encode("utf-8"))}" '
+                    + f'xml:space="preserve">{escape(page["text"])}</text>\n'
+                    + "    </revision>\n  </page>\n")
+                index.append(f"{offset}:{pageid}:{page['title']}\n")
+            f.write(bz2.compress("".join(xml).encode('utf-8')))
+        f.write(bz2.compress(b'</mediawiki>\n'))
+
+    if index_path is not None:
+        with bz2.open(index_path, 'wt', encoding='utf-8') as f:
+            f.writelines(index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000,
+                        help="number of gc and sh rows; default 100,000")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', required=True,
+                        help="directory to write the data to")
+    parser.add_argument('--html', action='store_true',
+                        help="also write an infobox html page for each row")
+    parser.add_argument('--dump', action='store_true',
+                        help="also write a multistream XML dump with a "
+                        + "vessel article for each row, and its index")
+    args = parser.parse_args(argv)
+
+    from pathlib import Path
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    syntheticGC(args.rows, args.seed).to_csv(out_dir / 'gc_synthetic.csv')
+    syntheticSH(args.rows, args.seed).to_csv(out_dir / 'sh_synthetic.csv')
+
+    if args.html:
+        html_dir = out_dir / 'html'
+        html_dir.mkdir(exist_ok=True)
+        pages = syntheticInfoboxes(args.rows, args.seed)
+        for url, page in pages.items():
+            file_name = url.rsplit('/', 1)[-1] + '.html'
+            (html_dir / file_name).write_text(page, encoding='utf-8')
+
+    if args.dump:
+        writeDump(syntheticDumpPages(args.rows, args.seed),
+                  out_dir / 'pages-articles-multistream.xml.bz2',
+                  out_dir / 'pages-articles-multistream-index.txt.bz2')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,4 +7,11 @@ sys.path.insert(0, path)
 
 import sswiki.utils as utils
 import sswiki.constants as const
+import sswiki.crawler as crawler
+import sswiki.dump as dump
+import sswiki.fetch as fetch
+import sswiki.memtrace as memtrace
+import sswiki.metrics as metrics
+import sswiki.parallel as parallel
+import sswiki.prefilter as prefilter
 import sswiki.sswiki as sswiki
@@ -1,4 +1,10 @@
-from script_imports import utils, const, sswiki
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import logging
+
+from script_imports import const, crawler, dump, fetch, memtrace, \
+    metrics, parallel, prefilter, sswiki, utils
 
 # For GitBash on Windows 10
 # sys.stdin.reconfigure(encoding='utf-8')
@@ -6,36 +12,175 @@ from script_imports import utils, const, sswiki
 
 # Script static variables
 ARTICLE_PATTERN = "wiki/USS_"
+DUMP_TITLE_PREFIX = "USS "
 LISTS_OF_LISTS_URL = const.BASE_URL + "/wiki/List_of_United_States_Navy_ships"
 
 FN_GC_DATA = 'gc_data.csv'
 FN_SH_DATA = 'sh_data.csv'
 FC_ERRORS = 'errors.csv'
+FN_SKIP_URLS = 'skip_urls.csv'
+FN_CRAWL_VISITED = 'crawl_visited.csv'
+FN_GC_RETRY = 'gc_retry.csv'
+FN_SH_RETRY = 'sh_retry.csv'
+FN_RUN_REPORT = 'run_report.json'
+FN_RUN_METRICS = 'run_metrics.prom'
+FN_MEM_PROFILE = 'memory_profile.json'
+
+parser = argparse.ArgumentParser(
+    description="Scrape and normalize US Navy vessel data from Wikipedia")
+parser.add_argument('--normalize-only', action='store_true',
+                    help="skip scraping and normalize the existing data files")
+parser.add_argument('--chunksize', type=int,
+                    help="normalize the data files in chunks of this many "
+                    + "rows, bounding memory by the chunk size")
+parser.add_argument('--engine', choices=['c', 'pyarrow'], default='c',
+                    help="CSV parser; pyarrow is multithreaded and requires "
+                    + "the pyarrow package")
+parser.add_argument('--workers', type=int,
+                    help="normalize with this many worker processes across "
+                    + "columns and row partitions")
+parser.add_argument('--scrape-workers', type=int, default=1,
+                    help="scrape vessel articles with this many threads; "
+                    + "requests are paced by the adaptive rate controller")
+parser.add_argument('--fetch-mode', choices=['page', 'lead', 'wikitext'],
+                    default='page',
+                    help="get full vessel articles, only their lead "
+                    + "section with the infobox from the parse API, or the "
+                    + "wikitext of the lead section")
+parser.add_argument('--links-mode', choices=['page', 'api'], default='page',
+                    help="find vessel links in the html of the lists "
+                    + "articles, or with the MediaWiki links API")
+parser.add_argument('--crawl-pages', type=int, default=0,
+                    help="follow links from the vessel articles to find "
+                    + "vessels not in the lists articles, fetching at most "
+                    + "this many pages; pages visited are kept, so later "
+                    + "runs extend the crawl")
+parser.add_argument('--crawl-depth', type=int, default=2,
+                    help="follow at most this many links from the vessel "
+                    + "articles in the lists articles; default 2")
+parser.add_argument('--prefilter', action='store_true',
+                    help="drop links to pages that are not individual ship "
+                    + "articles using page metadata, before scraping")
+parser.add_argument('--retry-errors', action='store_true',
+                    help="scrape again only the urls with transient errors "
+                    + "in the errors file, and merge the recovered vessels "
+                    + "into the data files")
+parser.add_argument('--deadline', type=float,
+                    help="seconds to get the whole of each response in, "
+                    + f"default {const.FETCH_DEADLINE}")
+parser.add_argument('--hedge-percent', type=float,
+                    help="send a second request for vessel articles not "
+                    + "answered after the rolling 95th percentile latency, "
+                    + "for at most this percent of requests")
+parser.add_argument('--dump',
+                    help="read the vessel articles from this bz2 "
+                    + "'pages-articles' XML dump instead of scraping")
+parser.add_argument('--dump-index',
+                    help="index of a multistream dump, so streams without "
+                    + "vessel articles are not read")
+args = parser.parse_args()
+
+if args.deadline:
+    const.FETCH_DEADLINE = args.deadline
+if args.hedge_percent:
+    fetch.HEDGER = fetch.Hedger(max_fraction=args.hedge_percent / 100)
+
+# Progress as log output; set level to logging.WARNING for quiet runs
+logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 # First find a list of vessels by type (e.g. battleship)
 # The lists of lists url points to an article that has a list of the Navy ships
 # by type (e.g. list of aircraft carriers, list of battleships)
-group_lists = sswiki.scrapeForGroupListsURLs(LISTS_OF_LISTS_URL)
-
-# Now find the links to each vessel article,
-# then scrape the data from each article
-vessel_links = sswiki.getVesselLinks(group_lists, ARTICLE_PATTERN)
-gc, sh = sswiki.getVesselData(vessel_links, FN_GC_DATA, FN_SH_DATA, FC_ERRORS)
-
-# Format general characteristics
-gc = utils.loadVesselData(const.DATA_DIR + FN_GC_DATA, index_col='uuid')
-gc = utils.dfStrNormalize(gc)
-gc = sswiki.convertLinearMeasures(gc, const.LNMES_GC_COLS)
-gc = sswiki.convertWeightMeasures(gc, const.WTMES_GC_COLS)
-gc = sswiki.convertSpeedMeasures(gc, const.SPMES_GC_COLS)
-gc.to_csv(const.DATA_DIR + 'gc_data.csv')
-print("Finished general characteristics\n")
-
-# Format service history
-sh = utils.loadVesselData(const.DATA_DIR + FN_SH_DATA, index_col='uuid')
-sh = utils.dfStrNormalize(sh)
-sh = sswiki.convertDates(sh, const.DT_SH_COLS)
-sh = sswiki.convertHullNo(sh)
-sh = sswiki.getFates(sh)
-sh.to_csv(const.DATA_DIR + 'sh_data.csv')
-print("Finished service history\n")
+if args.dump and not args.normalize_only:
+    # Vessel articles from a dump, read in parallel with no network
+    with memtrace.stage('dump'):
+        gc, sh = dump.ingestDump(args.dump, args.dump_index,
+                                 DUMP_TITLE_PREFIX, args.workers,
+                                 FN_GC_DATA, FN_SH_DATA)
+elif not args.normalize_only and not args.retry_errors:
+    with memtrace.stage('scrape'):
+        group_lists = sswiki.scrapeForGroupListsURLs(LISTS_OF_LISTS_URL)
+
+        # Now find the links to each vessel article,
+        # then scrape the data from each article; urls with permanent errors
+        # in previous crawls are skipped
+        vessel_links = sswiki.getVesselLinks(group_lists, ARTICLE_PATTERN,
+                                             args.links_mode)
+        if args.crawl_pages:
+            vessel_links = crawler.crawlVesselLinks(
+                vessel_links, ARTICLE_PATTERN, args.crawl_depth,
+                args.crawl_pages, args.scrape_workers, args.links_mode,
+                FN_CRAWL_VISITED)
+        if args.prefilter:
+            vessel_links = prefilter.prefilterVesselLinks(vessel_links)
+        gc, sh = sswiki.getVesselData(vessel_links, FN_GC_DATA, FN_SH_DATA,
+                                      FC_ERRORS,
+                                      workers=args.scrape_workers,
+                                      mode=args.fetch_mode,
+                                      skip_csv=FN_SKIP_URLS)
+        if args.prefilter:
+            prefilter.recordSavings()
+
+if args.retry_errors:
+    # Normalize the recovered vessels as for a full crawl, then merge them
+    # into the data files
+    with memtrace.stage('retry errors'):
+        gc, sh = sswiki.retryErrors(FC_ERRORS, FN_SKIP_URLS,
+                                    workers=args.scrape_workers,
+                                    mode=args.fetch_mode)
+        for df, retry_csv, data_csv, normalize in [
+                (gc, FN_GC_RETRY, FN_GC_DATA, sswiki.normalizeGC),
+                (sh, FN_SH_RETRY, FN_SH_DATA, sswiki.normalizeSH)]:
+            if len(df) > 0:
+                utils.writeVesselData(df, retry_csv, index_label='uuid')
+                sswiki.normalizeFile(retry_csv, normalize, engine=args.engine)
+                sswiki.mergeVesselData(
+                    utils.loadVesselData(retry_csv, args.engine,
+                                         index_col='uuid'),
+                    data_csv, args.engine)
+    logging.info("Finished retrying errors\n")
+elif args.workers and not args.chunksize:
+    # Format general characteristics and service history at the same time
+    with memtrace.stage('normalize'), \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        gc = utils.loadVesselData(FN_GC_DATA, args.engine, index_col='uuid')
+        sh = utils.loadVesselData(FN_SH_DATA, args.engine, index_col='uuid')
+        gc, sh = parallel.normalizeMany([(gc, 'gc'), (sh, 'sh')],
+                                        args.workers, executor=pool)
+        utils.writeVesselData(gc, FN_GC_DATA)
+        utils.writeVesselData(sh, FN_SH_DATA)
+    logging.info("Finished general characteristics and service history\n")
+else:
+    normalize_gc, normalize_sh = sswiki.normalizeGC, sswiki.normalizeSH
+    pool = None
+    if args.workers:
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+        normalize_gc = functools.partial(parallel.normalizeParallel,
+                                         kind='gc', workers=args.workers,
+                                         executor=pool)
+        normalize_sh = functools.partial(parallel.normalizeParallel,
+                                         kind='sh', workers=args.workers,
+                                         executor=pool)
+
+    # Format general characteristics
+    with memtrace.stage('normalize gc'):
+        sswiki.normalizeFile(FN_GC_DATA, normalize_gc,
+                             chunksize=args.chunksize, engine=args.engine)
+    logging.info("Finished general characteristics\n")
+
+    # Format service history
+    with memtrace.stage('normalize sh'):
+        sswiki.normalizeFile(FN_SH_DATA, normalize_sh,
+                             chunksize=args.chunksize, engine=args.engine)
+    logging.info("Finished service history\n")
+
+    if pool is not None:
+        pool.shutdown()
+
+# Machine readable run report and Prometheus textfile
+metrics.writeReport(const.DATA_DIR + FN_RUN_REPORT)
+metrics.writePrometheus(const.DATA_DIR + FN_RUN_METRICS)
+
+# Per stage memory profile when run with SSWIKI_MEMTRACE=1
+if memtrace.ENABLED:
+    memtrace.writeProfile(const.DATA_DIR + FN_MEM_PROFILE)
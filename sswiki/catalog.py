@@ -0,0 +1,218 @@
+from bisect import bisect_left
+
+import sswiki.constants as const
+import sswiki.hull_no_formatting as hnfmt
+import sswiki.lazy as lazy
+import sswiki.utils as utils
+
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
+
+
+def normalizeKey(sf):
+    """Normalize values of a pandas series for catalog lookups i.e. case
+    folded with consecutive whitespace collapsed
+
+    Keyword arguments:
+    sf -- A pandas series of values
+
+    Return:
+    A pandas series of normalized strings; `NaN` values are kept
+    """
+    sf = sf.astype(object)
+    return sf.where(sf.isna(), sf.astype(str).str.casefold().str.split().
+                    str.join(" "))
+
+
+class VesselCatalog:
+    """In-memory catalog of vessel data with indexes for fast lookups.
+
+    Each catalog row is one vessel service history row, joined with the
+    general characteristics of the vessel on 'vessel_url'. Rows are referred
+    to by integer row ids i.e. positions in `VesselCatalog.df`.
+
+    Indexes kept:
+    - Sorted date arrays for each date column, for bisect based range
+      queries
+    - Hash indexes from normalized value to row ids for each index column
+      e.g. 'group_type', 'country', 'Builder', 'Hull_type'; values are also
+      kept sorted for prefix queries
+    - Hash index from (hull type, hull number) to row ids
+    """
+    INDEX_COLS = ['group_type', 'country', 'Builder', 'Hull_type']
+
+    def __init__(self, sh, gc=None, date_cols=None, index_cols=None):
+        """Builds the catalog from normalized vessel data
+
+        Keyword arguments:
+        sh -- A pandas data frame of vessel service history data with dates
+            normalized e.g. from `sswiki.convertDates()`; hull type and number
+            are extracted with `sswiki.convertHullNo()` if not present
+        gc -- A pandas data frame of vessel general characteristics data;
+            ignored if None
+        date_cols -- List of date column names to index; if None, then all
+            columns matching `const.DT_SH_COLS` as per `utils.findDFCols()`
+        index_cols -- List of column names to hash index; if None, then
+            `VesselCatalog.INDEX_COLS`
+        """
+        df = sh.reset_index()
+        if 'Hull_type' not in df.columns:
+            df = pd.concat([df, hnfmt.parseHullNos(df['Identification'],
+                                                   df['vessel_url'])], axis=1)
+
+        if gc is not None:
+            gc_cols = gc.columns.difference(df.columns).tolist()
+            df = df.merge(gc.drop_duplicates('vessel_url')[
+                ['vessel_url'] + gc_cols], on='vessel_url', how='left')
+
+        self.df = df
+
+        if date_cols is None:
+            date_cols = utils.findDFCols(df, const.DT_SH_COLS)
+
+        if index_cols is None:
+            index_cols = self.INDEX_COLS
+
+        self._dates = {}
+        for col in date_cols:
+            self._indexDates(col)
+
+        self._keys = {}
+        for col in index_cols:
+            if col in df.columns:
+                self._indexValues(col)
+
+        hull_index = hnfmt.buildHullIndex(df)
+        self._hulls = {key: np.asarray(rows, dtype=np.int64)
+                       for key, rows in hull_index.items()}
+
+    def __len__(self):
+        return len(self.df)
+
+    def _indexDates(self, col):
+        """Sorts the dates in `col` keeping the row ids in date order"""
+        dates = pd.to_datetime(self.df[col], errors='coerce').values.\
+            astype('datetime64[D]')
+        rows = np.flatnonzero(~np.isnat(dates))
+        order = np.argsort(dates[rows], kind='stable')
+
+        self._dates[col] = (dates[rows][order], rows[order])
+
+    def _indexValues(self, col):
+        """Groups the row ids by normalized value in `col`"""
+        codes, keys = pd.factorize(normalizeKey(self.df[col]), sort=True)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+
+        self._keys[col] = (keys.tolist(),
+                           {key: n for n, key in enumerate(keys)},
+                           order,
+                           bounds)
+
+    def rowsBetween(self, col, start=None, end=None):
+        """Row ids with dates in `col` between `start` and `end` inclusive
+
+        Keyword arguments:
+        col -- Date column name e.g. 'Commissioned'
+        start -- First date as string 'YYYY-MM-DD' or datetime like; if
+            None, then no lower limit
+        end -- Last date as string 'YYYY-MM-DD' or datetime like; if None,
+            then no upper limit
+
+        Return:
+        A numpy array of row ids in date order
+        """
+        dates, rows = self._dates[col]
+        lo = 0 if start is None else \
+            np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        hi = len(dates) if end is None else \
+            np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+
+        return rows[lo:hi]
+
+    def rowsWhere(self, col, value, prefix=False):
+        """Row ids where `col` matches `value`, ignoring case and whitespace
+
+        Keyword arguments:
+        col -- Indexed column name e.g. 'group_type', 'Builder'
+        value -- Value to find e.g. 'Bath Iron Works'
+        prefix -- If `True`, then match all values starting with `value`
+            e.g. 'Bath Iron Works, Bath, Maine'
+
+        Return:
+        A numpy array of row ids in row order
+        """
+        keys, lookup, order, bounds = self._keys[col]
+        key = " ".join(str(value).casefold().split())
+
+        if not prefix:
+            n = lookup.get(key)
+            if n is None:
+                return order[:0]
+            return np.sort(order[bounds[n]:bounds[n + 1]])
+
+        lo = bisect_left(keys, key)
+        hi = bisect_left(keys, key + '\uffff', lo)
+
+        return np.sort(order[bounds[lo]:bounds[hi]])
+
+    def rowsForHull(self, ht, hn=None):
+        """Row ids for the vessel hull type and number
+
+        Keyword arguments:
+        ht -- Hull type e.g. 'DD'; or the full designation e.g. 'DD-445' if
+            `hn` is `None`
+        hn -- Hull number e.g. 445
+
+        Return:
+        A numpy array of row ids in row order
+        """
+        return np.asarray(hnfmt.lookupHullNo(self._hulls, ht, hn),
+                          dtype=np.int64)
+
+    def select(self, where=None, between=None, hull=None):
+        """Row ids matching all provided conditions
+
+        For example, destroyers commissioned 1942 to 1945:
+        `select(where={'Hull_type': 'DD'},
+                between={'Commissioned': ('1942-01-01', '1945-12-31')})`
+
+        Keyword arguments:
+        where -- Dictionary of indexed column name to value; see
+            `rowsWhere()`
+        between -- Dictionary of date column name to tuple (start, end); see
+            `rowsBetween()`
+        hull -- Hull designation e.g. 'DD-445'; see `rowsForHull()`
+
+        Return:
+        A numpy array of row ids in row order
+        """
+        found = []
+        for col, value in (where or {}).items():
+            found.append(self.rowsWhere(col, value))
+
+        for col, (start, end) in (between or {}).items():
+            found.append(np.sort(self.rowsBetween(col, start, end)))
+
+        if hull is not None:
+            found.append(self.rowsForHull(hull))
+
+        if not found:
+            return np.arange(len(self.df))
+
+        rows = found[0]
+        for other in found[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+
+        return rows
+
+    def frame(self, rows):
+        """Catalog data for the provided row ids
+
+        Keyword arguments:
+        rows -- Row ids e.g. from `select()`
+
+        Return:
+        A pandas data frame slice of `VesselCatalog.df`
+        """
+        return self.df.iloc[rows]
@@ -1,8 +1,53 @@
-import pandas as pd
-
 STATUS_OK = 200
 
 BASE_URL = "https://en.wikipedia.org"
+API_PATH = "/w/api.php"
+
+# Seconds of database replica lag above which MediaWiki API requests are
+# refused with a 'maxlag' error, see fetch.getAPI()
+API_MAXLAG = 5
+
+# Maximum titles in a MediaWiki API query
+API_MAX_TITLES = 50
+
+# Seconds to get the whole of each response in, see fetch.getURL(); bytes
+# read at a time to check the deadline
+FETCH_DEADLINE = 30
+FETCH_CHUNK_BYTES = 1 << 16
+
+# Templates of the infobox of individual ship articles, and categories of
+# ship index pages e.g. "Ships grouped alphabetically"; see prefilter.py
+SHIP_INFOBOX_TEMPLATES = ["Template:Infobox ship begin",
+                          "Template:Infobox ship career",
+                          "Template:Infobox ship characteristics"]
+SHIP_INDEX_CATEGORIES = ["Category:All set index articles",
+                         "Category:Set index articles on ships"]
+
+# Labels of the rendered ship infobox rows for the {{Infobox ship career}}
+# and {{Infobox ship characteristics}} parameters that are not the parameter
+# name without 'Ship '; see wikitext.py
+WIKITEXT_LABELS = {"Ship aircraft": "Aircraft carried",
+                   "Ship aircraft facilities": "Aviation facilities",
+                   "Ship boats": "Boats & landing craft carried",
+                   "Ship class": "Class and type",
+                   "Ship EW": "Electronic warfare & decoys",
+                   "Ship honors": "Honors and awards",
+                   "Ship honours": "Honours and awards",
+                   "Ship nickname": "Nickname(s)",
+                   "Ship power": "Installed power",
+                   "Ship registry": "Port of registry",
+                   "Ship sensors": "Sensors and processing systems",
+                   "Ship sponsor": "Sponsored by",
+                   "Ship struck": "Stricken"}
+
+# Ship infobox parameters that are not rendered as rows
+WIKITEXT_SKIP = ["Hide header",
+                 "Header caption",
+                 "Ship flag",
+                 "Ship image",
+                 "Ship image alt",
+                 "Ship image size",
+                 "Ship caption"]
 
 FT_TO_M = 0.3048
 IN_TO_M = FT_TO_M / 12
@@ -74,6 +119,23 @@ NONMES_SH_COLS = ["Builder",
 GC_COLS = LNMES_GC_COLS + WTMES_GC_COLS + SPMES_GC_COLS + NONMES_GC_COLS
 SH_COLS = DT_SH_COLS + NONMES_SH_COLS
 
+# Fate date columns added by sswiki.getFates()
+FATE_COLS = ["fate_scrapped",
+             "fate_transferred",
+             "fate_sunk",
+             "fate_sold",
+             "fate_captured",
+             "fate_cancelled"]
+
+# Service history date columns that start and end a period in commission
+START_SH_COLS = ["Commissioned",
+                 "In service",
+                 "Recommissioned"]
+
+END_SH_COLS = ["Decommissioned",
+               "Out of service",
+               "Stricken"] + FATE_COLS
+
 # Regex patterns to search for fate
 PAT_SCRAPPED = r'(?P<Scrapped>' \
     + r'(?:Scrap(?:ping)?)' \
@@ -168,6 +230,308 @@ PAT_UNKNOWN = r'(?P<Unknown>' \
     + r')'
 
 
+# Regex patterns for vessel hull type and number, in priority order; see
+# hull_no_formatting.parseHullNo(). Should have group name `ht` for hull type
+# and `hn` for hull number
+HULL_ID_PATS = (r'Hull (?:symbol|name|number)\:(?: )*'
+                + r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)(?:\ |$)',
+                r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)')
+
+HULL_URL_PATS = (r'\((?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)\)$',
+                 r'\((?P<ht>)(?P<hn>\d{4})\)$',
+                 r'\((?P<ht>[a-zA-Z]+\(\w+\))\-?(?P<hn>\d+)\)$',
+                 r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)$',
+                 r'\((?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)\-?\w+\)$')
+
+# US Navy hull classification symbols; ref Wikipedia article on hull
+# classification symbol. Includes historic, Coast Guard and service craft
+# symbols that appear in vessel articles
+HULL_TYPES = {
+    # Aircraft carriers
+    "CV": "Aircraft carrier",
+    "CVA": "Attack aircraft carrier",
+    "CVAN": "Attack aircraft carrier (nuclear)",
+    "CVB": "Large aircraft carrier",
+    "CVE": "Escort aircraft carrier",
+    "CVHA": "Assault helicopter aircraft carrier",
+    "CVHE": "Escort helicopter aircraft carrier",
+    "CVL": "Light aircraft carrier",
+    "CVN": "Aircraft carrier (nuclear)",
+    "CVS": "Anti-submarine aircraft carrier",
+    "CVT": "Training aircraft carrier",
+    "CVU": "Utility aircraft carrier",
+    # Surface combatants
+    "ACR": "Armored cruiser",
+    "BB": "Battleship",
+    "BBG": "Guided missile battleship",
+    "BM": "Monitor",
+    "C": "Cruiser",
+    "CA": "Heavy cruiser",
+    "CAG": "Guided missile heavy cruiser",
+    "CB": "Large cruiser",
+    "CC": "Battlecruiser",
+    "CG": "Guided missile cruiser",
+    "CGN": "Guided missile cruiser (nuclear)",
+    "CL": "Light cruiser",
+    "CLAA": "Anti-aircraft light cruiser",
+    "CLC": "Command light cruiser",
+    "CLG": "Guided missile light cruiser",
+    "CLK": "Hunter-killer cruiser",
+    "DD": "Destroyer",
+    "DDE": "Escort destroyer",
+    "DDG": "Guided missile destroyer",
+    "DDK": "Hunter-killer destroyer",
+    "DDR": "Radar picket destroyer",
+    "DE": "Destroyer escort",
+    "DEC": "Control destroyer escort",
+    "DEG": "Guided missile destroyer escort",
+    "DER": "Radar picket destroyer escort",
+    "DL": "Destroyer leader",
+    "DLG": "Guided missile destroyer leader",
+    "DLGN": "Guided missile destroyer leader (nuclear)",
+    "DM": "Destroyer minelayer",
+    "DMS": "Destroyer minesweeper",
+    "FF": "Frigate",
+    "FFG": "Guided missile frigate",
+    "FFT": "Training frigate",
+    "LCS": "Littoral combat ship",
+    "TB": "Torpedo boat",
+    "TBD": "Torpedo boat destroyer",
+    # Submarines
+    "AGSS": "Auxiliary submarine",
+    "APSS": "Transport submarine",
+    "ASSP": "Transport submarine",
+    "IXSS": "Unclassified miscellaneous submarine",
+    "LPSS": "Amphibious transport submarine",
+    "SF": "Fleet submarine",
+    "SM": "Submarine minelayer",
+    "SS": "Submarine",
+    "SSA": "Cargo submarine",
+    "SSAG": "Auxiliary submarine",
+    "SSBN": "Ballistic missile submarine (nuclear)",
+    "SSG": "Guided missile submarine",
+    "SSGN": "Guided missile submarine (nuclear)",
+    "SSK": "Hunter-killer submarine",
+    "SSN": "Attack submarine (nuclear)",
+    "SSO": "Submarine oiler",
+    "SSP": "Transport submarine",
+    "SSR": "Radar picket submarine",
+    "SSRN": "Radar picket submarine (nuclear)",
+    "SST": "Training submarine",
+    # Patrol
+    "PBR": "River patrol boat",
+    "PC": "Patrol craft",
+    "PCE": "Patrol craft escort",
+    "PCE(C)": "Patrol craft escort (control)",
+    "PCE(R)": "Patrol rescue escort",
+    "PCEC": "Patrol craft escort (control)",
+    "PCER": "Patrol rescue escort",
+    "PCF": "Patrol craft fast",
+    "PCS": "Patrol craft sweeper",
+    "PE": "Eagle boat",
+    "PF": "Patrol frigate",
+    "PG": "Patrol gunboat",
+    "PGH": "Patrol gunboat hydrofoil",
+    "PCH": "Patrol craft hydrofoil",
+    "PGM": "Motor gunboat",
+    "PHM": "Patrol hydrofoil missile",
+    "PR": "River gunboat",
+    "PT": "Patrol torpedo boat",
+    "PTF": "Fast patrol craft",
+    "PY": "Patrol yacht",
+    "PYc": "Coastal patrol yacht",
+    "SC": "Submarine chaser",
+    "SP": "Section patrol",
+    # Amphibious
+    "AGC": "Amphibious force flagship",
+    "AKA": "Attack cargo ship",
+    "APA": "Attack transport",
+    "APD": "High speed transport",
+    "LCC": "Amphibious command ship",
+    "LCI": "Landing craft infantry",
+    "LCI(G)": "Landing craft infantry (gunboat)",
+    "LCI(L)": "Landing craft infantry (large)",
+    "LCS(L)": "Landing craft support (large)",
+    "LCT": "Landing craft tank",
+    "LCU": "Landing craft utility",
+    "LHA": "Amphibious assault ship",
+    "LHD": "Amphibious assault ship (multipurpose)",
+    "LKA": "Amphibious cargo ship",
+    "LPA": "Amphibious transport",
+    "LPD": "Amphibious transport dock",
+    "LFR": "Inshore fire support ship",
+    "LPH": "Amphibious assault ship (helicopter)",
+    "LPR": "Amphibious transport (small)",
+    "LSD": "Dock landing ship",
+    "LSM": "Medium landing ship",
+    "LSM(R)": "Medium landing ship (rocket)",
+    "LSMR": "Medium landing ship (rocket)",
+    "LST": "Tank landing ship",
+    "LSV": "Vehicle landing ship",
+    # Mine warfare
+    "AM": "Minesweeper",
+    "AMb": "Harbor minesweeper",
+    "AMc": "Coastal minesweeper",
+    "AMCU": "Underwater mine locator",
+    "AMS": "Motor minesweeper",
+    "CM": "Minelayer",
+    "CMc": "Coastal minelayer",
+    "MCM": "Mine countermeasures ship",
+    "MCS": "Mine countermeasures support ship",
+    "MHC": "Coastal minehunter",
+    "MSB": "Minesweeping boat",
+    "MMC": "Coastal minelayer",
+    "MMD": "Fast minelayer",
+    "MMF": "Fleet minelayer",
+    "MSC": "Coastal minesweeper",
+    "MSC(O)": "Coastal minesweeper (old)",
+    "MSF": "Fleet minesweeper",
+    "MSI": "Inshore minesweeper",
+    "MSO": "Ocean minesweeper",
+    "MSS": "Special minesweeper",
+    "YMS": "Auxiliary motor minesweeper",
+    # Auxiliaries
+    "AB": "Crane ship",
+    "ABSD": "Advance base sectional dock",
+    "AC": "Collier",
+    "ACM": "Auxiliary minelayer",
+    "AD": "Destroyer tender",
+    "ADG": "Degaussing ship",
+    "AE": "Ammunition ship",
+    "AF": "Stores ship",
+    "AFD": "Mobile floating drydock",
+    "AFDB": "Large auxiliary floating dry dock",
+    "AFDL": "Small auxiliary floating dry dock",
+    "AFDM": "Medium auxiliary floating dry dock",
+    "AFS": "Combat stores ship",
+    "AG": "Miscellaneous auxiliary",
+    "AGB": "Icebreaker",
+    "AGDE": "Escort research ship",
+    "AGEH": "Hydrofoil research ship",
+    "AGER": "Environmental research ship",
+    "AGF": "Miscellaneous command ship",
+    "AGM": "Missile range instrumentation ship",
+    "AGMR": "Major communications relay ship",
+    "AGOR": "Oceanographic research ship",
+    "AGOS": "Ocean surveillance ship",
+    "AGP": "Motor torpedo boat tender",
+    "AGR": "Radar picket ship",
+    "AGS": "Surveying ship",
+    "AGSC": "Coastal survey ship",
+    "AGTR": "Technical research ship",
+    "AH": "Hospital ship",
+    "AK": "Cargo ship",
+    "AKD": "Cargo ship dock",
+    "AKE": "Dry cargo ammunition ship",
+    "AKL": "Light cargo ship",
+    "AKN": "Net cargo ship",
+    "AKR": "Vehicle cargo ship",
+    "AKS": "General stores issue ship",
+    "AKV": "Cargo ship and aircraft ferry",
+    "AN": "Net laying ship",
+    "ANL": "Net layer",
+    "AO": "Oiler",
+    "AOE": "Fast combat support ship",
+    "AOG": "Gasoline tanker",
+    "AOR": "Replenishment oiler",
+    "AOT": "Transport oiler",
+    "AP": "Transport",
+    "APV": "Transport and aircraft ferry",
+    "APB": "Self-propelled barracks ship",
+    "APc": "Coastal transport",
+    "APH": "Evacuation transport",
+    "APL": "Barracks craft",
+    "AR": "Repair ship",
+    "ARB": "Battle damage repair ship",
+    "ARC": "Cable repair ship",
+    "ARD": "Auxiliary repair dock",
+    "ARDM": "Medium auxiliary repair dry dock",
+    "ARG": "Internal combustion engine repair ship",
+    "ARL": "Landing craft repair ship",
+    "ARS": "Salvage ship",
+    "ARS(D)": "Salvage lifting vessel",
+    "ARSD": "Salvage lifting vessel",
+    "ARST": "Salvage craft tender",
+    "ARV": "Aircraft repair ship",
+    "ARVA": "Aircraft repair ship (aircraft)",
+    "ARVE": "Aircraft repair ship (engine)",
+    "AS": "Submarine tender",
+    "ASR": "Submarine rescue ship",
+    "AT": "Ocean-going tug",
+    "ATA": "Auxiliary ocean tug",
+    "ATF": "Fleet ocean tug",
+    "ATO": "Old ocean tug",
+    "ATR": "Rescue ocean tug",
+    "ATS": "Salvage and rescue ship",
+    "AV": "Seaplane tender",
+    "AVB": "Advance aviation base ship",
+    "AVD": "Seaplane tender (destroyer)",
+    "AVM": "Guided missile ship",
+    "AVP": "Small seaplane tender",
+    "AVS": "Aviation supply ship",
+    "AVT": "Auxiliary aircraft landing training ship",
+    "AW": "Distilling ship",
+    "AZ": "Lighter-than-air aircraft tender",
+    "EAG": "Experimental miscellaneous auxiliary",
+    "EPCE(R)": "Experimental patrol rescue escort",
+    "ESB": "Expeditionary mobile base",
+    "ID": "Identification number",
+    "IX": "Unclassified miscellaneous vessel",
+    # Airships
+    "ZMC": "Metalclad airship",
+    "ZR": "Rigid airship",
+    "ZRS": "Rigid airship scout",
+    # Service craft
+    "YAG": "Miscellaneous auxiliary service craft",
+    "YC": "Open lighter",
+    "YD": "Floating crane",
+    "YDT": "Diving tender",
+    "YF": "Covered lighter",
+    "YFB": "Ferry boat",
+    "YFD": "Yard floating dry dock",
+    "YFN": "Covered lighter (non-self propelled)",
+    "YFNB": "Large covered lighter",
+    "YFNX": "Special purpose lighter",
+    "YFP": "Floating power barge",
+    "YFR": "Refrigerated covered lighter",
+    "YFRT": "Range tender",
+    "YFU": "Harbor utility craft",
+    "YG": "Garbage lighter",
+    "YHB": "Houseboat",
+    "YM": "Dredge",
+    "YN": "Net tender",
+    "YNG": "Gate vessel",
+    "YNT": "Net tender (tug class)",
+    "YO": "Fuel oil barge",
+    "YOG": "Gasoline barge",
+    "YOS": "Oil storage barge",
+    "YP": "Patrol craft",
+    "YR": "Floating workshop",
+    "YRBM": "Submarine repair, berthing and messing barge",
+    "YRL": "Covered lighter (repair)",
+    "YSD": "Seaplane wrecking derrick",
+    "YSR": "Sludge removal barge",
+    "YT": "Harbor tug",
+    "YTB": "Large harbor tug",
+    "YTL": "Small harbor tug",
+    "YTM": "Medium harbor tug",
+    "YW": "Water barge",
+    # Coast Guard
+    "WAGB": "Coast Guard icebreaker",
+    "WAT": "Coast Guard ocean tug",
+    "WAVP": "Coast Guard seaplane tender",
+    "WDE": "Coast Guard destroyer escort",
+    "WHEC": "Coast Guard high endurance cutter",
+    "WIX": "Coast Guard training cutter",
+    "WLB": "Coast Guard seagoing buoy tender",
+    "WMEC": "Coast Guard medium endurance cutter",
+    "WMSL": "Coast Guard national security cutter",
+    "WPB": "Coast Guard patrol boat",
+    "WPF": "Coast Guard patrol frigate",
+    "WPG": "Coast Guard patrol gunboat",
+}
+
+
 # Regex patterns for date extraction and correction
 START_PAT = r'(?P<Date>'
 DAYS_PAT = r'(?P<Day>[1-3]?\d)'
@@ -220,18 +584,21 @@ DATE_PATS = {
     'YYYY': START_PAT + YEAR_PAT + END_PAT,
 }
 
-DATE_PAT_REPL = pd.DataFrame(
-            [['DD MMMMMM YYYY', ('D', 'M', 'Y')],
-             ['MMMMMM DD, YYYY', ('D', 'M', 'Y')],
-             ['MMM. DD, YYYY', ('D', 'M', 'Y')],
-             ['YYYY-MM-DD', ('D', 'M', 'Y')],
-             ['DD/MM/YYYY', ('D', 'M', 'Y')],
-             ['MMMMMM YYYY', ('1', 'M', 'Y')],
-             ['Winter YYYY', ('1', '1', 'Y')],
-             ['Early YYYY', ('1', '2', 'Y')],
-             ['Spring YYYY', ('1', '4', 'Y')],
-             ['Mid YYYY', ('1', '7', 'Y')],
-             ['Summer YYYY', ('1', '7', 'Y')],
-             ['Late YYYY', ('1', '11', 'Y')],
-             ['End YYYY', ('1', '12', 'Y')],
-             ['YYYY', ('1', '1', 'Y')], ], columns=['pat', 'repl'])
+# Date patterns from `DATE_PATS` in the order tried, with the replacement
+# (day, month, year) for `date_formatting.extractDate()`
+DATE_PAT_REPL = (
+    ('DD MMMMMM YYYY', ('D', 'M', 'Y')),
+    ('MMMMMM DD, YYYY', ('D', 'M', 'Y')),
+    ('MMM. DD, YYYY', ('D', 'M', 'Y')),
+    ('YYYY-MM-DD', ('D', 'M', 'Y')),
+    ('DD/MM/YYYY', ('D', 'M', 'Y')),
+    ('MMMMMM YYYY', ('1', 'M', 'Y')),
+    ('Winter YYYY', ('1', '1', 'Y')),
+    ('Early YYYY', ('1', '2', 'Y')),
+    ('Spring YYYY', ('1', '4', 'Y')),
+    ('Mid YYYY', ('1', '7', 'Y')),
+    ('Summer YYYY', ('1', '7', 'Y')),
+    ('Late YYYY', ('1', '11', 'Y')),
+    ('End YYYY', ('1', '12', 'Y')),
+    ('YYYY', ('1', '1', 'Y')),
+)
@@ -1,3 +1,6 @@
+from types import MappingProxyType
+import unicodedata
+
 IN_USE = ["Argentina",
           "Austria-Hungary",
           "Bahrain",
@@ -104,3 +107,128 @@ REPL = {"America": "United States",
         "United StatesUnited States": "United States",
         "Vietnam People's Navy": "Vietnam"
         }
+
+
+def normalizeName(name):
+    """Normalize a name for country lookups i.e. unicode NFKC normal form,
+    case folded and with consecutive whitespace collapsed
+
+    Keyword arguments:
+    name -- String name to normalize
+
+    Return:
+    The normalized string
+    """
+    return " ".join(unicodedata.normalize('NFKC', name).casefold().split())
+
+
+def normalizeNames(sf):
+    """Vectorized `normalizeName()` for a pandas series of names
+
+    Keyword arguments:
+    sf -- A pandas series of names
+
+    Return:
+    A pandas series with normalized names
+    """
+    return sf.astype(str).str.normalize('NFKC').str.casefold().\
+        str.split().str.join(" ")
+
+
+def buildResolver():
+    """Build a lookup from names found in vessel service history to the
+    country names in `IN_USE`.
+
+    Covers the names in `IN_USE` and `REPL`, the concatenations found in
+    scraped data e.g. "United StatesUnited States" or
+    "United States NavyUnited States", and the `normalizeName()` form of all
+    of these.
+
+    Return:
+    A read only dictionary of name to country name
+    """
+    names = {country: country for country in IN_USE}
+    names.update(REPL)
+
+    resolver = {}
+    for name, country in names.items():
+        for variant in (name, name + country, name + name):
+            resolver.setdefault(variant, country)
+
+    for variant, country in list(resolver.items()):
+        resolver.setdefault(normalizeName(variant), country)
+
+    return MappingProxyType(resolver)
+
+
+RESOLVER = buildResolver()
+
+DROP_NAMES = frozenset(DROP) | frozenset(normalizeName(x) for x in DROP)
+
+
+def resolveCountry(name):
+    """Resolve a name to a country name in `IN_USE`
+
+    Keyword arguments:
+    name -- Name to resolve e.g. "U.S. Navy"
+
+    Return:
+    The country name e.g. "United States"; `None` if not resolved
+    """
+    if not isinstance(name, str):
+        return None
+
+    country = RESOLVER.get(name)
+    if country is None:
+        country = RESOLVER.get(normalizeName(name))
+
+    return country
+
+
+def isDropped(name):
+    """Check if name is one of the `DROP` names
+
+    Keyword arguments:
+    name -- Name to check
+
+    Return:
+    `True` if `name` or its normalized form is in `DROP`
+    """
+    if not isinstance(name, str):
+        return False
+
+    return name in DROP_NAMES or normalizeName(name) in DROP_NAMES
+
+
+def resolveCountries(sf):
+    """Resolve a pandas series of names to country names in `IN_USE`
+
+    Keyword arguments:
+    sf -- A pandas series of names
+
+    Return:
+    A pandas series of country names; `NaN` where not resolved
+    """
+    countries = sf.map(RESOLVER)
+    unresolved = countries.isna() & sf.notna()
+    if unresolved.any():
+        countries[unresolved] = normalizeNames(sf[unresolved]).map(RESOLVER)
+
+    return countries
+
+
+def areDropped(sf):
+    """Check a pandas series of names against the `DROP` names
+
+    Keyword arguments:
+    sf -- A pandas series of names
+
+    Return:
+    A boolean pandas series; `True` where the name is in `DROP`
+    """
+    dropped = sf.isin(DROP_NAMES)
+    unchecked = ~dropped & sf.notna()
+    if unchecked.any():
+        dropped[unchecked] = normalizeNames(sf[unchecked]).isin(DROP_NAMES)
+
+    return dropped
@@ -0,0 +1,258 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+import heapq
+import itertools
+import logging
+import os
+import re
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import sswiki.constants as const
+import sswiki.errorlog as errorlog
+import sswiki.fetch as fetch
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+
+pd = lazy.lazyImport('pandas')
+bs4 = lazy.lazyImport('bs4')
+
+logger = logging.getLogger(__name__)
+
+# Ship class articles e.g. '/wiki/Benham-class_destroyer', which list the
+# sister ships of a class; not in other namespaces e.g. categories
+PAT_CLASS = re.compile(r'/wiki/[^:/#?]+-class_', re.IGNORECASE)
+
+# Order the frontier is crawled in by kind of page, lowest first; class
+# articles link to the most vessels not in the lists articles
+PRIORITIES = {'class': 0, 'vessel': 1}
+
+VISITED_COLS = ['url', 'kind', 'depth', 'links', 'timestamp']
+
+
+def linkKind(url, pattern):
+    """Kind of page a link is to, as per `PRIORITIES`: 'class' for ship class
+    articles, 'vessel' for urls containing `pattern` e.g. "wiki/USS", or
+    None to not follow the link"""
+    if PAT_CLASS.search(url):
+        return 'class'
+    if pattern in url:
+        return 'vessel'
+
+    return None
+
+
+def pageLinks(url, mode='page'):
+    """Get the article links of a page
+
+    Keyword arguments:
+    url -- The article url
+    mode -- 'page' to find the links in the html of the article, or 'api' to
+        get them from the MediaWiki links API, as per `getVesselLinks()`
+
+    Return:
+    A list of the absolute urls linked to, without fragments, on the same
+    host as `url`; empty if the page cannot be crawled e.g. HTTP 404, and
+    `None` if it may be crawled later e.g. a network error, including a
+    deadline or a body cut off, or HTTP 503
+    """
+    try:
+        if mode == 'api':
+            api_url, title = fetch.articleAPI(url)
+            hrefs = [fetch.articlePath(page['title'])
+                     for query in fetch.queryAll(api_url,
+                                                 {'generator': 'links',
+                                                  'titles': title,
+                                                  'gplnamespace': 0,
+                                                  'gpllimit': 'max'},
+                                                 'crawl')
+                     for page in query.get('pages', [])
+                     if not page.get('missing')]
+        else:
+            response = fetch.getURL(url, 'crawl')
+            status = response.status_code
+            if status != const.STATUS_OK:
+                logger.warning(f"Error with response code {status} for "
+                               + f"url {url}")
+                return None if errorlog.isTransient('http_status', status) \
+                    else []
+
+            soup = bs4.BeautifulSoup(response.content, 'html.parser',
+                                     parse_only=bs4.SoupStrainer('a'))
+            hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+
+    except fetch.requests.RequestException as e:
+        logger.warning(f"Error crawling {url}: {e}")
+        return None
+
+    host = urlsplit(url).netloc
+    links = []
+    for href in hrefs:
+        link = urldefrag(urljoin(url, href))[0]
+        if urlsplit(link).netloc == host:
+            links.append(link)
+
+    return list(dict.fromkeys(links))
+
+
+def readVisited(visited_csv):
+    """Read the pages visited by previous crawls, written by
+    `writeVisited()`; empty if the file does not exist
+
+    Keyword arguments:
+    visited_csv -- File name; "../data/" is pre-pended
+
+    Return:
+    A dictionary of url to a record dictionary with the `VISITED_COLS` keys;
+    'links' is a list of urls
+    """
+    path = const.DATA_DIR + visited_csv
+    if not os.path.exists(path):
+        return {}
+
+    df = pd.read_csv(path, dtype='str', encoding='utf-8',
+                     keep_default_na=False)
+    visited = {}
+    for record in df.reindex(columns=VISITED_COLS).to_dict('records'):
+        record['links'] = record['links'].split()
+        visited[record['url']] = record
+
+    return visited
+
+
+def writeVisited(visited, visited_csv):
+    """Write the visited pages as csv, with the links of each page separated
+    by spaces
+
+    Keyword arguments:
+    visited -- Dictionary of url to record as per `readVisited()`
+    visited_csv -- File name; "../data/" is pre-pended
+    """
+    records = [{**r, 'links': " ".join(r['links'])} for r in visited.values()]
+    pd.DataFrame(records, columns=VISITED_COLS).\
+        to_csv(const.DATA_DIR + visited_csv, index=False)
+
+
+def crawlVesselLinks(vls, pattern, max_depth=2, max_pages=1000, workers=1,
+                     mode='page', visited_csv=None):
+    """Find Naval vessel article links that are not in the lists articles,
+    by following links from the vessel articles already found
+
+    Pages are crawled from a frontier ordered by `PRIORITIES` then depth, so
+    ship class articles, which list sister ships, are crawled before other
+    vessel articles. Links to vessel articles (containing `pattern`) are
+    found on each page crawled, and links to vessel and class articles are
+    added to the frontier. The crawl is bounded: pages more than `max_depth`
+    links from the vessel articles already found are not crawled, and at
+    most `max_pages` pages are fetched.
+
+    Pages visited are kept with their links in `visited_csv`, so later
+    crawls are not fetched again but follow the same links, and the budget
+    extends the crawl. Counted in the 'crawl_pages_total' metric by kind and
+    result ('fetched', 'cached' from the visited file, 'error' or 'budget'
+    for those left in the frontier), and new vessel links in
+    'crawl_vessel_links_total' by the kind of page they were found on.
+
+    Keyword arguments:
+    vls -- A pandas data frame with columns for vessel group type, group type
+        url, and the vessel article url; see `getVesselLinks()`
+    pattern -- a string pattern to find in the desired vessel article link e.g.
+        "wiki/USS" for United States Navy Ships
+    max_depth -- Maximum links from the vessel articles in `vls` to crawl
+    max_pages -- Maximum pages to fetch
+    workers -- Number of threads crawling pages at once; requests are paced
+        by the rate controller
+    mode -- 'page' or 'api' to get the links of each page, see
+        `pageLinks()`
+    visited_csv -- File name of the pages visited; ignored if None;
+        "../data/" is pre-pended
+
+    Return:
+    A pandas data frame of `vls` and the new vessel links, with the same
+    columns; the 'group_type_url' of a new link is the page it was found on
+    """
+    visited = {} if visited_csv is None else readVisited(visited_csv)
+    linked = set(vls['vessel_url'])
+    found = []
+
+    frontier, queued, left = [], set(), []
+    order = itertools.count()
+
+    def push(url, kind, depth):
+        if url not in queued:
+            queued.add(url)
+            heapq.heappush(frontier,
+                           (PRIORITIES[kind], depth, next(order), url, kind))
+
+    def expand(url, depth, links):
+        for link in links:
+            kind = linkKind(link, pattern)
+            if kind is None:
+                continue
+            if kind == 'vessel' and link not in linked:
+                linked.add(link)
+                found.append({'group_type': None, 'group_type_url': url,
+                              'vessel_url': link})
+                metrics.inc('crawl_vessel_links_total',
+                            kind=linkKind(url, pattern))
+            if depth < max_depth:
+                push(link, kind, depth + 1)
+
+    for url in vls['vessel_url']:
+        push(url, 'vessel', 0)
+
+    fetched, crawled = 0, 0
+    running = {}
+    lazy.load(pd, bs4, fetch.requests)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while frontier or running:
+            while frontier and len(running) < workers:
+                _, depth, _, url, kind = heapq.heappop(frontier)
+                if url in visited:
+                    metrics.inc('crawl_pages_total', kind=kind,
+                                result='cached')
+                    expand(url, depth, visited[url]['links'])
+                elif fetched >= max_pages:
+                    metrics.inc('crawl_pages_total', kind=kind,
+                                result='budget')
+                    left.append(url)
+                else:
+                    fetched += 1
+                    running[pool.submit(pageLinks, url, mode)] = \
+                        (url, kind, depth)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, kind, depth = running.pop(future)
+                links = future.result()
+                crawled += 1
+                if crawled % 100 == 0:
+                    logger.info(f"Crawled {crawled:,.0f} of {max_pages:,.0f} "
+                                + f"pages; {len(found):,.0f} new vessel "
+                                + "links")
+
+                if links is None:
+                    metrics.inc('crawl_pages_total', kind=kind,
+                                result='error')
+                    continue
+
+                metrics.inc('crawl_pages_total', kind=kind, result='fetched')
+                visited[url] = {'url': url, 'kind': kind, 'depth': depth,
+                                'links': links,
+                                'timestamp': datetime.now(timezone.utc).
+                                isoformat()}
+                expand(url, depth, links)
+
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if visited_csv is not None:
+            writeVisited(visited, visited_csv)
+
+    logger.info(f"Crawl found {len(found):,.0f} new vessel links in "
+                + f"{fetched:,.0f} pages; {len(left):,.0f} pages left")
+
+    return pd.concat([vls, pd.DataFrame(found, columns=const.VL_COLS)],
+                     ignore_index=True)
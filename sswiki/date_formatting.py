@@ -1,14 +1,19 @@
 from datetime import datetime
-import numpy as np
-import pandas as pd
 import re
 import uuid
 
 import sswiki.utils as utils
 import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.memtrace as memtrace
+import sswiki.metrics as metrics
+import sswiki.profiling as profiling
 
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
 
-def extractDate(df, col_fr, col_to, pat, repl=None):
+
+def extractDate(df, col_fr, col_to, pat, repl=None, label=None):
     """Extract date based on pattern from df['col_fr'] to df['col_to'] with
     changes described in replacement
 
@@ -23,6 +28,7 @@ def extractDate(df, col_fr, col_to, pat, repl=None):
         is in the format (dd, mm, yyyy) Use "D" for day match from `pat`, or
         an integer to for a day of the month. Similarily, use "M" or [1 - 12]
         for month, and "Y" or a four digit integer for year.
+    label -- Short name of the pattern for `profiling`
 
     Return:
     A pandas series with recognized dates as datetime objects.
@@ -32,11 +38,14 @@ def extractDate(df, col_fr, col_to, pat, repl=None):
     df[col_fr] = df[col_fr].str.normalize('NFKD')
 
     if repl is None:
-        df['extract'] = df.loc[df[col_to].isna(), col_fr].\
-            str.extract(pat, flags=re.IGNORECASE)['Date']
+        df['extract'] = profiling.extract(df.loc[df[col_to].isna(), col_fr],
+                                          pat, re.IGNORECASE, label)['Date']
     else:
-        df = pd.concat([df, df.loc[df[col_to].isna(), col_fr].
-                        str.extract(pat, flags=re.IGNORECASE)], axis=1)
+        # Named as per `df` so the index name is kept even when no rows
+        # are left to extract from
+        df = pd.concat([df, profiling.extract(
+            df.loc[df[col_to].isna(), col_fr], pat, re.IGNORECASE, label).
+            rename_axis(df.index.name)], axis=1)
 
         day = repl[0] if repl[0] != 'D' else df['Day']
 
@@ -55,6 +64,8 @@ def extractDate(df, col_fr, col_to, pat, repl=None):
     return df
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def findDates(df, col_fr, col_to=None, pat=None):
     """Search for a pattern and extract the date when a match is found.
 
@@ -75,6 +86,7 @@ def findDates(df, col_fr, col_to=None, pat=None):
     A panda data frame with recognized dates as datetime objects.
     """
     RAND_COL_NAME = '__temp_col__' + uuid.uuid4().hex + uuid.uuid4().hex + '__'
+    cascade = 'dates' if pat is None else f"{col_to or col_fr} dates"
     if (col_to is None) or col_to == col_fr:
         col_to = RAND_COL_NAME
 
@@ -82,18 +94,20 @@ def findDates(df, col_fr, col_to=None, pat=None):
 
     # Iterate through each date pattern
     # Correct all dates to 'DD MMMMMM YYYY'
-    for index, row in const.DATE_PAT_REPL.iterrows():
+    for pat_name, repl in const.DATE_PAT_REPL:
         if pat is None:
-            pat_date = const.DATE_PATS.get(row['pat'])
+            pat_date = const.DATE_PATS.get(pat_name)
         else:
-            pat_date = pat + r'.*?' + const.DATE_PATS.get(row['pat'])
+            pat_date = pat + r'.*?' + const.DATE_PATS.get(pat_name)
 
-        df = extractDate(df, col_fr, col_to, pat_date, row['repl'])
+        with profiling.cascade(cascade):
+            df = extractDate(df, col_fr, col_to, pat_date, repl, pat_name)
 
-    # Change to datetime
+    # Change to datetime; with an explicit format so the result does not
+    # depend on the first date in the column e.g. when normalizing in chunks
     df[col_to] = pd.to_datetime(df[col_to],
                                 errors='coerce',
-                                infer_datetime_format=True)
+                                format='%d %B %Y')
 
     if col_to == RAND_COL_NAME:
         df[col_fr] = df[col_to]
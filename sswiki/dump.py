@@ -0,0 +1,357 @@
+import bz2
+from concurrent.futures import ProcessPoolExecutor
+import io
+import logging
+import os
+import re
+from xml.sax.saxutils import escape
+import xml.etree.ElementTree as ET
+
+import sswiki.constants as const
+import sswiki.fetch as fetch
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+import sswiki.sswiki as sswiki
+import sswiki.utils as utils
+import sswiki.wikitext as wikitext
+
+pd = lazy.lazyImport('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Start of a bz2 stream: the stream header, then the magic number of its
+# first block
+PAT_STREAM = re.compile(rb'BZh[1-9]1AY&SY')
+
+# Bytes read at a time when scanning a dump for its streams
+SCAN_BYTES = 1 << 24
+
+# Counts of pages returned by the workers, for the 'dump_pages_total' metric
+PAGE_KINDS = ('scanned', 'matched', 'infobox')
+
+
+def localName(tag):
+    """Tag without its XML namespace e.g. 'page'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def iterPages(source):
+    """Pages of a MediaWiki XML export, parsed incrementally
+
+    Each page element is cleared once read, so memory is bounded by the
+    largest page rather than the size of the export.
+
+    Keyword arguments:
+    source -- File name or binary file object of the XML e.g. from
+        `bz2.open()`
+
+    Return:
+    A generator of dictionaries with keys 'title', 'ns', 'redirect' (`True`
+    if the page is a redirect) and 'text' (the wikitext of the latest
+    revision)
+    """
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or localName(elem.tag) != 'page':
+            continue
+
+        page = {'title': None, 'ns': '0', 'redirect': False, 'text': ''}
+        for child in elem.iter():
+            name = localName(child.tag)
+            if name in ('title', 'ns'):
+                page[name] = child.text or ''
+            elif name == 'redirect':
+                page['redirect'] = True
+            elif name == 'text':
+                page['text'] = child.text or ''
+
+        yield page
+        root.clear()
+
+
+def fragmentPages(xml, prefix=None):
+    """Pages in a decompressed fragment of an XML export e.g. one stream of
+    a multistream dump
+
+    Pages are found by their tags, so the fragment need not be a complete
+    document, and only the pages with titles starting with `prefix` are
+    parsed.
+
+    Keyword arguments:
+    xml -- Bytes of the XML fragment
+    prefix -- Title prefix of the pages to parse; if None, then all pages
+
+    Return:
+    A tuple (number of pages in the fragment, list of page dictionaries as
+    per `iterPages()`)
+    """
+    starts = [m.start() for m in re.finditer(rb'<page>', xml)]
+    title = None if prefix is None else \
+        b'<title>' + escape(prefix).encode('utf-8')
+
+    pages = []
+    for n, start in enumerate(starts):
+        stop = starts[n + 1] if n + 1 < len(starts) else \
+            xml.rfind(b'</page>') + len(b'</page>')
+        if title is not None and xml.find(title, start, stop) < 0:
+            continue
+        pages.extend(iterPages(io.BytesIO(xml[start:stop])))
+
+    return len(starts), pages
+
+
+def readIndex(index_path):
+    """Read the index of a multistream dump
+
+    Keyword arguments:
+    index_path -- File name of the index, bz2 compressed or not, with lines
+        'offset:page id:title'
+
+    Return:
+    A list of tuples (stream offset, list of titles), in order of offset
+    """
+    opener = bz2.open if index_path.endswith('.bz2') else open
+    streams = {}
+    with opener(index_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            offset, _, title = line.rstrip('\n').split(':', 2)
+            streams.setdefault(int(offset), []).append(title)
+
+    return sorted(streams.items())
+
+
+def streamOffsets(dump_path):
+    """Offsets of the bz2 streams in a dump, found by scanning for stream
+    headers; see `readIndex()` for dumps with an index"""
+    offsets = []
+    with open(dump_path, 'rb') as f:
+        pos, tail = 0, b''
+        while True:
+            block = f.read(SCAN_BYTES)
+            if not block:
+                break
+            data = tail + block
+            offsets.extend(pos - len(tail) + m.start()
+                           for m in PAT_STREAM.finditer(data))
+            tail = data[-9:]
+            pos += len(block)
+
+    return sorted(set(offsets))
+
+
+def streamRanges(dump_path, index_path=None, prefix=None):
+    """Byte ranges of the streams of a dump to read
+
+    With an index, streams with no titles starting with `prefix` are
+    skipped, and counted in the 'dump_streams_total' metric.
+
+    Keyword arguments:
+    dump_path -- File name of the bz2 dump
+    index_path -- File name of the multistream index; if None, then the
+        streams are found with `streamOffsets()`
+    prefix -- Title prefix of the pages to read; if None, then all streams
+
+    Return:
+    A list of tuples (start, stop) of byte offsets
+    """
+    size = os.path.getsize(dump_path)
+    if index_path is None:
+        offsets = streamOffsets(dump_path)
+        return list(zip(offsets, offsets[1:] + [size]))
+
+    streams = readIndex(index_path)
+    starts = [offset for offset, _ in streams] + [size]
+    ranges = []
+    for (offset, titles), stop in zip(streams, starts[1:]):
+        if prefix is None or any(t.startswith(prefix) for t in titles):
+            ranges.append((offset, stop))
+
+    metrics.inc('dump_streams_total', len(ranges), action='read')
+    metrics.inc('dump_streams_total', len(streams) - len(ranges),
+                action='skipped')
+
+    return ranges
+
+
+def vesselLink(title):
+    """Vessel link of an article title, with the `const.VL_COLS`"""
+    return {'group_type': None,
+            'group_type_url': None,
+            'vessel_url': const.BASE_URL + fetch.articlePath(title)}
+
+
+def vesselData(pages, prefix):
+    """General characteristics and service history of the vessel articles in
+    dump pages
+
+    Keyword arguments:
+    pages -- Iterable of page dictionaries as per `iterPages()`
+    prefix -- Title prefix of the vessel articles e.g. 'USS '
+
+    Return:
+    A tuple (gc, sh, counts); gc and sh as per `sswiki.getVesselData()`,
+    and counts a dictionary of the pages 'matched' and with an 'infobox'
+    """
+    vls, vds = [], {}
+    counts = {'matched': 0, 'infobox': 0}
+    for page in pages:
+        if page['ns'] != '0' or page['redirect'] or \
+                not page['title'].startswith(prefix):
+            continue
+        counts['matched'] += 1
+
+        vd = wikitext.infoboxSections(page['text'])
+        if vd is None:
+            continue
+        counts['infobox'] += 1
+
+        vl = vesselLink(page['title'])
+        vls.append(vl)
+        vds[vl['vessel_url']] = vd
+
+    if not vls:
+        return pd.DataFrame(columns=const.GC_COLS), \
+            pd.DataFrame(columns=const.SH_COLS), counts
+
+    vls = pd.DataFrame(vls, columns=const.VL_COLS)
+    gc, sh = sswiki.getVesselData(vls, bulk=True,
+                                  scrape=lambda vl: vds[vl['vessel_url']])
+
+    return gc, sh, counts
+
+
+def readStreams(dump_path, ranges, prefix):
+    """Vessel data of byte ranges of streams of a dump; run in the worker
+    processes
+
+    Each stream is decompressed and parsed on its own, so memory is bounded
+    by the largest stream.
+
+    Keyword arguments:
+    dump_path -- File name of the bz2 dump
+    ranges -- List of tuples (start, stop) of byte offsets of streams
+    prefix -- Title prefix of the vessel articles e.g. 'USS '
+
+    Return:
+    A tuple (gc, sh, counts) as per `vesselData()`, with counts of the pages
+    'scanned' too
+    """
+    scanned, pages = 0, []
+    with open(dump_path, 'rb') as f:
+        for start, stop in ranges:
+            f.seek(start)
+            n, matched = fragmentPages(bz2.decompress(f.read(stop - start)),
+                                       prefix)
+            scanned += n
+            pages.extend(matched)
+
+    gc, sh, counts = vesselData(pages, prefix)
+    counts['scanned'] = scanned
+
+    return gc, sh, counts
+
+
+def ingestDump(dump_path, index_path=None, prefix='USS ', workers=None,
+               gcdata_csv=None, shdata_csv=None, streams_per_job=50,
+               batch_size=1000, executor=None):
+    """Vessel data from a bz2 compressed 'pages-articles' XML dump, with no
+    network
+
+    The infoboxes of the articles with titles starting with `prefix` are
+    read from their wikitext (see `wikitext.infoboxData()`) and cleaned as
+    per `sswiki.getVesselData()`. Multistream dumps are read in jobs of
+    `streams_per_job` streams in worker processes; with the dump index,
+    streams without matching titles are not read. Other dumps are parsed
+    incrementally in one process, `batch_size` vessels at a time. Pages are
+    counted in the 'dump_pages_total' metric by kind: 'scanned', 'matched'
+    (by title) and with an 'infobox'.
+
+    Keyword arguments:
+    dump_path -- File name of the dump e.g.
+        'enwiki-latest-pages-articles-multistream.xml.bz2'
+    index_path -- File name of the multistream index e.g.
+        'enwiki-latest-pages-articles-multistream-index.txt.bz2'; if None,
+        then the streams are found by scanning the dump
+    prefix -- Title prefix of the vessel articles
+    workers -- Number of worker processes; if None, then the CPU count
+    gcdata_csv -- path and file name string to write vessel general
+        characterisic data to; ignored if None; "../data/" is pre-pended to
+        the provided string
+    shdata_csv -- path and file name string to write vessel service
+        history data to; ignored if None; "../data/" is pre-pended to
+        the provided string
+    streams_per_job -- Number of streams read by each worker job
+    batch_size -- Number of vessels cleaned at a time when the dump is a
+        single stream
+    executor -- A `concurrent.futures` process pool executor to use; if
+        None, then one is created with `workers` processes
+
+    Return:
+    A tuple of two pandas data frame (gc, sh); gc for vessel general
+        characterisics and sh for vessel service history
+    """
+    ranges = streamRanges(dump_path, index_path, prefix)
+    results = []
+
+    if index_path is None and len(ranges) <= 1:
+        logger.info(f"Reading {dump_path} as a single stream")
+        counts = {kind: 0 for kind in PAGE_KINDS}
+        batch = []
+
+        def flush():
+            gc, sh, batch_counts = vesselData(batch, prefix)
+            results.append((gc, sh, batch_counts))
+            batch.clear()
+
+        with bz2.open(dump_path, 'rb') as f:
+            for page in iterPages(f):
+                counts['scanned'] += 1
+                if page['title'].startswith(prefix):
+                    batch.append(page)
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+        results.append((None, None, counts))
+    else:
+        jobs = [ranges[n:n + streams_per_job]
+                for n in range(0, len(ranges), streams_per_job)]
+        workers = workers or os.cpu_count() or 1
+        logger.info(f"Reading {len(ranges):,.0f} streams of {dump_path} in "
+                    + f"{len(jobs):,.0f} jobs with {workers} workers")
+
+        own_executor = executor is None
+        if own_executor and workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            run = executor.map if executor is not None else map
+            for n, result in enumerate(run(readStreams,
+                                           [dump_path] * len(jobs), jobs,
+                                           [prefix] * len(jobs)), 1):
+                results.append(result)
+                logger.info(f"Read job {n:>5,.0f} of {len(jobs):,.0f}; "
+                            + f"{result[2]['infobox']:,.0f} vessels")
+        finally:
+            if own_executor and executor is not None:
+                executor.shutdown()
+
+    for _, _, counts in results:
+        for kind, count in counts.items():
+            metrics.inc('dump_pages_total', count, kind=kind)
+
+    frames = [(gc, sh) for gc, sh, _ in results if gc is not None]
+    gc = pd.concat([gc for gc, _ in frames if len(gc) > 0]
+                   or [pd.DataFrame(columns=const.GC_COLS)])
+    sh = pd.concat([sh for _, sh in frames if len(sh) > 0]
+                   or [pd.DataFrame(columns=const.SH_COLS)])
+
+    logger.info(f"{len(gc):,.0f} vessels read from {dump_path}")
+
+    if len(gc) > 0 and gcdata_csv is not None:
+        utils.writeVesselData(gc, gcdata_csv, index_label='uuid')
+
+    if len(sh) > 0 and shdata_csv is not None:
+        utils.writeVesselData(sh, shdata_csv, index_label='uuid')
+
+    return gc, sh
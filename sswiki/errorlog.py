@@ -0,0 +1,199 @@
+from datetime import datetime, timezone
+import os
+import threading
+
+import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+
+pd = lazy.lazyImport('pandas')
+
+ERROR_COLS = const.VL_COLS + ['category', 'status', 'exception', 'attempts',
+                              'transient', 'timestamp']
+
+# Error categories:
+# - 'network': request exceptions e.g. connection errors, timeouts
+# - 'http_status': non-200 responses; 'status' is the HTTP status
+# - 'api_error': MediaWiki API errors; 'status' is the API error code
+# - 'no_infobox', 'infobox_shape', 'read_html': the article has no usable
+#   infobox
+# - 'no_gc': the infobox has no general characteristics
+# - 'dropped': the article is a list of vessels, see `cnames.isDropped()`
+# Network errors, and HTTP statuses and API error codes from an overloaded
+# server, are transient and may succeed on retry; the others are permanent.
+# 'no_gc' and 'dropped' are informational: the vessel may still have rows,
+# e.g. service history, so it is not skipped by later crawls
+INFO_CATEGORIES = ('no_gc', 'dropped')
+TRANSIENT_STATUS = (408, 429, 500, 502, 503, 504)
+TRANSIENT_API_CODES = ('maxlag', 'ratelimited', 'readonly', 'json',
+                       'internal_api_error_DBQueryError')
+
+
+def isTransient(category, status=None):
+    """Whether an error may succeed on retry
+
+    Keyword arguments:
+    category -- Error category e.g. 'network', 'no_infobox'
+    status -- HTTP status or API error code
+
+    Return:
+    `True` if transient
+    """
+    if category == 'network':
+        return True
+
+    if category in ('http_status', 'api_error') and status is not None:
+        status = str(status)
+        return (status in TRANSIENT_API_CODES
+                or status.isdigit() and int(status) in TRANSIENT_STATUS)
+
+    return False
+
+
+def isSkippable(category, status=None):
+    """Whether an error means the url has no rows to scrape, so later
+    crawls may skip it
+
+    Keyword arguments:
+    category -- Error category e.g. 'network', 'no_infobox'
+    status -- HTTP status or API error code
+
+    Return:
+    `True` if permanent and not one of `INFO_CATEGORIES`
+    """
+    return (category not in INFO_CATEGORIES
+            and not isTransient(category, status))
+
+
+class ErrorLog:
+    """Structured errors of a crawl, one per vessel url.
+
+    Each record has the vessel link columns `const.VL_COLS`, so the url can
+    be scraped again, and the error 'category', 'status' (HTTP status or API
+    error code), 'exception', number of 'attempts', whether it is
+    'transient', and 'timestamp'. Adding an error for a url that is already
+    in the log replaces the record and counts another attempt.
+    """
+
+    def __init__(self, records=()):
+        """
+        Keyword arguments:
+        records -- Iterable of record dictionaries with the `ERROR_COLS` keys
+        """
+        self._lock = threading.Lock()
+        self._records = {r['vessel_url']: dict(r) for r in records}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, vessel_url):
+        return vessel_url in self._records
+
+    def add(self, vl, category, status=None, exception=None):
+        """Add an error, counted in the 'vessel_errors_total' metric by
+        category
+
+        Keyword arguments:
+        vl -- Vessel link e.g. a pandas series with the `const.VL_COLS`
+        category -- Error category e.g. 'network', 'no_infobox'
+        status -- HTTP status or API error code
+        exception -- The exception, if any
+        """
+        metrics.inc('vessel_errors_total', reason=category)
+
+        record = {col: vl[col] for col in const.VL_COLS}
+        record.update({
+            'category': category,
+            'status': status,
+            'exception': None if exception is None else
+            f"{type(exception).__name__}: {exception}",
+            'attempts': 1,
+            'transient': isTransient(category, status),
+            'timestamp': datetime.now(timezone.utc).isoformat()})
+
+        with self._lock:
+            previous = self._records.get(record['vessel_url'])
+            if previous is not None:
+                record['attempts'] += previous['attempts']
+            self._records[record['vessel_url']] = record
+
+    def update(self, other):
+        """Add the records of another log, summing the attempts for urls in
+        both"""
+        for record in other.records():
+            with self._lock:
+                previous = self._records.get(record['vessel_url'])
+                if previous is not None:
+                    record['attempts'] += previous['attempts']
+                self._records[record['vessel_url']] = record
+
+    def discard(self, vessel_url):
+        """Remove the record for a url e.g. once it is scraped on retry"""
+        with self._lock:
+            self._records.pop(vessel_url, None)
+
+    def records(self):
+        """List of copies of the record dictionaries"""
+        with self._lock:
+            return [dict(r) for r in self._records.values()]
+
+    def urls(self):
+        """List of the vessel urls in the log"""
+        with self._lock:
+            return list(self._records)
+
+    def select(self, transient=None, urls=None, skippable=None):
+        """New log of the matching records
+
+        Keyword arguments:
+        transient -- If `True`, then only transient errors; if `False`, then
+            only permanent errors; if None, then both
+        urls -- Collection of vessel urls to select; if None, then all
+        skippable -- If `True`, then only errors of urls with no rows, see
+            `isSkippable()`; if `False`, then only the others; if None, then
+            both
+        """
+        return ErrorLog(r for r in self.records()
+                        if (transient is None or r['transient'] == transient)
+                        and (urls is None or r['vessel_url'] in urls)
+                        and (skippable is None
+                             or isSkippable(r['category'], r['status'])
+                             == skippable))
+
+    def toFrame(self):
+        """Records as a pandas data frame with the `ERROR_COLS` columns"""
+        return pd.DataFrame(self.records(), columns=ERROR_COLS, dtype=object)
+
+    @classmethod
+    def read(cls, error_csv):
+        """Read a log written by `write()`; empty if the file does not exist
+
+        Keyword arguments:
+        error_csv -- File name; "../data/" is pre-pended
+        """
+        path = const.DATA_DIR + error_csv
+        if not os.path.exists(path):
+            return cls()
+
+        df = pd.read_csv(path, dtype='str', encoding='utf-8',
+                         keep_default_na=False)
+        if 'category' not in df.columns:
+            # Error files from before errors were classified are a single
+            # column of urls
+            df = pd.DataFrame({'vessel_url': df.iloc[:, 0],
+                               'category': 'unknown'})
+
+        df = df.reindex(columns=ERROR_COLS)
+        df['attempts'] = pd.to_numeric(df['attempts']).fillna(1).astype(int)
+        df['transient'] = df['transient'] == 'True'
+        df = df.astype(object).where(df.notna() & (df != ''), None)
+
+        return cls(df.to_dict('records'))
+
+    def write(self, error_csv):
+        """Write the log as csv
+
+        Keyword arguments:
+        error_csv -- File name; "../data/" is pre-pended
+        """
+        self.toFrame().to_csv(const.DATA_DIR + error_csv, index=False)
@@ -0,0 +1,597 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import threading
+import time
+from urllib.parse import quote, unquote, urlsplit
+
+import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+
+requests = lazy.lazyImport('requests')
+
+logger = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    """A MediaWiki API request failed; `code` is the API error code, or the
+    HTTP status for non-200 responses"""
+
+    def __init__(self, code, info=''):
+        super().__init__(f"{code} {info}".strip())
+        self.code = code
+
+
+class RateController:
+    """Adaptive limit on the request rate and concurrency of all fetches.
+
+    Additive increase, multiplicative decrease (AIMD): each successful
+    response raises the rate by `RATE_STEP` requests per second and the
+    concurrency by about one per window of requests; each throttled response
+    (HTTP 429 or 503, or a MediaWiki 'maxlag' error) halves both and pauses
+    all requests for the 'Retry-After' seconds. Only one decrease is made
+    for the requests in flight when the server starts throttling, as they
+    were all sent at the higher rate.
+
+    The current limits are published as the 'fetch_rate_per_second' and
+    'fetch_concurrency' gauges.
+    """
+    RATE_STEP = 0.1
+    DECREASE = 0.5
+    BACKOFF_SECONDS = 1.0
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=50.0, concurrency=1,
+                 max_concurrency=8):
+        """
+        Keyword arguments:
+        rate -- Starting requests per second
+        min_rate -- Requests per second are never decreased below this
+        max_rate -- Requests per second are never increased above this
+        concurrency -- Starting number of requests in flight at once
+        max_concurrency -- Requests in flight are never increased above this
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._rate = rate
+        self._concurrency = float(concurrency)
+        self._in_flight = 0
+        self._next_at = 0.0
+        self._blocked_until = 0.0
+        self._decreased_at = 0.0
+        self._publish()
+
+    @property
+    def rate(self):
+        """Current requests per second"""
+        return self._rate
+
+    @property
+    def concurrency(self):
+        """Current number of requests allowed in flight at once"""
+        return int(self._concurrency)
+
+    def _publish(self):
+        metrics.setGauge('fetch_rate_per_second', round(self._rate, 3))
+        metrics.setGauge('fetch_concurrency', int(self._concurrency))
+
+    def acquire(self):
+        """Wait until a request may be sent
+
+        Return:
+        A token to pass to `release()` once the response is received
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = max(self._next_at, self._blocked_until) - now
+                if wait <= 0 and self._in_flight < int(self._concurrency):
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+
+            self._in_flight += 1
+            self._next_at = max(now, self._next_at) + 1 / self._rate
+
+        return now
+
+    def release(self, token, throttled=False, retry_after=None):
+        """Update the limits with the outcome of a request
+
+        Keyword arguments:
+        token -- Token from `acquire()` for the request
+        throttled -- If `True`, then the server asked to slow down
+        retry_after -- Seconds the server asked to wait before the next
+            request; `BACKOFF_SECONDS` if throttled and None
+        """
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if not throttled:
+                self._rate = min(self.max_rate, self._rate + self.RATE_STEP)
+                self._concurrency = min(
+                    self.max_concurrency,
+                    self._concurrency + 1 / self._concurrency)
+            else:
+                if retry_after is None:
+                    retry_after = self.BACKOFF_SECONDS
+                self._blocked_until = max(self._blocked_until,
+                                          now + retry_after)
+
+                # Requests sent before the last decrease do not decrease again
+                if token >= self._decreased_at:
+                    self._rate = max(self.min_rate,
+                                     self._rate * self.DECREASE)
+                    self._concurrency = max(1.0,
+                                            self._concurrency * self.DECREASE)
+                    self._decreased_at = now
+
+            self._publish()
+            self._cond.notify_all()
+
+
+# Shared by all fetches
+CONTROLLER = RateController()
+
+
+class SentEvent(threading.Event):
+    """Event set once a request is sent, with the `time.perf_counter()`
+    `start` time"""
+
+    def __init__(self):
+        super().__init__()
+        self.start = None
+
+    def set(self):
+        self.start = time.perf_counter()
+        super().set()
+
+
+class Hedger:
+    """Hedged requests, to cut the tail latency of fetches.
+
+    A request that has not been answered after the rolling `QUANTILE`
+    percentile latency of the last `window` requests is sent again, and the
+    first answer is taken; the slower request runs to completion, or its
+    deadline, in the background. Hedges are capped at `max_fraction` of the
+    requests, and are only sent once there are `min_samples` latencies.
+
+    Latencies are recorded as the 'fetch_seconds' of the first requests i.e.
+    before hedging, 'fetch_hedge_seconds' of the hedges, and
+    'fetch_effective_seconds' of the first answer i.e. after hedging. Hedges
+    are counted in the 'fetch_hedges_total' metric by which request
+    answered first, and hedges not sent for lack of budget in
+    'fetch_hedges_skipped_total'.
+    """
+    QUANTILE = 95
+
+    def __init__(self, max_fraction=0.05, window=200, min_samples=20,
+                 stages=('vessel', ), workers=32):
+        """
+        Keyword arguments:
+        max_fraction -- Maximum hedges as a fraction of requests
+        window -- Number of recent latencies for the hedge delay
+        min_samples -- Latencies needed before hedging
+        stages -- Stages to hedge the requests of e.g. 'vessel'
+        workers -- Threads sending requests and hedges
+        """
+        self.max_fraction = max_fraction
+        self.min_samples = min_samples
+        self.stages = tuple(stages)
+        self._latencies = deque(maxlen=window)
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+        lazy.load(requests)
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix='hedge')
+
+    def delay(self):
+        """Seconds to wait for an answer before hedging; `None` while there
+        are fewer than `min_samples` latencies"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return metrics.percentile(list(self._latencies), self.QUANTILE)
+
+    def _allow(self):
+        """Whether a hedge is within the budget; counts the hedge if so"""
+        with self._lock:
+            if self._hedges + 1 > self.max_fraction * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def _primary(self, send, sent):
+        response = send(False, sent)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - sent.start)
+
+        return response
+
+    def fetch(self, send, stage):
+        """Send a request, hedging it if it is not answered in time
+
+        Latencies are timed from when the first request is sent i.e. after
+        the rate controller allows it, as for 'fetch_seconds'.
+
+        Keyword arguments:
+        send -- Callable sending the request, passed `True` for a hedge, and
+            a `threading.Event` to set once the request is sent, returning
+            the response
+        stage -- Name of the pipeline stage, used as a metric label
+
+        Return:
+        The first response; if both requests raise, or the first raises
+        before it is sent, then the first exception is re-raised
+        """
+        with self._lock:
+            self._requests += 1
+
+        sent = SentEvent()
+        primary = self._pool.submit(self._primary, send, sent)
+        pending = {primary}
+        hedge = None
+        # The request may raise before it is sent e.g. in the rate controller
+        while not sent.wait(0.1):
+            if primary.done():
+                return primary.result()
+        done, _ = wait(pending, timeout=self.delay())
+        if not done:
+            if self._allow():
+                hedge = self._pool.submit(send, True, None)
+                pending.add(hedge)
+            else:
+                metrics.inc('fetch_hedges_skipped_total', stage=stage)
+
+        winner, error = None, None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
+                    break
+                error = error or future.exception()
+
+        if hedge is not None:
+            metrics.inc('fetch_hedges_total', stage=stage,
+                        first='hedge' if winner is hedge else 'primary')
+        metrics.observe('fetch_effective_seconds',
+                        time.perf_counter() - sent.start, stage=stage)
+
+        if winner is None:
+            raise error
+
+        return winner.result()
+
+
+# Hedges requests if set, see `Hedger`; shared by all fetches
+HEDGER = None
+
+
+def readContent(response, deadline_at):
+    """Read the body of a streamed response before a deadline
+
+    Keyword arguments:
+    response -- A `requests.Response` of a request with `stream=True`
+    deadline_at -- `time.monotonic()` time to finish reading by
+
+    Return:
+    None; raises `requests.Timeout` if the deadline passes, e.g. for a
+    server sending the body slowly, or the body stalls, and
+    `requests.ConnectionError` if it is cut off, as for other request
+    errors
+    """
+    # Loaded with requests
+    import urllib3.exceptions
+
+    read1 = getattr(response.raw, 'read1', None)
+    if read1 is not None:
+        # urllib3 2 returns the bytes as they arrive, rather than blocking
+        # until a chunk is full, so a slow body cannot overrun the deadline;
+        # its errors are not wrapped as by `iter_content()`
+        stream = iter(lambda: read1(const.FETCH_CHUNK_BYTES,
+                                    decode_content=True), b'')
+    else:
+        stream = response.iter_content(const.FETCH_CHUNK_BYTES)
+
+    chunks = []
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            if time.monotonic() > deadline_at:
+                raise requests.Timeout(
+                    f"Deadline exceeded reading {response.url}")
+    except urllib3.exceptions.ReadTimeoutError as e:
+        response.close()
+        raise requests.Timeout(e, response=response) from e
+    except urllib3.exceptions.DecodeError as e:
+        response.close()
+        raise requests.ContentDecodingError(e, response=response) from e
+    except urllib3.exceptions.HTTPError as e:
+        # e.g. `ProtocolError` for a body cut off
+        response.close()
+        raise requests.ConnectionError(e, response=response) from e
+    except requests.Timeout:
+        response.close()
+        raise
+
+    # As read by `response.content` when not streamed
+    response._content = b''.join(chunks)
+
+
+def retryAfter(response):
+    """Seconds to wait from a response's 'Retry-After' header
+
+    Keyword arguments:
+    response -- A `requests.Response`
+
+    Return:
+    The seconds, from either delay seconds or an HTTP date; `None` if there is
+    no valid header
+    """
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def throttleReason(response):
+    """Why the server throttled a response e.g. '429', 'maxlag'; `None` if it
+    did not"""
+    if response.status_code in (429, 503):
+        return str(response.status_code)
+
+    # MediaWiki answers requests with a 'maxlag' parameter with an error
+    # while its database replicas lag, see
+    # https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+    if response.headers.get('MediaWiki-API-Error') == 'maxlag':
+        return 'maxlag'
+
+    return None
+
+
+def wireBytes(response):
+    """Bytes of a response body as transferred i.e. before any gzip or
+    deflate content encoding is decoded"""
+    tell = getattr(response.raw, 'tell', None)
+    try:
+        return int(tell())
+    except (TypeError, ValueError):
+        return len(response.content)
+
+
+def sendRequest(url, stage, controller, deadline, hedge=False, sent=None,
+                **kwargs):
+    """Send one request, paced by the rate controller, recording fetch
+    metrics as per `getURL()`
+
+    Keyword arguments:
+    url -- The url to get
+    stage -- Name of the pipeline stage, used as a metric label
+    controller -- `RateController` to pace the request
+    deadline -- Seconds to get the whole response in, after the request is
+        sent
+    hedge -- If `True`, then the request is a hedge, and its latency is
+        recorded as 'fetch_hedge_seconds' instead of 'fetch_seconds'
+    sent -- `threading.Event` to set once the rate controller allows the
+        request; ignored if None
+    **kwargs -- Arguments passed to `requests.get`
+
+    Return:
+    The `requests.Response`; request exceptions, including
+    `requests.Timeout` if the deadline passes, are re-raised
+    """
+    token = controller.acquire()
+    start = time.perf_counter()
+    if sent is not None:
+        sent.set()
+
+    # The slot is released whatever is raised, so it cannot leak; exceptions
+    # other than request errors count as throttled, to back off
+    throttled, retry_after = True, None
+    try:
+        response = requests.get(url=url, timeout=deadline, stream=True,
+                                **kwargs)
+        readContent(response, time.monotonic() + deadline)
+        throttled = throttleReason(response) is not None
+        retry_after = retryAfter(response)
+    except requests.RequestException as e:
+        throttled = isinstance(e, (requests.ConnectionError,
+                                   requests.Timeout))
+        metrics.inc('fetch_errors_total', stage=stage,
+                    reason=type(e).__name__)
+        logger.warning(f"Error getting {url}: {e}")
+        raise
+    finally:
+        controller.release(token, throttled=throttled,
+                           retry_after=retry_after)
+        metrics.observe('fetch_hedge_seconds' if hedge else 'fetch_seconds',
+                        time.perf_counter() - start, stage=stage)
+
+    metrics.inc('fetch_responses_total', stage=stage,
+                status=response.status_code)
+    metrics.inc('fetch_bytes_total', len(response.content), stage=stage)
+    metrics.inc('fetch_wire_bytes_total', wireBytes(response), stage=stage)
+
+    return response
+
+
+def getURL(url, stage, retries=3, controller=None, deadline=None,
+           hedger=None, **kwargs):
+    """Get a url, recording fetch metrics
+
+    Requests are paced by the rate controller; throttled responses are
+    retried once the controller allows, up to `retries` times. Each request
+    has a deadline for the whole response, so a slow server cannot hold up
+    a crawl, and requests of the hedger's stages are hedged; see `Hedger`.
+
+    Records for the stage: fetch latency ('fetch_seconds'), bytes downloaded
+    ('fetch_bytes_total'), bytes on the wire before decompression
+    ('fetch_wire_bytes_total'), responses by HTTP status
+    ('fetch_responses_total'), throttled responses by reason
+    ('fetch_throttled_total') and request exceptions by type
+    ('fetch_errors_total'); hedged requests record the hedge metrics of
+    `Hedger` too.
+
+    Keyword arguments:
+    url -- The url to get
+    stage -- Name of the pipeline stage e.g. 'vessel', used as a metric label
+    retries -- Times to retry a throttled response
+    controller -- `RateController` to pace the request; if None, then the
+        shared `CONTROLLER`
+    deadline -- Seconds to get each whole response in; if None, then
+        `const.FETCH_DEADLINE`
+    hedger -- `Hedger` to hedge the request with; if None, then the shared
+        `HEDGER`, if any
+    **kwargs -- Arguments passed to `requests.get`
+
+    Return:
+    The `requests.Response`, which is the last throttled response if retries
+    run out; request exceptions, including `requests.Timeout` if a deadline
+    passes, are re-raised
+    """
+    controller = controller or CONTROLLER
+    deadline = deadline or const.FETCH_DEADLINE
+    hedger = hedger or HEDGER
+    if hedger is not None and stage not in hedger.stages:
+        hedger = None
+
+    def send(hedge, sent=None):
+        return sendRequest(url, stage, controller, deadline, hedge, sent,
+                           **kwargs)
+
+    for attempt in range(retries + 1):
+        response = send(False) if hedger is None else \
+            hedger.fetch(send, stage)
+
+        reason = throttleReason(response)
+        if reason is None:
+            break
+
+        metrics.inc('fetch_throttled_total', stage=stage, reason=reason)
+        logger.info(f"Throttled ({reason}) getting {url}; now "
+                    + f"{controller.rate:.2f} requests per second")
+
+    return response
+
+
+def articleAPI(url):
+    """MediaWiki API url and page title for an article url
+
+    Keyword arguments:
+    url -- Article url e.g. 'https://en.wikipedia.org/wiki/USS_Kirk_(FF-1087)'
+
+    Return:
+    A tuple (api_url, title) e.g. ('https://en.wikipedia.org/w/api.php',
+    'USS Kirk (FF-1087)')
+    """
+    parts = urlsplit(url)
+    title = unquote(parts.path.split('/wiki/', 1)[-1]).replace('_', ' ')
+
+    return f"{parts.scheme}://{parts.netloc}{const.API_PATH}", title
+
+
+def articlePath(title):
+    """Article url path for a page title, encoded as in Wikipedia's html
+    links e.g. '/wiki/USS_Kirk_(FF-1087)'"""
+    return '/wiki/' + quote(title.replace(' ', '_'), safe=";@$!*(),/~:")
+
+
+def getAPI(api_url, params, stage, raise_errors=False, **kwargs):
+    """Query the MediaWiki API, recording fetch metrics as per `getURL()`
+
+    Requests json (format version 2) with a compressed transfer, and a
+    'maxlag' parameter so the server throttles the crawl while its database
+    replicas lag. API errors are counted in the 'fetch_api_errors_total'
+    metric by error code.
+
+    Keyword arguments:
+    api_url -- The API url e.g. 'https://en.wikipedia.org/w/api.php'
+    params -- Dictionary of query parameters e.g. {'action': 'parse'}
+    stage -- Name of the pipeline stage, used as a metric label
+    raise_errors -- If `True`, then raise `APIError` instead of returning
+        `None` for errors
+    **kwargs -- Arguments passed to `getURL()`
+
+    Return:
+    The decoded json dictionary; `None` if the response is not HTTP 200 or is
+    an API error
+    """
+    params = {'format': 'json', 'formatversion': 2,
+              'maxlag': const.API_MAXLAG, **params}
+    headers = {'Accept-Encoding': 'gzip', **kwargs.pop('headers', {})}
+    response = getURL(api_url, stage, params=params, headers=headers,
+                      **kwargs)
+
+    code, info = None, ''
+    if response.status_code != 200:
+        code = response.status_code
+    else:
+        try:
+            data = response.json()
+        except ValueError:
+            code = 'json'
+        else:
+            if 'error' in data:
+                code = data['error'].get('code', 'unknown')
+                info = data['error'].get('info', '')
+                logger.warning(f"API error {code} for {params}: {info}")
+
+    if code is None:
+        return data
+
+    metrics.inc('fetch_api_errors_total', stage=stage, code=code)
+    if raise_errors:
+        raise APIError(code, info)
+
+    return None
+
+
+def queryAll(api_url, params, stage, **kwargs):
+    """Query the MediaWiki API, following continuation until all results are
+    returned
+
+    Keyword arguments:
+    api_url -- The API url e.g. 'https://en.wikipedia.org/w/api.php'
+    params -- Dictionary of query parameters e.g. {'generator': 'links'};
+        'action' is 'query'
+    stage -- Name of the pipeline stage, used as a metric label
+    **kwargs -- Arguments passed to `getURL()`
+
+    Return:
+    A generator of the 'query' dictionary of each response; stops early if
+    a request fails, see `getAPI()`
+    """
+    params = {'action': 'query', **params}
+    continued = {}
+    while True:
+        data = getAPI(api_url, {**params, **continued}, stage, **kwargs)
+        if data is None:
+            logger.warning(f"Query stopped early for {params}")
+            return
+
+        if 'query' in data:
+            yield data['query']
+
+        if 'continue' not in data:
+            return
+
+        continued = data['continue']
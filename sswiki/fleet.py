@@ -0,0 +1,236 @@
+import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.utils as utils
+
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
+
+
+def getServiceIntervals(sh, start_cols=None, end_cols=None,
+                        group_col='group_type'):
+    """Combines vessel service history dates into periods in commission.
+
+    Dates from `start_cols` and `end_cols` are taken in date order for each
+    row; a period starts at the first start date and ends at the next end
+    date. A period with no end date is still in commission. End dates with no
+    preceding start date are ignored.
+
+    Keyword arguments:
+    sh -- A pandas data frame of vessel service history data with dates
+        normalized e.g. from `sswiki.convertDates()` and `sswiki.getFates()`
+    start_cols -- List of column names with dates a period starts; if None,
+        then `const.START_SH_COLS`; suffixed columns as per
+        `utils.findDFCols()` are included
+    end_cols -- List of column names with dates a period ends; if None, then
+        `const.END_SH_COLS`; suffixed columns are included
+    group_col -- Column name with the vessel group e.g. 'group_type'
+
+    Return:
+    A pandas data frame with columns 'uuid', 'group', 'start' and 'end'; 'end'
+    is `NaT` for periods still in commission
+    """
+    start_cols = utils.findDFCols(sh, start_cols or const.START_SH_COLS)
+    end_cols = utils.findDFCols(sh, end_cols or const.END_SH_COLS)
+
+    events = []
+    for cols, is_end in ((start_cols, False), (end_cols, True)):
+        if len(cols) == 0:
+            continue
+
+        dates = sh[cols].apply(pd.to_datetime, errors='coerce')
+        dates = dates.set_axis(range(len(sh))).stack()
+        events.append(pd.DataFrame({'row': dates.index.get_level_values(0),
+                                    'date': dates.values,
+                                    'is_end': is_end}))
+
+    if not events:
+        return pd.DataFrame({'uuid': pd.Series(dtype=object),
+                             'group': pd.Series(dtype=object),
+                             'start': pd.Series(dtype='datetime64[ns]'),
+                             'end': pd.Series(dtype='datetime64[ns]')})
+
+    events = pd.concat(events).sort_values(['row', 'date', 'is_end'],
+                                           kind='stable')
+
+    intervals = []
+    row_prev, start = None, None
+    for row, date, is_end in events.itertuples(index=False):
+        if row != row_prev:
+            if start is not None:
+                intervals.append((row_prev, start, pd.NaT))
+            row_prev, start = row, None
+
+        if not is_end and start is None:
+            start = date
+        elif is_end and start is not None:
+            intervals.append((row, start, date))
+            start = None
+
+    if start is not None:
+        intervals.append((row_prev, start, pd.NaT))
+
+    intervals = pd.DataFrame(intervals, columns=['row', 'start', 'end'])
+    groups = sh[group_col] if group_col in sh.columns else \
+        pd.Series(np.nan, index=sh.index)
+
+    return pd.DataFrame({
+        'uuid': sh.index[intervals['row']],
+        'group': groups.iloc[intervals['row']].values,
+        'start': intervals['start'].values.astype('datetime64[D]'),
+        'end': intervals['end'].values.astype('datetime64[D]')})
+
+
+class FleetIndex:
+    """Counts of vessels in commission at any date, in total and by group.
+
+    Keeps a sweep line over the start and end dates of each period in
+    commission: the sorted event dates and the prefix sum of vessels in
+    commission after each date. A count for a date is a binary search.
+    A vessel is in commission from its start date up to, but not including,
+    its end date.
+    """
+    def __init__(self, sh=None, **kwargs):
+        """Builds the index from vessel service history data
+
+        Keyword arguments:
+        sh -- A pandas data frame of vessel service history data; see
+            `getServiceIntervals()`; ignored if None
+        **kwargs -- Arguments passed to `getServiceIntervals()`
+        """
+        self._kwargs = kwargs
+        self._intervals = []
+        self._sweeps = None
+
+        if sh is not None:
+            self.addVessels(sh)
+
+    @property
+    def intervals(self):
+        """All periods in commission as per `getServiceIntervals()`"""
+        if len(self._intervals) > 1:
+            self._intervals = [pd.concat(self._intervals, ignore_index=True)]
+
+        if not self._intervals:
+            return getServiceIntervals(pd.DataFrame())
+
+        return self._intervals[0]
+
+    def addVessels(self, sh):
+        """Adds periods in commission for more vessels
+
+        New periods are kept separately and merged into the sweep line on the
+        next count.
+
+        Keyword arguments:
+        sh -- A pandas data frame of vessel service history data
+        """
+        new = getServiceIntervals(sh, **self._kwargs)
+        self._intervals.append(new)
+
+        if self._sweeps is not None:
+            self._pending.append(new)
+
+    def _buildSweeps(self, intervals):
+        """Event dates and their change in vessel count, overall and by group;
+        empty if there are no periods e.g. all dates are empty
+        """
+        sweeps = {}
+        if len(intervals) == 0:
+            return sweeps
+
+        groups = [(None, intervals)] + \
+            list(intervals.groupby('group', sort=False, dropna=True))
+
+        for group, grp in groups:
+            ends = grp['end'].values
+            ends = ends[~np.isnat(ends)]
+            dates = np.concatenate([grp['start'].values, ends])
+            deltas = np.concatenate([np.ones(len(grp), dtype=np.int64),
+                                     -np.ones(len(ends), dtype=np.int64)])
+            sweeps[group] = (dates, deltas)
+
+        return sweeps
+
+    def _update(self):
+        """Merges any new periods into the sweep line"""
+        if self._sweeps is None:
+            self._events = self._buildSweeps(self.intervals)
+            self._pending = []
+        elif self._pending:
+            pending = pd.concat(self._pending, ignore_index=True)
+            for group, (dates, deltas) in self._buildSweeps(pending).items():
+                old_dates, old_deltas = self._events.get(
+                    group, (dates[:0], deltas[:0]))
+                self._events[group] = (np.concatenate([old_dates, dates]),
+                                       np.concatenate([old_deltas, deltas]))
+            self._pending = []
+        else:
+            return
+
+        self._sweeps = {}
+        for group, (dates, deltas) in self._events.items():
+            order = np.argsort(dates, kind='stable')
+            dates, counts = dates[order], np.cumsum(deltas[order])
+
+            # Only keep the count after the last event on each date
+            last = np.append(dates[1:] != dates[:-1], True)
+            self._sweeps[group] = (dates[last], counts[last])
+
+    @property
+    def groups(self):
+        """List of the vessel groups in the index"""
+        self._update()
+        return [group for group in self._sweeps if group is not None]
+
+    def countAt(self, date, group=None):
+        """Number of vessels in commission on a date
+
+        Keyword arguments:
+        date -- Date as string 'YYYY-MM-DD' or datetime like
+        group -- Vessel group e.g. 'Destroyers'; if None, then all vessels
+
+        Return:
+        Integer number of vessels in commission
+        """
+        return int(self.countsAt([date], group)[0])
+
+    def countsAt(self, dates, group=None):
+        """Number of vessels in commission on each date
+
+        Keyword arguments:
+        dates -- List like of dates
+        group -- Vessel group e.g. 'Destroyers'; if None, then all vessels
+
+        Return:
+        A numpy array of the number of vessels in commission
+        """
+        self._update()
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        if group not in self._sweeps:
+            return np.zeros(len(dates), dtype=np.int64)
+
+        events, counts = self._sweeps[group]
+        pos = np.searchsorted(events, dates, side='right') - 1
+
+        return np.where(pos < 0, 0, counts[np.maximum(pos, 0)])
+
+    def countSeries(self, start, end, freq='MS', by_group=False):
+        """Number of vessels in commission over a date range
+
+        Keyword arguments:
+        start -- First date as string 'YYYY-MM-DD' or datetime like
+        end -- Last date as string 'YYYY-MM-DD' or datetime like
+        freq -- Pandas frequency string for the dates e.g. 'D', 'MS', 'YS'
+        by_group -- If `True`, then return counts for each vessel group
+
+        Return:
+        A pandas series of counts indexed by date; a pandas data frame with a
+        column for each vessel group if `by_group`
+        """
+        dates = pd.date_range(start, end, freq=freq)
+        if not by_group:
+            return pd.Series(self.countsAt(dates), index=dates,
+                             name='in_commission')
+
+        return pd.DataFrame({group: self.countsAt(dates, group)
+                             for group in self.groups}, index=dates)
@@ -1,53 +1,199 @@
-import numpy as np
-import pandas as pd
+from functools import lru_cache
+import re
+import time
+import unicodedata
 
+import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.profiling as profiling
+import sswiki.regex as regex
 
-def extractHullNo(df, col_fr, col_ht, col_hn, pat):
-    """Extract measurement based on pattern from df['col_fr'] to df['col_to']
-    with changes described in replacement
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
+
+
+def hullTypeIndex():
+    """Categorical index of the registered US Navy hull classification
+    symbols in `const.HULL_TYPES`
+
+    Return:
+    A pandas categorical index with one entry per registered hull type
+    """
+    types = list(const.HULL_TYPES)
+    return pd.CategoricalIndex(types, categories=types, name='Hull_type')
+
+
+# Case insensitive lookup from hull type to registered symbol e.g. 'cvn' to
+# 'CVN' and 'PYC' to 'PYc'
+_HULL_TYPE_KEYS = {ht.upper(): ht for ht in const.HULL_TYPES}
+
+
+@lru_cache(maxsize=None)
+def _hullPatterns(backend):
+    return (tuple(regex.compilePattern(pat) for pat in const.HULL_ID_PATS),
+            tuple(regex.compilePattern(pat) for pat in const.HULL_URL_PATS))
+
+
+def hullPatterns():
+    """Compiled hull number patterns for the `sswiki.regex` backend,
+    compiled on first use
+
+    Return:
+    A tuple of (tuple of compiled `const.HULL_ID_PATS`, tuple of compiled
+    `const.HULL_URL_PATS`)
+    """
+    return _hullPatterns(regex.BACKEND)
+
+
+def registeredHullType(ht):
+    """Registered hull classification symbol for the provided hull type
 
     Keyword arguments:
-    df -- A panda data frame with at least two columns
-    col_fr -- The name of the column to extract the measurement from
-    col_to -- The name of the column to extract the measurement to
-    pat -- regex pattern of the date format to search for in df['col_fr'].
-        Requires named group [xxxx]
-    repl -- A string representing the replacement format. [xxxx]
+    ht -- Hull type string e.g. 'DD' or 'cvn'
 
     Return:
-    A pandas series with recognized measurements [xxx]]
+    The symbol as found in `const.HULL_TYPES`; `None` if not registered
     """
+    if not isinstance(ht, str):
+        return None
+    return _HULL_TYPE_KEYS.get(ht.upper())
+
 
-    num_cols = len(df.columns)
-    df[col_fr] = df[col_fr].str.normalize('NFKD')
+def parseHullNo(ident, url, validate=True, stats=None):
+    """Extract vessel hull type and number from a vessel identification and
+    article url in a single pass
 
-    df = pd.concat([df, df.loc[df[col_hn].isna(), col_fr].
-                    str.extract(pat)], axis=1)
+    Tries each pattern in `const.HULL_ID_PATS` against `ident`, then each
+    pattern in `const.HULL_URL_PATS` against `url`, and returns the first
+    match. When validating, the first match with a registered hull type is
+    returned; if there is none, then the hull number of the first match is
+    kept without a hull type e.g. 'USS_Hannibal_(1898)' or 'Pennant number:
+    K123', as when not validating.
+
+    Keyword arguments:
+    ident -- Vessel identification string; ignored if not a string
+    url -- Wikipedia vessel article url; ignored if not a string
+    validate -- If `True`, then prefer matches where the hull type is in
+        `const.HULL_TYPES` and return the registered symbol, or `None` for
+        the hull type of other matches
+    stats -- Dictionary to record pattern statistics in for `profiling`;
+        ignored if None
+
+    Return:
+    A tuple (hull type, hull number); (`None`, `None`) if no match found
+    """
+    id_pats, url_pats = hullPatterns()
+    fallback = None
+    for text, pats in ((ident, id_pats), (url, url_pats)):
+        if not isinstance(text, str):
+            continue
 
-    df[col_hn] = np.where(df['hn'].isna(), df[col_hn], df['hn'])
-    df[col_ht] = np.where(df['ht'].isna(), df[col_ht], df['ht'])
+        text = unicodedata.normalize('NFKD', text)
+        for pat in pats:
+            if stats is None:
+                match = pat.search(text)
+            else:
+                start = time.perf_counter()
+                match = pat.search(text)
+                pat_stats = stats.setdefault(pat, [0, 0, 0.0])
+                pat_stats[0] += 1
+                pat_stats[2] += time.perf_counter() - start
 
-    df.drop(df.columns[[*range(num_cols, len(df.columns))]],
-            axis=1, inplace=True)
+            if match is None:
+                continue
+
+            ht = match.group('ht')
+            if validate:
+                ht = registeredHullType(ht)
+                if ht is None:
+                    fallback = fallback or (None, match.group('hn'))
+                    continue
+
+            if stats is not None:
+                stats[pat][1] += 1
+
+            return ht, match.group('hn')
+
+    return fallback or (None, None)
+
+
+def parseHullNos(ident, url, validate=True):
+    """Extract vessel hull type and number from series of vessel
+    identifications and article urls
+
+    Keyword arguments:
+    ident -- A pandas series of vessel identifications
+    url -- A pandas series of Wikipedia vessel article urls with the same
+        index as `ident`
+    validate -- If `True`, then only registered hull types are extracted and
+        'Hull_type' is categorical with the `hullTypeIndex()` categories;
+        hull numbers of other hull types are kept, see `parseHullNo()`
+
+    Return:
+    A pandas data frame with columns `Hull_type` and `Hull_no`
+    """
+    stats = {} if profiling.ENABLED else None
+    hull_nos = pd.DataFrame(
+        [parseHullNo(i, u, validate, stats) for i, u in zip(ident, url)],
+        index=ident.index,
+        columns=['Hull_type', 'Hull_no'],
+        dtype='object')
+
+    if stats is not None:
+        for source, pats in zip(('Identification', 'vessel_url'),
+                                hullPatterns()):
+            for n, pat in enumerate(pats):
+                attempts, wins, seconds = stats.get(pat, [0, 0, 0.0])
+                profiling.record(f"{source} {n + 1}", pat.pattern, attempts,
+                                 wins, seconds, 'hull numbers')
+
+    hull_nos.fillna(value=np.nan, inplace=True)
+    if validate:
+        hull_nos['Hull_type'] = pd.Categorical(
+            hull_nos['Hull_type'], categories=hullTypeIndex().categories)
+
+    return hull_nos
+
+
+def buildHullIndex(df, ht_col='Hull_type', hn_col='Hull_no'):
+    """Build a hash index from vessel hull type and number to data frame
+    index labels
+
+    Keyword arguments:
+    df -- A panda data frame with hull type and number columns e.g. from
+        `sswiki.convertHullNo()`
+    ht_col -- Column name with the hull type
+    hn_col -- Column name with the hull number
+
+    Return:
+    A dictionary with keys (hull type, integer hull number) and values the
+    pandas index of matching labels in `df`
+    """
+    hn = pd.to_numeric(df[hn_col], errors='coerce')
+    keys = df[ht_col].notna() & hn.notna()
 
-    return df
+    return df[keys].groupby(
+        [df.loc[keys, ht_col].astype(str), hn[keys].astype(int)],
+        sort=False).groups
 
 
-def seriesToHullNo(df, col_fr, pats, ht_col, hn_col):
-    """Extract vessel hull type and number from provided column
+def lookupHullNo(hull_index, ht, hn=None):
+    """Find vessels by hull type and number
 
     Keyword arguments:
-    df -- A panda data frame with column name provided by `col_fr`
-    col_fr -- Column name with the Wikiepdia vessel article url
-    pats -- List of regex patterns to use to extract. Should have group name
-        `ht` for 'Hull_type' and `hn` for 'Hull_no'
-    ht_col -- Column name to store hull type in
-    hn_col -- Column name to store hull number in
+    hull_index -- Hull index as returned by `buildHullIndex()`
+    ht -- Hull type e.g. 'DD'; or the full designation e.g. 'DD-445' if `hn`
+        is `None`
+    hn -- Hull number e.g. 445
 
     Return:
-    A pandas data frame with additional columns `Hull_type` and `Hull_no`
+    A pandas index with the matching labels; empty if no match found
     """
-    for pat in pats:
-        df = extractHullNo(df, col_fr, 'Hull_type', 'Hull_no', pat)
+    if hn is None:
+        match = re.match(r'^(?P<ht>.+?)\-?(?P<hn>\d+)$', ht.strip())
+        if match is None:
+            return pd.Index([])
+        ht, hn = match.group('ht'), match.group('hn')
 
-    return df
+    ht = registeredHullType(ht) or ht
+    return hull_index.get((ht, int(hn)), pd.Index([]))
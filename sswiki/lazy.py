@@ -0,0 +1,45 @@
+import importlib.util
+import sys
+
+
+def lazyImport(name):
+    """Import a module that is only loaded on first attribute access
+
+    Used for heavy dependencies e.g. pandas, requests, so commands that do
+    not use them do not pay their import time. Loading is not thread safe
+    before Python 3.12: threads touching the module while another thread
+    loads it see a partly run module; see `load()`.
+
+    Keyword arguments:
+    name -- Full module name e.g. 'pandas', 'sswiki.date_formatting'
+
+    Return:
+    The module; loaded already if it was imported before
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
+
+
+def load(*modules):
+    """Load lazily imported modules now, before starting threads that use
+    them; see `lazyImport()`
+
+    Keyword arguments:
+    *modules -- Modules from `lazyImport()`; loaded modules are ignored
+    """
+    for module in modules:
+        # Any attribute access runs a lazy module
+        getattr(module, '__name__')
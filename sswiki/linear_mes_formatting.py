@@ -1,11 +1,14 @@
-import numpy as np
-import pandas as pd
 import re
 
 import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.profiling as profiling
 
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
 
-def extractMes(df, col_fr, col_to, pat, repl=None):
+
+def extractMes(df, col_fr, col_to, pat, repl=None, label=None):
     """Extract measurement based on pattern from df['col_fr'] to df['col_to']
     with changes described in replacement
 
@@ -16,6 +19,7 @@ def extractMes(df, col_fr, col_to, pat, repl=None):
     pat -- regex pattern of the date format to search for in df['col_fr'].
         Requires named group [xxxx]
     repl -- A string representing the replacement format. [xxxx]
+    label -- Short name of the pattern for `profiling`
 
     Return:
     A pandas series with recognized measurements [xxx]]
@@ -24,8 +28,9 @@ def extractMes(df, col_fr, col_to, pat, repl=None):
     num_cols = len(df.columns)
     df[col_fr] = df[col_fr].str.normalize('NFKD')
 
-    df = pd.concat([df, df.loc[df[col_to].isna(), col_fr].
-                    str.extract(pat, flags=re.IGNORECASE)], axis=1)
+    df = pd.concat([df, profiling.extract(
+        df.loc[df[col_to].isna(), col_fr], pat, re.IGNORECASE, label)],
+        axis=1)
     df.fillna(value={'inq': 0}, inplace=True)
 
     repl = list(repl)
@@ -66,14 +71,15 @@ def seriesToMetres(sf):
     df = pd.DataFrame({'sf': sf})
     df['metres'] = np.nan
 
-    # Find any existing measurements in metres
-    pat = start_pat + m_pat + end_pat
-    repl = 'm'
-    df = extractMes(df, 'sf', 'metres', pat, repl)
+    with profiling.cascade('metres'):
+        # Find any existing measurements in metres
+        pat = start_pat + m_pat + end_pat
+        repl = 'm'
+        df = extractMes(df, 'sf', 'metres', pat, repl, 'metres')
 
-    # Correct feet and/or inches
-    pat = start_pat + ft_pat + '( ' + in_pat + ')?' + end_pat
-    repl = 'fi'
-    df = extractMes(df, 'sf', 'metres', pat, repl)
+        # Correct feet and/or inches
+        pat = start_pat + ft_pat + '( ' + in_pat + ')?' + end_pat
+        repl = 'fi'
+        df = extractMes(df, 'sf', 'metres', pat, repl, 'feet and inches')
 
     return df['metres']
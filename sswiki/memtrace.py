@@ -0,0 +1,249 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import sswiki.metrics as metrics
+
+# Memory tracing is off unless enabled with `enable()` or the SSWIKI_MEMTRACE
+# environment variable; tracemalloc slows allocation heavy code considerably
+ENABLED = os.environ.get('SSWIKI_MEMTRACE', '') not in ('', '0')
+
+# Seconds between RSS samples while a stage is running
+RSS_INTERVAL = float(os.environ.get('SSWIKI_MEMTRACE_RSS_INTERVAL', 0.05))
+
+_lock = threading.Lock()
+_local = threading.local()
+_stages = {}
+_calls = []
+_active = {}
+_sampler = None
+_started_tracing = False
+
+STAGE_COLS = ['stage', 'calls', 'seconds', 'peak_bytes', 'retained_bytes',
+              'rss_peak_bytes', 'rss_growth_bytes']
+
+
+def currentRSS():
+    """Current resident set size of the process in bytes
+
+    Return:
+    Bytes; `None` if not available on this platform
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    return psutil.Process().memory_info().rss
+
+
+def _sample():
+    """Background thread updating the RSS peak of the active stages"""
+    global _sampler
+    while True:
+        with _lock:
+            if not _active:
+                _sampler = None
+                break
+            frames = list(_active.values())
+
+        rss = currentRSS()
+        if rss is not None:
+            for frame in frames:
+                frame['rss_peak'] = max(frame['rss_peak'] or 0, rss)
+
+        time.sleep(RSS_INTERVAL)
+
+
+def enable():
+    """Turn on memory tracing"""
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """Turn off memory tracing, stopping tracemalloc if started by
+    `stage()`"""
+    global ENABLED, _started_tracing
+    ENABLED = False
+    if _started_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _started_tracing = False
+
+
+def reset():
+    """Clear all recorded stage memory statistics"""
+    with _lock:
+        _stages.clear()
+        _calls.clear()
+
+
+@contextmanager
+def stage(name):
+    """Context manager attributing memory to a pipeline stage e.g.
+    'normalize gc'
+
+    Records the traced (tracemalloc) peak above the memory in use at the
+    start of the stage, the traced memory retained at the end of the stage,
+    and the RSS peak and growth. Stages can be nested; the peak of a nested
+    stage counts towards the peak of the enclosing stages.
+
+    Keyword arguments:
+    name -- Stage name
+    """
+    if not ENABLED:
+        yield
+        return
+
+    global _started_tracing, _sampler
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    # tracemalloc has a single peak, so keep the enclosing stage's peak so
+    # far before resetting it for this stage
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+    tracemalloc.reset_peak()
+
+    rss = currentRSS()
+    frame = {'peak': current, 'rss_peak': rss}
+    stack.append(frame)
+    with _lock:
+        _active[id(frame)] = frame
+        if _sampler is None and RSS_INTERVAL > 0:
+            _sampler = threading.Thread(target=_sample, name='memtrace-rss',
+                                        daemon=True)
+            _sampler.start()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        end, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+
+        stack.pop()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+        rss_end = currentRSS()
+        with _lock:
+            del _active[id(frame)]
+        rss_peak = max(frame['rss_peak'] or 0, rss_end or 0) or None
+
+        _record(name, seconds, peak - current, end - current, rss_peak,
+                None if rss is None or rss_end is None else rss_end - rss)
+
+
+def _record(name, seconds, peak, retained, rss_peak, rss_growth):
+    call = {'stage': name,
+            'seconds': round(seconds, 6),
+            'peak_bytes': peak,
+            'retained_bytes': retained,
+            'rss_peak_bytes': rss_peak,
+            'rss_growth_bytes': rss_growth}
+
+    with _lock:
+        _calls.append(call)
+        stats = _stages.setdefault(name, {'calls': 0, 'seconds': 0.0,
+                                          'peak_bytes': 0,
+                                          'retained_bytes': 0,
+                                          'rss_peak_bytes': None,
+                                          'rss_growth_bytes': None})
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+        stats['retained_bytes'] += retained
+        if rss_peak is not None:
+            stats['rss_peak_bytes'] = max(stats['rss_peak_bytes'] or 0,
+                                          rss_peak)
+        if rss_growth is not None:
+            stats['rss_growth_bytes'] = (stats['rss_growth_bytes'] or 0) \
+                + rss_growth
+
+    metrics.setGauge('memory_peak_bytes', stats['peak_bytes'], stage=name)
+
+
+def traced(name=None):
+    """Decorator attributing the memory of each call to a stage named after
+    the function e.g. 'convertDates'
+
+    Keyword arguments:
+    name -- Stage name; if None, then the function name
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stages():
+    """Memory statistics for each stage
+
+    Return:
+    A list of dictionaries, one per stage in the order first run, with the
+    keys in `STAGE_COLS`; 'peak_bytes' and 'rss_peak_bytes' are the largest
+    of any call, 'retained_bytes', 'rss_growth_bytes' and 'seconds' the sum
+    over all calls
+    """
+    with _lock:
+        return [{'stage': name, **stats, 'seconds': round(stats['seconds'], 6)}
+                for name, stats in _stages.items()]
+
+
+def profile():
+    """Memory profile of the run
+
+    Return:
+    A dictionary with the time, process peak RSS, the per stage statistics
+    from `stages()` and each traced call in the order completed
+    """
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        max_rss = None
+
+    with _lock:
+        calls = list(_calls)
+
+    return {'timestamp': datetime.now(timezone.utc).isoformat(),
+            'process_max_rss_bytes': max_rss,
+            'stages': stages(),
+            'calls': calls}
+
+
+def writeProfile(path):
+    """Write the memory profile from `profile()` as json
+
+    Keyword arguments:
+    path -- File path to write to
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile(), f, indent=2)
@@ -0,0 +1,297 @@
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import functools
+import json
+import os
+import threading
+import time
+
+
+def _labelKey(labels):
+    """Hashable, ordered form of a labels dictionary"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _labelText(key, extra=()):
+    """Prometheus text format for labels e.g. '{stage="vessel"}'"""
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+
+    def escape(v):
+        return v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}"
+
+
+def percentile(values, q):
+    """Percentile of a list of numbers by linear interpolation
+
+    Keyword arguments:
+    values -- List of numbers
+    q -- Percentile between 0 and 100
+
+    Return:
+    The percentile; `None` if `values` is empty
+    """
+    if not values:
+        return None
+
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class Metrics:
+    """Counters, gauges and histograms for a pipeline run.
+
+    Each metric is identified by name and labels e.g.
+    `inc('fetch_responses_total', stage='vessel', status=200)`. Each update is
+    also passed to any hooks added with `addHook()` as an event dictionary
+    with keys 'type', 'name', 'value', 'labels' and 'timestamp', so events
+    can be forwarded to other monitoring.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+               30.0, 60.0)
+
+    def __init__(self, prefix='sswiki'):
+        """
+        Keyword arguments:
+        prefix -- Prefix for metric names in the Prometheus output
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.reset()
+
+    def reset(self):
+        """Clear all metrics and restart the run clock"""
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}
+            self._started = time.time()
+
+    def addHook(self, hook):
+        """Add a callable that is passed an event dictionary on each update
+        """
+        self._hooks.append(hook)
+
+    def removeHook(self, hook):
+        """Remove a hook added with `addHook()`"""
+        self._hooks.remove(hook)
+
+    def _emit(self, kind, name, value, labels):
+        if not self._hooks:
+            return
+
+        event = {'type': kind,
+                 'name': name,
+                 'value': value,
+                 'labels': dict(labels),
+                 'timestamp': time.time()}
+        for hook in list(self._hooks):
+            hook(event)
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter
+
+        Keyword arguments:
+        name -- Counter name e.g. 'fetch_bytes_total'
+        value -- Amount to increment by
+        **labels -- Labels e.g. stage='vessel'
+        """
+        key = (name, _labelKey(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+        self._emit('counter', name, value, labels)
+
+    def setGauge(self, name, value, **labels):
+        """Set a gauge
+
+        Keyword arguments:
+        name -- Gauge name e.g. 'fetch_rate_per_second'
+        value -- Current value
+        **labels -- Labels
+        """
+        with self._lock:
+            self._gauges[(name, _labelKey(labels))] = value
+
+        self._emit('gauge', name, value, labels)
+
+    def observe(self, name, value, **labels):
+        """Record an observation in a histogram
+
+        Keyword arguments:
+        name -- Histogram name e.g. 'fetch_seconds'
+        value -- Observed value e.g. seconds
+        **labels -- Labels
+        """
+        key = (name, _labelKey(labels))
+        with self._lock:
+            self._histograms.setdefault(key, []).append(value)
+
+        self._emit('histogram', name, value, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Context manager recording the elapsed seconds in a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator recording the seconds taken by each call in a
+        histogram, labelled with the function name as 'func'"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, func=func.__name__, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counter(self, name, **labels):
+        """Current value of a counter; 0 if not set"""
+        with self._lock:
+            return self._counters.get((name, _labelKey(labels)), 0)
+
+    def gauge(self, name, **labels):
+        """Current value of a gauge; `None` if not set"""
+        with self._lock:
+            return self._gauges.get((name, _labelKey(labels)))
+
+    def samples(self, name, **labels):
+        """List of the observations of a histogram"""
+        with self._lock:
+            return list(self._histograms.get((name, _labelKey(labels)), []))
+
+    def report(self):
+        """Run report of all metrics
+
+        Return:
+        A dictionary with the run start time, duration and lists of counters,
+        gauges and histograms; histograms are summarized as count, sum, min,
+        max, mean, p50, p95 and p99
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            started = self._started
+
+        def summary(values):
+            return {'count': len(values),
+                    'sum': sum(values),
+                    'min': min(values),
+                    'max': max(values),
+                    'mean': sum(values) / len(values),
+                    'p50': percentile(values, 50),
+                    'p95': percentile(values, 95),
+                    'p99': percentile(values, 99)}
+
+        return {
+            'started': datetime.fromtimestamp(started, timezone.utc).
+            isoformat(),
+            'duration_seconds': time.time() - started,
+            'counters': [{'name': name, 'labels': dict(labels),
+                          'value': value}
+                         for (name, labels), value in
+                         sorted(counters.items())],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                       for (name, labels), value in sorted(gauges.items())],
+            'histograms': [{'name': name, 'labels': dict(labels),
+                            **summary(values)}
+                           for (name, labels), values in
+                           sorted(histograms.items()) if values],
+        }
+
+    def writeReport(self, path):
+        """Write the run report from `report()` as json
+
+        Keyword arguments:
+        path -- File path to write to
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def toPrometheus(self):
+        """All metrics in the Prometheus text exposition format
+
+        Return:
+        String of metrics
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((k, sorted(v))
+                                for k, v in self._histograms.items())
+
+        lines = []
+        typed = set()
+
+        def typeLine(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            name = f"{self.prefix}_{name}"
+            typeLine(name, 'counter')
+            lines.append(f"{name}{_labelText(labels)} {value}")
+
+        for (name, labels), value in gauges:
+            name = f"{self.prefix}_{name}"
+            typeLine(name, 'gauge')
+            lines.append(f"{name}{_labelText(labels)} {value}")
+
+        for (name, labels), values in histograms:
+            name = f"{self.prefix}_{name}"
+            typeLine(name, 'histogram')
+            for le in self.BUCKETS:
+                count = bisect_right(values, le)
+                lines.append(f"{name}_bucket"
+                             + f"{_labelText(labels, [('le', str(le))])} "
+                             + f"{count}")
+            lines.append(f"{name}_bucket{_labelText(labels, [('le', '+Inf')])}"
+                         + f" {len(values)}")
+            lines.append(f"{name}_sum{_labelText(labels)} {sum(values)}")
+            lines.append(f"{name}_count{_labelText(labels)} {len(values)}")
+
+        return "\n".join(lines) + "\n"
+
+    def writePrometheus(self, path):
+        """Write all metrics as a Prometheus textfile e.g. for the node
+        exporter textfile collector
+
+        Keyword arguments:
+        path -- File path to write to; written to a temporary file first then
+            renamed so partial files are never collected
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.toPrometheus())
+
+        os.replace(tmp_path, path)
+
+
+# Default metrics for the run
+METRICS = Metrics()
+
+inc = METRICS.inc
+setGauge = METRICS.setGauge
+observe = METRICS.observe
+timer = METRICS.timer
+timed = METRICS.timed
+addHook = METRICS.addHook
+removeHook = METRICS.removeHook
+report = METRICS.report
+writeReport = METRICS.writeReport
+writePrometheus = METRICS.writePrometheus
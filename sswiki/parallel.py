@@ -0,0 +1,320 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import logging
+import os
+
+import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.utils as utils
+
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Converters run on each column, in the order `sswiki.normalizeGC()` and
+# `sswiki.normalizeSH()` run them; columns are found with `utils.findDFCols()`
+GC_CONVERTERS = (('convertLinearMeasures', const.LNMES_GC_COLS),
+                 ('convertWeightMeasures', const.WTMES_GC_COLS),
+                 ('convertSpeedMeasures', const.SPMES_GC_COLS))
+SH_CONVERTERS = (('convertDates', const.DT_SH_COLS), )
+
+# Converters that need several columns together, with the columns they need
+SH_ROW_CONVERTERS = (('convertHullNo', ('Identification', 'vessel_url')),
+                     ('getFates', ('Fate', )))
+
+INDEX_KEY = '__index__'
+
+
+def packStrings(sf):
+    """Pack a pandas series of strings into a shared memory block
+
+    The block holds int64 byte offsets (one more than the number of values),
+    a validity byte per value and the utf-8 encoded strings, as per an Arrow
+    string array, so worker processes can read any slice of rows without the
+    column being pickled.
+
+    Keyword arguments:
+    sf -- A pandas series of strings and `NaN`
+
+    Return:
+    A tuple (shared memory block, spec dictionary for `unpackStrings()`);
+    the caller closes and unlinks the block when done
+    """
+    values = sf.to_numpy(dtype=object)
+    valid = np.fromiter((isinstance(v, str) for v in values), dtype=np.uint8,
+                        count=len(values))
+    encoded = [v.encode('utf-8') if ok else b'' for v, ok in
+               zip(values, valid)]
+
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    n = len(values)
+    size = offsets.nbytes + n + int(offsets[-1])
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    buf = shm.buf
+    buf[:offsets.nbytes] = offsets.tobytes()
+    buf[offsets.nbytes:offsets.nbytes + n] = valid.tobytes()
+    buf[offsets.nbytes + n:size] = b''.join(encoded)
+
+    return shm, {'name': shm.name, 'rows': n}
+
+
+def unpackStrings(spec, start=0, stop=None):
+    """Read rows of a string column packed with `packStrings()`
+
+    Keyword arguments:
+    spec -- Spec dictionary from `packStrings()`
+    start -- First row
+    stop -- Row to stop before; if None, then the last row
+
+    Return:
+    A numpy object array of strings and `NaN`
+    """
+    n = spec['rows']
+    stop = n if stop is None else stop
+
+    # Worker processes share the resource tracker of the packing process,
+    # which unlinks the block
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    try:
+        offsets = np.frombuffer(shm.buf, dtype=np.int64, count=n + 1)
+        valid = np.frombuffer(shm.buf, dtype=np.uint8, count=n,
+                              offset=offsets.nbytes)
+        data = bytes(shm.buf[offsets.nbytes + n + offsets[start]:
+                             offsets.nbytes + n + offsets[stop]])
+        base = offsets[start]
+        bounds = (offsets[start:stop + 1] - base).tolist()
+        values = np.empty(stop - start, dtype=object)
+        for i, ok in enumerate(valid[start:stop].tolist()):
+            values[i] = data[bounds[i]:bounds[i + 1]].decode('utf-8') \
+                if ok else np.nan
+        del offsets, valid
+    finally:
+        shm.close()
+
+    return values
+
+
+class SharedFrame:
+    """Data frame with its string columns and index packed into shared
+    memory for worker processes; see `packStrings()`.
+
+    Columns that are not all strings or `NaN` are kept as is and pickled
+    with the jobs that use them. Use as a context manager, or call `close()`
+    to free the shared memory.
+    """
+
+    def __init__(self, df):
+        """
+        Keyword arguments:
+        df -- A pandas data frame e.g. from `utils.loadVesselData()`
+        """
+        self._blocks = []
+        self.index_name = df.index.name
+        self.columns = list(df.columns)
+        self.specs = {}
+        self.other = {}
+
+        for key, sf in [(INDEX_KEY, df.index.to_series())] + \
+                list(df.items()):
+            if sf.map(lambda v: isinstance(v, str) or v != v).all():
+                shm, spec = packStrings(sf)
+                self._blocks.append(shm)
+                self.specs[key] = spec
+            else:
+                self.other[key] = sf.reset_index(drop=True)
+
+        self.rows = len(df)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close and unlink the shared memory"""
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def job(self, cols, start, stop):
+        """Picklable description of a slice of the frame for `readJob()`
+
+        Keyword arguments:
+        cols -- List of column names
+        start -- First row
+        stop -- Row to stop before
+        """
+        return {'index_name': self.index_name,
+                'start': start,
+                'stop': stop,
+                'specs': {c: self.specs[c] for c in [INDEX_KEY] + list(cols)
+                          if c in self.specs},
+                'other': {c: self.other[c].iloc[start:stop].to_numpy()
+                          for c in [INDEX_KEY] + list(cols)
+                          if c in self.other},
+                'cols': list(cols)}
+
+
+def readJob(job):
+    """Data frame slice described by `SharedFrame.job()`"""
+    def read(col):
+        if col in job['specs']:
+            return unpackStrings(job['specs'][col], job['start'], job['stop'])
+        return job['other'][col]
+
+    index = pd.Index(read(INDEX_KEY), name=job['index_name'])
+    return pd.DataFrame({col: read(col) for col in job['cols']},
+                        index=index, columns=job['cols'])
+
+
+def runJob(job, converters):
+    """Normalize a slice of a shared frame; run in the worker processes
+
+    Keyword arguments:
+    job -- Slice description from `SharedFrame.job()`
+    converters -- List of tuples (converter name in `sswiki.sswiki`, tuple
+        of arguments) to run in order after `utils.dfStrNormalize()`
+
+    Return:
+    The normalized pandas data frame slice
+    """
+    import sswiki.sswiki as sswiki
+
+    df = utils.dfStrNormalize(readJob(job))
+    for name, args in converters:
+        df = getattr(sswiki, name)(df, *args)
+
+    return df
+
+
+def planJobs(df, kind):
+    """Group the columns of a data frame into independent column jobs
+
+    Each column is in one job, with the converters `sswiki.normalizeGC()` or
+    `sswiki.normalizeSH()` would run on it; columns without converters are
+    grouped in one job.
+
+    Keyword arguments:
+    df -- A pandas data frame of vessel data
+    kind -- 'gc' for general characteristics or 'sh' for service history
+
+    Return:
+    A list of tuples (list of column names, list of converters for
+    `runJob()`)
+    """
+    col_converters = {col: [] for col in df.columns}
+    if kind == 'gc':
+        for name, cols in GC_CONVERTERS:
+            for col in utils.findDFCols(df, cols):
+                col_converters[col].append((name, (cols, )))
+        row_converters = ()
+    elif kind == 'sh':
+        for name, cols in SH_CONVERTERS:
+            for col in utils.findDFCols(df, cols):
+                col_converters[col].append((name, (cols, )))
+        row_converters = SH_ROW_CONVERTERS
+    else:
+        raise ValueError(f"kind must be 'gc' or 'sh', not {kind!r}")
+
+    jobs = []
+    for name, cols in row_converters:
+        if not all(col in col_converters for col in cols):
+            raise KeyError(f"{name} needs columns {list(cols)}")
+
+        jobs.append(([c for c in cols],
+                     [c for col in cols for c in col_converters.pop(col)]
+                     + [(name, ())]))
+
+    jobs = [([col], convs) for col, convs in col_converters.items() if convs] \
+        + jobs
+    rest = [col for col, convs in col_converters.items() if not convs]
+    if rest:
+        jobs.append((rest, []))
+
+    return jobs
+
+
+def partitions(rows, n):
+    """Split row positions into `n` contiguous (start, stop) ranges"""
+    n = max(1, min(n, rows))
+    bounds = np.linspace(0, rows, n + 1).astype(int)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def normalizeMany(items, workers=None, n_partitions=None, executor=None):
+    """Normalize data frames in parallel across columns and row partitions
+
+    All column jobs (see `planJobs()`) of all row partitions of all frames
+    are run in one process pool, so e.g. general characteristics and service
+    history are normalized at the same time. Results are the same as
+    `sswiki.normalizeGC()` and `sswiki.normalizeSH()`.
+
+    Keyword arguments:
+    items -- List of tuples (data frame, kind) with kind 'gc' or 'sh'
+    workers -- Number of worker processes; if None, then the CPU count
+    n_partitions -- Number of row partitions per frame; if None, then
+        `workers`
+    executor -- A `concurrent.futures` process pool executor to use; if
+        None, then one is created with `workers` processes
+
+    Return:
+    A list of normalized data frames in the order of `items`, with the
+    original columns in their original order followed by any columns added
+    by the converters
+    """
+    workers = workers or os.cpu_count() or 1
+    n_partitions = n_partitions or workers
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    shared = []
+    try:
+        pending = []
+        for df, kind in items:
+            frame = SharedFrame(df)
+            shared.append(frame)
+            jobs = planJobs(df, kind)
+            parts = partitions(len(df), n_partitions)
+            futures = [[executor.submit(runJob, frame.job(cols, start, stop),
+                                        convs)
+                        for cols, convs in jobs]
+                       for start, stop in parts]
+            pending.append((df, futures))
+            logger.info(f"Normalizing {kind} data in {len(jobs)} column jobs "
+                        + f"x {len(parts)} row partitions")
+
+        results = []
+        for df, futures in pending:
+            parts = [pd.concat([f.result() for f in part], axis=1)
+                     for part in futures]
+            out = pd.concat(parts, axis=0) if parts else df.copy()
+            added = [c for c in out.columns if c not in df.columns]
+            results.append(out[list(df.columns) + added])
+    finally:
+        for frame in shared:
+            frame.close()
+        if own_executor:
+            executor.shutdown()
+
+    return results
+
+
+def normalizeParallel(df, kind, workers=None, n_partitions=None,
+                      executor=None):
+    """Normalize a data frame in parallel; see `normalizeMany()`
+
+    Keyword arguments:
+    df -- A pandas data frame of vessel data
+    kind -- 'gc' for general characteristics or 'sh' for service history
+
+    Return:
+    The normalized pandas data frame
+    """
+    return normalizeMany([(df, kind)], workers, n_partitions, executor)[0]
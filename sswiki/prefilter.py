@@ -0,0 +1,188 @@
+import logging
+from urllib.parse import urljoin
+
+import sswiki.constants as const
+import sswiki.fetch as fetch
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+
+pd = lazy.lazyImport('pandas')
+
+logger = logging.getLogger(__name__)
+
+
+def pageInfo(api_url, titles):
+    """Get page metadata for a batch of titles from the MediaWiki query API
+
+    Queries page properties, and only the ship infobox templates and ship
+    index categories used by each page, following redirects.
+
+    Keyword arguments:
+    api_url -- The API url e.g. 'https://en.wikipedia.org/w/api.php'
+    titles -- List of up to `const.API_MAX_TITLES` page titles
+
+    Return:
+    A dictionary of title to a dictionary with keys 'title' (the title after
+    any redirect), 'redirect', 'fragment' (section of a redirect target),
+    'missing', 'disambiguation', 'ship_infobox' and 'index'. Titles are left
+    out if the query failed.
+    """
+    params = {'titles': '|'.join(titles),
+              'prop': 'pageprops|templates|categories',
+              'ppprop': 'disambiguation',
+              'tltemplates': '|'.join(const.SHIP_INFOBOX_TEMPLATES),
+              'tllimit': 'max',
+              'clcategories': '|'.join(const.SHIP_INDEX_CATEGORIES),
+              'cllimit': 'max',
+              'redirects': 1}
+
+    pages, normalized, redirects = {}, {}, {}
+    for query in fetch.queryAll(api_url, params, 'prefilter'):
+        normalized.update({n['from']: n['to']
+                           for n in query.get('normalized', [])})
+        redirects.update({r['from']: r for r in query.get('redirects', [])})
+
+        # With continuation, a page is returned again with the rest of its
+        # templates or categories
+        for page in query.get('pages', []):
+            info = pages.setdefault(page['title'],
+                                    {'missing': False,
+                                     'disambiguation': False,
+                                     'ship_infobox': False,
+                                     'index': False})
+            info['missing'] |= bool(page.get('missing')
+                                    or page.get('invalid'))
+            info['disambiguation'] |= 'disambiguation' in \
+                page.get('pageprops', {})
+            info['ship_infobox'] |= bool(page.get('templates'))
+            info['index'] |= bool(page.get('categories'))
+
+    infos = {}
+    for title in titles:
+        target = normalized.get(title, title)
+        redirect = redirects.get(target, {})
+        target = redirect.get('to', target)
+        if target in pages:
+            infos[title] = {'title': target,
+                            'redirect': bool(redirect),
+                            'fragment': redirect.get('tofragment'),
+                            **pages[target]}
+
+    return infos
+
+
+def dropReason(info):
+    """Reason to not scrape a page from its `pageInfo()`; `None` to scrape
+    it"""
+    if info['missing']:
+        return 'missing'
+    if info['disambiguation']:
+        return 'disambiguation'
+    if info['index']:
+        return 'index'
+    if not info['ship_infobox']:
+        return 'no_ship_infobox'
+
+    return None
+
+
+def prefilterVesselLinks(vls, batch_size=const.API_MAX_TITLES):
+    """Drops or re-routes vessel links that are not individual ship articles,
+    before their articles are scraped
+
+    Gets the page metadata for batches of titles; see `pageInfo()`. Missing
+    pages, disambiguation pages, ship index pages and pages without a ship
+    infobox (e.g. museums, airships) are dropped; redirects are re-routed to
+    their target, and dropped if the target is already linked. Counted in
+    the 'prefilter_pages_total' metric by action and reason, and in
+    'prefilter_saved_requests_total'; see also `recordSavings()`. Links are
+    kept if their metadata could not be queried, and a batch with a request
+    error e.g. a connection error is kept as is, counted with reason
+    'error'.
+
+    Keyword arguments:
+    vls -- A pandas data frame with columns for vessel group type, group type
+        url, and the vessel article url; see `getVesselLinks()`
+    batch_size -- Number of titles in each query
+
+    Return:
+    A pandas data frame of the links to scrape, with the same columns
+    """
+    vessels = vls.to_dict('records')
+    apis = {}
+    for vessel in vessels:
+        api_url, title = fetch.articleAPI(vessel['vessel_url'])
+        apis.setdefault(api_url, []).append((vessel, title))
+
+    kept = []
+    for api_url, items in apis.items():
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            try:
+                infos = pageInfo(api_url, list({title for _, title in batch}))
+            except fetch.requests.RequestException as e:
+                logger.warning(f"Keeping {len(batch):,.0f} vessel links as "
+                               + f"their page metadata query failed: {e}")
+                metrics.inc('prefilter_pages_total', len(batch),
+                            action='keep', reason='error')
+                kept.extend(vessel for vessel, _ in batch)
+                continue
+
+            for vessel, title in batch:
+                info = infos.get(title)
+                reason = None if info is None else dropReason(info)
+                if reason is not None:
+                    logger.debug(f"Dropping {vessel['vessel_url']}: {reason}")
+                    metrics.inc('prefilter_pages_total', action='drop',
+                                reason=reason)
+                    continue
+
+                if info is not None and info['redirect']:
+                    path = fetch.articlePath(info['title'])
+                    vessel = {**vessel, 'vessel_url': urljoin(
+                        vessel['vessel_url'], path)}
+                    metrics.inc('prefilter_pages_total', action='reroute',
+                                reason='redirect')
+                else:
+                    metrics.inc('prefilter_pages_total', action='keep',
+                                reason='ship')
+                kept.append(vessel)
+
+    kept = pd.DataFrame(kept, columns=vls.columns)
+    kept.drop_duplicates('vessel_url', inplace=True, ignore_index=True)
+
+    saved = len(vls) - len(kept)
+    metrics.inc('prefilter_saved_requests_total', saved)
+    logger.info(f"Prefilter kept {len(kept):,.0f} of {len(vls):,.0f} vessel "
+                + f"links; {saved:,.0f} article fetches saved")
+
+    return kept
+
+
+def recordSavings():
+    """Estimate the fetch and parse work saved by `prefilterVesselLinks()`,
+    after the articles are scraped
+
+    Sets the 'prefilter_saved_bytes' and 'prefilter_saved_seconds' (by
+    'kind', fetch or parse) gauges as the saved requests times the mean
+    bytes on the wire, fetch seconds and parse seconds of the vessel
+    articles that were scraped.
+    """
+    saved = metrics.METRICS.counter('prefilter_saved_requests_total')
+    fetch_seconds = metrics.METRICS.samples('fetch_seconds', stage='vessel')
+    parse_seconds = metrics.METRICS.samples('parse_seconds', stage='vessel')
+    if not fetch_seconds:
+        return
+
+    wire_bytes = metrics.METRICS.counter('fetch_wire_bytes_total',
+                                         stage='vessel')
+    metrics.setGauge('prefilter_saved_bytes',
+                     round(saved * wire_bytes / len(fetch_seconds)))
+    metrics.setGauge('prefilter_saved_seconds',
+                     round(saved * sum(fetch_seconds) / len(fetch_seconds), 3),
+                     kind='fetch')
+    if parse_seconds:
+        metrics.setGauge('prefilter_saved_seconds',
+                         round(saved * sum(parse_seconds)
+                               / len(parse_seconds), 3),
+                         kind='parse')
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+import sswiki.regex as regex
+
+# Pattern profiling is off unless enabled with `enable()` or the
+# SSWIKI_PROFILE_PATTERNS environment variable
+ENABLED = os.environ.get('SSWIKI_PROFILE_PATTERNS', '') not in ('', '0')
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+
+REPORT_COLS = ['cascade', 'pattern', 'step', 'attempts', 'wins', 'win_rate',
+               'unmatched_after', 'seconds', 'us_per_attempt', 'regex']
+
+
+def enable():
+    """Turn on pattern profiling"""
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """Turn off pattern profiling"""
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """Clear all recorded pattern statistics"""
+    with _lock:
+        _stats.clear()
+
+
+@contextmanager
+def cascade(name):
+    """Context manager naming the pattern cascade that patterns are
+    recorded against e.g. 'dates', 'fate_sunk'"""
+    previous = getattr(_local, 'cascade', None)
+    _local.cascade = name
+    try:
+        yield
+    finally:
+        _local.cascade = previous
+
+
+def record(label, regex, attempts, wins, seconds, cascade_name=None):
+    """Record the result of trying a pattern
+
+    Keyword arguments:
+    label -- Short name of the pattern e.g. 'DD MMMMMM YYYY'
+    regex -- The regex pattern string
+    attempts -- Number of rows the pattern was tried on
+    wins -- Number of rows the pattern matched
+    seconds -- Time taken
+    cascade_name -- Name of the cascade; if None, then the current
+        `cascade()` name
+    """
+    if cascade_name is None:
+        cascade_name = getattr(_local, 'cascade', None) or 'unnamed'
+
+    key = (cascade_name, label)
+    with _lock:
+        stats = _stats.setdefault(key, {'step': len(_stats), 'regex': regex,
+                                        'attempts': 0, 'wins': 0,
+                                        'seconds': 0.0})
+        stats['attempts'] += attempts
+        stats['wins'] += wins
+        stats['seconds'] += seconds
+
+
+def extract(sf, pat, flags=0, label=None):
+    """`sf.str.extract(pat, flags=flags)` with the `sswiki.regex` backend,
+    recording the pattern statistics if profiling is enabled
+
+    Keyword arguments:
+    sf -- A pandas series of strings
+    pat -- Regex pattern with named groups
+    flags -- `re` module flags
+    label -- Short name of the pattern; if None, then the pattern itself
+
+    Return:
+    A pandas data frame with a column for each group in `pat`
+    """
+    if not ENABLED:
+        return regex.extract(sf, pat, flags)
+
+    start = time.perf_counter()
+    extracted = regex.extract(sf, pat, flags)
+    seconds = time.perf_counter() - start
+
+    wins = int(extracted.notna().any(axis=1).sum())
+    record(label or pat, pat, len(sf), wins, seconds)
+
+    return extracted
+
+
+def report():
+    """Ranked report of the recorded pattern statistics
+
+    Return:
+    A pandas data frame with a row for each pattern in each cascade, ranked
+    by cumulative seconds (most expensive first). 'step' is the order the
+    pattern was first tried; 'unmatched_after' the rows left unmatched after
+    the pattern was tried.
+    """
+    import pandas as pd
+
+    with _lock:
+        rows = [{'cascade': cascade_name, 'pattern': label, **stats}
+                for (cascade_name, label), stats in _stats.items()]
+
+    df = pd.DataFrame(rows, columns=[c for c in REPORT_COLS if c not in
+                                     ('win_rate', 'unmatched_after',
+                                      'us_per_attempt')])
+    df['win_rate'] = (df['wins'] / df['attempts'].where(df['attempts'] > 0)).\
+        round(4)
+    df['unmatched_after'] = df['attempts'] - df['wins']
+    df['us_per_attempt'] = (df['seconds'] * 1e6 /
+                            df['attempts'].where(df['attempts'] > 0)).round(2)
+
+    return df[REPORT_COLS].sort_values('seconds', ascending=False).\
+        reset_index(drop=True)
+
+
+def writeReport(path):
+    """Write the ranked report from `report()`; as json if the path ends in
+    '.json', else as csv
+
+    Keyword arguments:
+    path -- File path to write to
+    """
+    df = report()
+    if str(path).endswith('.json'):
+        df.to_json(path, orient='records', indent=2)
+    else:
+        df.to_csv(path, index=False)
@@ -0,0 +1,133 @@
+from functools import lru_cache
+import logging
+import os
+import re
+
+import sswiki.lazy as lazy
+import sswiki.metrics as metrics
+
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Regex engine for the pattern cascades: 're' for Python's backtracking
+# engine, or 're2' for the linear time RE2 engine from the optional
+# google-re2 package; set with `setBackend()` or the SSWIKI_REGEX environment
+# variable. Patterns RE2 cannot compile e.g. with lookarounds fall back to
+# 're'.
+BACKENDS = ('re', 're2')
+BACKEND = os.environ.get('SSWIKI_REGEX', 're')
+
+# `re` flags RE2 supports, as inline flags
+_RE2_FLAGS = {re.IGNORECASE: 'i', re.MULTILINE: 'm', re.DOTALL: 's'}
+
+
+def re2Available():
+    """Whether the optional google-re2 package is installed"""
+    try:
+        import re2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def setBackend(name):
+    """Set the regex engine used by `compilePattern()` and `extract()`
+
+    Keyword arguments:
+    name -- 're' or 're2'; 're2' requires the google-re2 package
+    """
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Regex backend must be one of {BACKENDS}, not "
+                         + f"{name!r}")
+    if name == 're2' and not re2Available():
+        raise ImportError("The 're2' regex backend requires the google-re2 "
+                          + "package")
+
+    BACKEND = name
+    compilePattern.cache_clear()
+
+
+def _compileRE2(pat, flags):
+    """Compile with RE2; `None` if RE2 does not support the pattern"""
+    import re2
+
+    inline = ''
+    for flag, letter in _RE2_FLAGS.items():
+        if flags & flag:
+            inline += letter
+            flags &= ~flag
+
+    if flags & ~re.UNICODE:
+        return None, 'flags'
+
+    options = re2.Options()
+    options.log_errors = False
+    try:
+        return re2.compile(f"(?{inline}){pat}" if inline else pat,
+                           options), None
+    except re2.error:
+        return None, 'unsupported'
+
+
+@lru_cache(maxsize=None)
+def compilePattern(pat, flags=0):
+    """Compiled regex pattern for the current backend, compiled on first use
+    and cached
+
+    With the 're2' backend, patterns RE2 cannot compile e.g. backreferences,
+    lookarounds, or flags other than `re.IGNORECASE`, `re.MULTILINE` and
+    `re.DOTALL`, are compiled with `re` and counted in the
+    'regex_fallback_total' metric.
+
+    Keyword arguments:
+    pat -- regex pattern string
+    flags -- `re` flags
+
+    Return:
+    The compiled pattern, with `search()`, `groups` and `groupindex` as per
+    `re`
+    """
+    if BACKEND == 're2':
+        compiled, reason = _compileRE2(pat, flags)
+        if compiled is not None:
+            return compiled
+
+        metrics.inc('regex_fallback_total', reason=reason)
+        logger.debug(f"Pattern not supported by re2 ({reason}), using re: "
+                     + f"{pat}")
+
+    return re.compile(pat, flags)
+
+
+def extract(sf, pat, flags=0):
+    """`sf.str.extract(pat, flags=flags)` using the current backend
+
+    Keyword arguments:
+    sf -- A pandas series of strings
+    pat -- Regex pattern with groups
+    flags -- `re` flags
+
+    Return:
+    A pandas data frame with a column for each group in `pat`, named for
+    named groups else numbered, with `NaN` where there is no match
+    """
+    compiled = compilePattern(pat, flags)
+    if isinstance(compiled, re.Pattern):
+        return sf.str.extract(pat, flags=flags)
+
+    names = {n: name for name, n in compiled.groupindex.items()}
+    columns = [names.get(n + 1, n) for n in range(compiled.groups)]
+    empty = (np.nan, ) * compiled.groups
+
+    search = compiled.search
+    rows = []
+    for value in sf.to_numpy(dtype=object):
+        match = search(value) if isinstance(value, str) else None
+        rows.append(empty if match is None else match.groups())
+
+    df = pd.DataFrame(rows, index=sf.index, columns=columns, dtype=object)
+
+    return df.mask(df.isna())
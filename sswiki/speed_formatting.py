@@ -1,11 +1,14 @@
-import numpy as np
-import pandas as pd
 import re
 
 import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.profiling as profiling
 
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
 
-def extractSpeed(df, col_fr, col_to, pat, repl=None):
+
+def extractSpeed(df, col_fr, col_to, pat, repl=None, label=None):
     """Extract measurement based on pattern from df['col_fr'] to df['col_to']
     with changes described in replacement
 
@@ -16,6 +19,7 @@ def extractSpeed(df, col_fr, col_to, pat, repl=None):
     pat -- regex pattern of the date format to search for in df['col_fr'].
         Requires named group [xxxx]
     repl -- A string representing the replacement format. [xxxx]
+    label -- Short name of the pattern for `profiling`
 
     Return:
     A pandas series with recognized measurements [xxx]]
@@ -24,8 +28,9 @@ def extractSpeed(df, col_fr, col_to, pat, repl=None):
     num_cols = len(df.columns)
     df[col_fr] = df[col_fr].str.normalize('NFKD')
 
-    df = pd.concat([df, df.loc[df[col_to].isna(), col_fr].
-                    str.extract(pat, flags=re.IGNORECASE)], axis=1)
+    df = pd.concat([df, profiling.extract(
+        df.loc[df[col_to].isna(), col_fr], pat, re.IGNORECASE, label)],
+        axis=1)
 
     if repl == 'k':
         if 'kqd' in df.columns:
@@ -82,24 +87,25 @@ def seriesToKnots(sf):
     df = pd.DataFrame({'sf': sf})
     df['knots'] = np.nan
 
-    # dd.d knots
-    pat = start_pat + qty_pat + knots_pat + end_pat
-    repl = 'k'
-    df = extractSpeed(df, 'sf', 'knots', pat, repl)
-
-    # dd.d miles per hours
-    pat = start_pat + qty_pat + mph_pat + end_pat
-    repl = 'm'
-    df = extractSpeed(df, 'sf', 'knots', pat, repl)
-
-    # dd.d k
-    pat = start_pat + qty_pat + r'\s?k' + end_pat
-    repl = 'k'
-    df = extractSpeed(df, 'sf', 'knots', pat, repl)
-
-    # dd.d
-    pat = start_pat + qty_pat + end_pat
-    repl = 'k'
-    df = extractSpeed(df, 'sf', 'knots', pat, repl)
+    with profiling.cascade('knots'):
+        # dd.d knots
+        pat = start_pat + qty_pat + knots_pat + end_pat
+        repl = 'k'
+        df = extractSpeed(df, 'sf', 'knots', pat, repl, 'knots')
+
+        # dd.d miles per hours
+        pat = start_pat + qty_pat + mph_pat + end_pat
+        repl = 'm'
+        df = extractSpeed(df, 'sf', 'knots', pat, repl, 'mph')
+
+        # dd.d k
+        pat = start_pat + qty_pat + r'\s?k' + end_pat
+        repl = 'k'
+        df = extractSpeed(df, 'sf', 'knots', pat, repl, 'k')
+
+        # dd.d
+        pat = start_pat + qty_pat + end_pat
+        repl = 'k'
+        df = extractSpeed(df, 'sf', 'knots', pat, repl, 'number only')
 
     return df['knots']
@@ -1,24 +1,36 @@
-import pandas as pd
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+import os
 import re
-import requests
+import time
 import uuid
-
-from bs4 import BeautifulSoup
-from datetime import timedelta
-from ratelimit import limits, sleep_and_retry
+from urllib.parse import urljoin
 
 import sswiki.constants as const
-import sswiki.country_names as cnames
-import sswiki.date_formatting as dfmt
-import sswiki.hull_no_formatting as hnfmt
-import sswiki.linear_mes_formatting as lmfmt
-import sswiki.speed_formatting as spfmt
-import sswiki.weight_formatting as wfmt
+import sswiki.errorlog as errorlog
+import sswiki.fetch as fetch
+import sswiki.lazy as lazy
+import sswiki.memtrace as memtrace
+import sswiki.metrics as metrics
 import sswiki.utils as utils
+import sswiki.wikitext as wikitext
 
 import sys
 
+# Heavy dependencies and the formatting modules are loaded on first use, so
+# e.g. link discovery does not import the normalizers
+pd = lazy.lazyImport('pandas')
+bs4 = lazy.lazyImport('bs4')
+cnames = lazy.lazyImport('sswiki.country_names')
+dfmt = lazy.lazyImport('sswiki.date_formatting')
+hnfmt = lazy.lazyImport('sswiki.hull_no_formatting')
+lmfmt = lazy.lazyImport('sswiki.linear_mes_formatting')
+spfmt = lazy.lazyImport('sswiki.speed_formatting')
+wfmt = lazy.lazyImport('sswiki.weight_formatting')
+
+logger = logging.getLogger(__name__)
+
 
 def scrapeForGroupListsURLs(url):
     """Scrapes Wikipedia List of Lists article for relevant Lists articles.
@@ -40,18 +52,16 @@ def scrapeForGroupListsURLs(url):
     """
     COLUMNS = ['group_type', 'url']
 
-    response = requests.get(
-        url=url,
-    )
+    response = fetch.getURL(url, 'lists_of_lists')
 
     status = response.status_code
 
     if status != 200:
-        print(f"Error with response code {status} for url {url}\n"
-              + f"\n{response.headers}")
+        logger.error(f"Error with response code {status} for url {url}\n"
+                     + f"\n{response.headers}")
         sys.exit()
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = bs4.BeautifulSoup(response.content, 'html.parser')
 
     # Links contained in first inbox in article page
     infobox = soup.find("table", class_="infobox")
@@ -67,7 +77,7 @@ def scrapeForGroupListsURLs(url):
 
     for group_href in group_hrefs:
         new_row = pd.DataFrame(
-            [[group_href.string, const.BASE_URL + group_href['href']]],
+            [[group_href.string, urljoin(url, group_href['href'])]],
             columns=COLUMNS)
 
         group_lists = pd.concat([group_lists, new_row])
@@ -93,13 +103,13 @@ def scrapeForVesselURLs(vg, vls, pattern):
     A pandas data frame with columns for vessel group type, group type url, and
     the vessel article url
     """
-    print(f"Processing {vg['url']}")
+    logger.info(f"Processing {vg['url']}")
     vls_len_start = len(vls)
 
-    response = requests.get(url=vg['url'])
-    soup = BeautifulSoup(response.content, 'html.parser')
+    response = fetch.getURL(vg['url'], 'group_list')
+    soup = bs4.BeautifulSoup(response.content, 'html.parser')
     all_links = soup.find_all("a")
-    print(f"Found {len(all_links):,.0f} links")
+    logger.info(f"Found {len(all_links):,.0f} links")
 
     for link in all_links:
         href = link.get('href')
@@ -107,18 +117,66 @@ def scrapeForVesselURLs(vg, vls, pattern):
             vls = pd.concat([
                 vls,
                 pd.DataFrame(
-                     [[vg['group_type'], vg['url'], const.BASE_URL + href]],
+                     [[vg['group_type'], vg['url'], urljoin(vg['url'], href)]],
                      columns=const.VL_COLS)
             ])
 
     if len(vls) > 0:
-        print(f"Found {len(vls) - vls_len_start:,.0f} vessel links "
-              + f"for {vg['group_type']}")
+        logger.info(f"Found {len(vls) - vls_len_start:,.0f} vessel links "
+                    + f"for {vg['group_type']}")
 
     return vls
 
 
-def getVesselLinks(group_lists, pattern):
+def enumerateVesselURLs(vg, vls, pattern):
+    """Finds Naval vessel article links in a Wikipedia lists article with the
+    MediaWiki links API.
+
+    As per `scrapeForVesselURLs()`, but gets the titles of the articles
+    linked from the lists article, in batches with continuation, instead of
+    the html. Links to other namespaces e.g. categories are filtered by the
+    server, and links to missing articles are dropped; the links API has no
+    title prefix filter, so `pattern` is matched against the article path
+    for each title.
+
+    Keyword arguments:
+    vg -- a data frame with the list article information to scan
+        for vessel articles; data frame should contain the columns "group_type"
+        and "url"
+    vls -- a data frame to add the vessel article links to
+    pattern -- a string pattern to find in the desired vessel article link e.g.
+        "wiki/USS" for United States Navy Ships
+
+    Return:
+    A pandas data frame with columns for vessel group type, group type url, and
+    the vessel article url
+    """
+    logger.info(f"Processing {vg['url']}")
+
+    api_url, title = fetch.articleAPI(vg['url'])
+    urls = []
+    for query in fetch.queryAll(api_url,
+                                {'generator': 'links',
+                                 'titles': title,
+                                 'gplnamespace': 0,
+                                 'gpllimit': 'max'},
+                                'group_list'):
+        for page in query.get('pages', []):
+            href = fetch.articlePath(page['title'])
+            if not page.get('missing') and pattern in href:
+                urls.append(urljoin(vg['url'], href))
+
+    logger.info(f"Found {len(urls):,.0f} vessel links for {vg['group_type']}")
+
+    return pd.concat([
+        vls,
+        pd.DataFrame({'group_type': vg['group_type'],
+                      'group_type_url': vg['url'],
+                      'vessel_url': urls}, columns=const.VL_COLS)
+    ])
+
+
+def getVesselLinks(group_lists, pattern, mode='page'):
     """Get Naval vessel article links.
 
     Looks for a Wikipedia article urls that contains the given pattern; if the
@@ -130,43 +188,136 @@ def getVesselLinks(group_lists, pattern):
         and "url"
     pattern -- a string pattern to find in the desired vessel article link e.g.
         "wiki/USS" for United States Navy Ships
+    mode -- 'page' to find the links in the html of each lists article, see
+        `scrapeForVesselURLs()`, or 'api' to get them from the MediaWiki
+        links API, see `enumerateVesselURLs()`
 
     Return:
     A pandas data frame with columns for vessel group type, group type url, and
     the vessel article url
     """
     vls = pd.DataFrame(columns=const.VL_COLS)
+    findVesselURLs = enumerateVesselURLs if mode == 'api' else \
+        scrapeForVesselURLs
 
     for index, row in group_lists.iterrows():
-        vls = scrapeForVesselURLs(row, vls, pattern)
+        vls = findVesselURLs(row, vls, pattern)
 
     vls.drop_duplicates('vessel_url', inplace=True)
-    print(f"Found {len(vls):,.0f} vessel links")
+    metrics.inc('vessel_links_total', len(vls))
+    logger.info(f"Found {len(vls):,.0f} vessel links")
 
     return vls
 
 
-@ sleep_and_retry
-@ limits(calls=1, period=timedelta(microseconds=250).total_seconds())
-def scrapeVesselData(vl):
+def getLeadSection(url):
+    """Get the html of the lead section of an article, which holds the
+    infobox, from the MediaWiki parse API
+
+    Keyword arguments:
+    url -- The article url
+
+    Return:
+    String html of the lead section; raises `fetch.APIError` if the API
+    returned an error
+    """
+    api_url, title = fetch.articleAPI(url)
+    data = fetch.getAPI(api_url,
+                        {'action': 'parse',
+                         'page': title,
+                         'prop': 'text',
+                         'section': 0,
+                         'redirects': 1,
+                         'disableeditsection': 1,
+                         'disablelimitreport': 1},
+                        'vessel', raise_errors=True)
+
+    return data['parse']['text']
+
+
+def getLeadWikitext(url):
+    """Get the wikitext of the lead section of an article, which holds the
+    infobox templates, from the MediaWiki parse API
+
+    Keyword arguments:
+    url -- The article url
+
+    Return:
+    String wikitext of the lead section; raises `fetch.APIError` if the API
+    returned an error
+    """
+    api_url, title = fetch.articleAPI(url)
+    data = fetch.getAPI(api_url,
+                        {'action': 'parse',
+                         'page': title,
+                         'prop': 'wikitext',
+                         'section': 0,
+                         'redirects': 1},
+                        'vessel', raise_errors=True)
+
+    return data['parse']['wikitext']
+
+
+def scrapeVesselData(vl, mode='page', errors=None):
     """Scrapes Wikipedia article for vessel information.
 
     Keyword arguments:
     vl -- A one row pandas data frame with columns for vessel group type,
         group type url, and the vessel article url
+    mode -- 'page' to get the full rendered article, or 'lead' to get only
+        the lead section with the infobox from the MediaWiki parse API, which
+        is usually several times fewer bytes to download and parse, or
+        'wikitext' to get the wikitext of the lead section and read the
+        infobox templates with no html parsing
+    errors -- `errorlog.ErrorLog` to add an error to if the article cannot
+        be scraped
 
     Return:
     A pandas data frame with vessel data for the provided article url in vl
-    with columns 'desc' and 'data'. Will return `None` if infoxbox not found or
+    with columns 'desc' and 'data'; in 'wikitext' mode, a tuple (gc, sh) of
+    the data already split as per `wikitext.infoboxSections()`. Will return
+    `None` if the article could not be fetched, or infoxbox not found or
     unexpected shape (less than two columns).
     """
+    if errors is None:
+        errors = errorlog.ErrorLog()
 
-    response = requests.get(url=vl["vessel_url"])
-    soup = BeautifulSoup(response.content, 'html.parser')
+    try:
+        if mode == 'wikitext':
+            content = getLeadWikitext(vl["vessel_url"])
+        elif mode == 'lead':
+            content = getLeadSection(vl["vessel_url"])
+        else:
+            response = fetch.getURL(vl["vessel_url"], 'vessel')
+            if response.status_code != const.STATUS_OK:
+                errors.add(vl, 'http_status', response.status_code)
+                return None
+            content = response.content
+
+    except fetch.APIError as e:
+        category = 'http_status' if isinstance(e.code, int) else 'api_error'
+        errors.add(vl, category, e.code, e)
+        return None
+
+    except fetch.requests.RequestException as e:
+        errors.add(vl, 'network', exception=e)
+        return None
+
+    start = time.perf_counter()
+    if mode == 'wikitext':
+        sections = wikitext.infoboxSections(content)
+        if sections is None:
+            errors.add(vl, 'no_infobox')
+        metrics.observe('parse_seconds', time.perf_counter() - start,
+                        stage='vessel')
+        return sections
+
+    soup = bs4.BeautifulSoup(content, 'html.parser')
 
     infobox = soup.find("table", class_="infobox")
 
     if infobox is None:
+        errors.add(vl, 'no_infobox')
         vd = None
     else:
         try:
@@ -174,6 +325,7 @@ def scrapeVesselData(vl):
             # first table found by read_html
             vd = pd.read_html(str(infobox))[0].iloc[:, 0:2]
             if len(vd.columns) < 2:
+                errors.add(vl, 'infobox_shape')
                 vd = None
             else:
                 vd.columns = ['desc', 'data']
@@ -181,9 +333,13 @@ def scrapeVesselData(vl):
 
         except ValueError as e:
             msg = f"No data found for {vl['vessel_url']}\n{e}\nReturning None"
-            print(msg)
+            logger.warning(msg)
+            errors.add(vl, 'read_html', exception=e)
             vd = None
 
+    metrics.observe('parse_seconds', time.perf_counter() - start,
+                    stage='vessel')
+
     return vd
 
 
@@ -295,7 +451,103 @@ def cleanVesselData(vd, vl, keep_cols, country=None, debugging=None):
     return vd
 
 
-def getVesselData(vls, gcdata_csv=None, shdata_csv=None, error_csv=None):
+def collectVesselRecords(records, chunks, vd, vessel):
+    """Collects vessel data as records for `assembleVesselData()`.
+
+    Keyword arguments:
+    records -- List to append (vessel, chunk, desc, data) tuples to
+    chunks -- List to append the (vessel, chunk) tuple to
+    vd -- A two column pandas data frame with columns 'desc' for description
+        and 'data' for data.
+    vessel -- Integer position of the vessel in the vessel links data frame
+
+    Return:
+    None - `records` and `chunks` appended to in place
+    """
+    chunk = uuid.uuid4().hex
+    chunks.append((vessel, chunk))
+    records.extend((vessel, chunk, desc, data)
+                   for desc, data in zip(vd['desc'], vd['data']))
+
+
+def assembleVesselData(records, chunks, vls, keep_cols, countries=False):
+    """Assembles collected vessel data records into one row per chunk.
+
+    Bulk equivalent of `cleanVesselData()` for all chunks at once; duplicated
+    descriptions are suffixed as per `utils.incrementDFValues()`.
+
+    Keyword arguments:
+    records -- List of (vessel, chunk, desc, data) tuples from
+        `collectVesselRecords()`
+    chunks -- List of (vessel, chunk) tuples from `collectVesselRecords()`
+    vls -- A pandas data frame with columns for vessel group type,
+        group type url, and the vessel article url
+    keep_cols -- List of string column names to keep
+    countries -- If `True`, then resolve 'country' and 'debugging' columns as
+        per `getVesselData()` and drop chunks of vessels with a `cnames.DROP`
+        entry
+
+    Return:
+    A tuple (vd, dropped); vd a pandas data frame with one row per chunk and
+    index 'uuid', and dropped a list of the positions in `vls` of vessels
+    dropped
+    """
+    rd = pd.DataFrame(records, columns=['vessel', 'uuid', 'desc', 'data'])
+    vd = pd.DataFrame(chunks, columns=['vessel', 'uuid'])
+    dropped = []
+
+    if countries:
+        # If we find one of these entries, then we will ignore
+        # Usually happens were redict to a "list of lists" page occurs
+        drop_uuids = rd.loc[cnames.areDropped(rd['desc']), 'uuid']
+        dropped = vd.loc[vd['uuid'].isin(drop_uuids), 'vessel'].\
+            unique().tolist()
+        rd = rd[~rd['uuid'].isin(drop_uuids)]
+        vd = vd[~vd['uuid'].isin(drop_uuids)]
+
+        # Only get the first entry -- note potential to drop data here
+        rd_countries = cnames.resolveCountries(rd['desc'])
+        country = rd_countries.dropna().groupby(rd['uuid'], sort=False).\
+            first()
+
+        # For debugging purposes
+        ignored = rd_countries.isna() & ~rd['desc'].isin(keep_cols)
+        ignored_cnames = rd.loc[ignored, 'desc'].\
+            groupby(rd.loc[ignored, 'uuid'], sort=False).agg(list)
+
+    # Data items we are interested in; check for duplicates and increment
+    # where necessary
+    rd = rd[rd['desc'].isin(keep_cols)]
+    desc = rd['desc'].astype(str)
+    counter = rd.groupby(['uuid', desc], sort=False).cumcount().add(1)
+    rd = rd.assign(desc=desc.mask(counter > 1,
+                                  desc + "_" + counter.astype(str)))
+
+    data = rd.pivot(index='uuid', columns='desc', values='data')
+    data_cols = list(keep_cols) + \
+        [col for col in rd['desc'].unique() if col not in keep_cols]
+
+    # Add on the vessel url and group information
+    vd = vd.set_index('uuid', verify_integrity=True)
+    vd = vd.join(vls.iloc[vd['vessel']].set_index(vd.index)[
+        ['vessel_url', 'group_type', 'group_type_url']])
+
+    if countries:
+        if len(country) > 0:
+            vd['country'] = country
+        if len(ignored_cnames) > 0:
+            vd['debugging'] = ignored_cnames
+
+    vd = data.reindex(index=vd.index, columns=data_cols).\
+        join(vd.drop(columns='vessel'))
+    vd.columns.name = None
+
+    return vd, dropped
+
+
+def getVesselData(vls, gcdata_csv=None, shdata_csv=None, error_csv=None,
+                  bulk=False, workers=1, mode='page', errors=None,
+                  skip_csv=None, scrape=None):
     """Scrapes Wikipedia articles for vessel information.
 
     Keyword arguments:
@@ -307,8 +559,27 @@ def getVesselData(vls, gcdata_csv=None, shdata_csv=None, error_csv=None):
     shdata_csv -- path and file name string to write vessel service
         history data to; ignored if None; "../data/" is pre-pended to
         the provided string
-    error_csv -- path and file name string to store urls that returned an
-        error; ignored if None; "../data/" is pre-pended to the provided string
+    error_csv -- path and file name string to store the errors for urls that
+        could not be scraped, with their category, HTTP status or API error
+        code, exception, attempts and timestamp, see `errorlog.ErrorLog`;
+        ignored if None; "../data/" is pre-pended to the provided string
+    bulk -- If `True`, then collect the scraped data as records and assemble
+        the data frames once after all urls are scraped; see
+        `assembleVesselData()`
+    workers -- Number of threads scraping articles at once; requests are
+        still paced by `fetch.CONTROLLER`, so at most its concurrency are in
+        flight at once
+    mode -- 'page', 'lead' or 'wikitext'; see `scrapeVesselData()`
+    errors -- `errorlog.ErrorLog` to add the errors to; if None, then a new
+        log
+    skip_csv -- path and file name string of the permanent errors of
+        previous crawls; urls in it are not scraped, and permanent errors of
+        this crawl are added to it, except those of urls that may still have
+        rows, see `errorlog.isSkippable()`; ignored if None; "../data/" is
+        pre-pended to the provided string
+    scrape -- Callable of a vessel link returning its infobox data as per
+        `scrapeVesselData()`, or None, instead of `scrapeVesselData()` e.g.
+        for infoboxes read from a dump; `mode` is ignored
 
     Return:
     A tuple of two pandas data frame (gc, sh); gc for vessel general
@@ -316,50 +587,85 @@ def getVesselData(vls, gcdata_csv=None, shdata_csv=None, error_csv=None):
     """
     gc = pd.DataFrame(columns=const.GC_COLS)
     sh = pd.DataFrame(columns=const.SH_COLS)
-    error_urls = []
+    if errors is None:
+        errors = errorlog.ErrorLog()
+
+    if skip_csv is not None:
+        skip = errorlog.ErrorLog.read(skip_csv).select(skippable=True)
+        skipped = vls['vessel_url'].isin(skip.urls())
+        if skipped.any():
+            logger.info(f"Skipping {skipped.sum():,.0f} urls with permanent "
+                        + "errors in previous crawls")
+            metrics.inc('vessel_skipped_total', int(skipped.sum()),
+                        reason='permanent_error')
+            vls = vls[~skipped]
+
     num_urls = len(vls)
     url_no = 1
     print_int = 50
-
-    for index, vl in vls.iterrows():
+    sh_cols = frozenset(const.SH_COLS)
+    gc_records, gc_chunks, sh_records, sh_chunks = [], [], [], []
+
+    # Articles are scraped ahead by the threads, and processed in order
+    rows = (vl for _, vl in vls.iterrows())
+    if scrape is None:
+        scrape = functools.partial(scrapeVesselData, mode=mode,
+                                   errors=errors)
+    if workers > 1:
+        lazy.load(pd, bs4, fetch.requests)
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    scraped = pool.map(scrape, rows) if pool else map(scrape, rows)
+
+    for (index, vl), new_data in zip(vls.iterrows(), scraped):
         if url_no % print_int == 0 or url_no == 1 or url_no == num_urls:
-            print(f"Scraping URL {url_no:>5,.0f} of {num_urls:,.0f}; "
-                  + f"current url is for {vl['group_type']} "
-                  + f"{vl['vessel_url']}")
+            logger.info(f"Scraping URL {url_no:>5,.0f} of {num_urls:,.0f}; "
+                        + f"current url is for {vl['group_type']} "
+                        + f"{vl['vessel_url']}")
+
+        if isinstance(new_data, tuple):
+            # Already split e.g. from the wikitext infobox templates
+            gc_new, sh_new = new_data
+        elif new_data is not None:
+            gc_new = getVesselGenCharacteristics(new_data)
+            sh_new = getVesselServiceHistory(new_data)
 
-        new_data = scrapeVesselData(vl)
         if new_data is not None:
-            gc_new = getVesselGenCharacteristics(new_data)
-            if gc_new is not None:
+            if gc_new is not None and bulk:
+                collectVesselRecords(gc_records, gc_chunks, gc_new, url_no - 1)
+            elif gc_new is not None:
                 gc_new = cleanVesselData(gc_new, vl, const.GC_COLS)
                 gc = pd.concat([gc, gc_new])
             else:
-                error_urls.append(vl['vessel_url'])
+                errors.add(vl, 'no_gc')
 
-            sh_new = getVesselServiceHistory(new_data)
             for shn in sh_new:
+                if bulk:
+                    collectVesselRecords(sh_records, sh_chunks, shn,
+                                         url_no - 1)
+                    continue
+
+                descs = shn['desc'].tolist()
+
                 # If we find one of these entries, then we will ignore
                 # Usually happens were redict to a "list of lists" page occurs
-                if shn['desc'].isin(cnames.DROP).any():
-                    print(f"\nDropping {vl['vessel_url']}")
-                    error_urls.append(vl['vessel_url'])
+                if any(cnames.isDropped(desc) for desc in descs):
+                    logger.info(f"Dropping {vl['vessel_url']}")
+                    errors.add(vl, 'dropped')
                     continue
 
-                # If any entries from 'desc' match country names to be
-                # replaced, then replace them -- note potential for
-                # non-country name columns to be caught up here
-                # Finally, find location for any countries in the "IN_USE" list
-                cname_locs = shn['desc'].\
-                    replace(cnames.REPL).\
-                    isin(cnames.IN_USE)
+                # Resolve any entries from 'desc' that are country names or
+                # known aliases -- note potential for non-country name
+                # columns to be caught up here
+                countries = [cnames.resolveCountry(desc) for desc in descs]
 
                 # Only get the first entry -- note potential to drop data here
-                country_name = utils.getFirst(shn.loc[cname_locs, 'desc'].
-                                              replace(cnames.REPL).to_list())
+                country_name = utils.getFirst(
+                    [country for country in countries if country])
 
                 # For debugging purposes
-                ignored_cnames = shn.loc[~cname_locs & ~shn['desc'].
-                                         isin(const.SH_COLS), 'desc'].to_list()
+                ignored_cnames = [desc for desc, country
+                                  in zip(descs, countries)
+                                  if country is None and desc not in sh_cols]
 
                 shn = cleanVesselData(shn,
                                       vl,
@@ -369,27 +675,128 @@ def getVesselData(vls, gcdata_csv=None, shdata_csv=None, error_csv=None):
 
                 sh = pd.concat([sh, shn])
 
-        else:
-            error_urls.append(vl['vessel_url'])
-
         url_no += 1
 
+    if pool is not None:
+        pool.shutdown()
+
+    if bulk:
+        gc, _ = assembleVesselData(gc_records, gc_chunks, vls, const.GC_COLS)
+        sh, dropped = assembleVesselData(sh_records, sh_chunks, vls,
+                                         const.SH_COLS, countries=True)
+        for _, vl in vls.iloc[dropped].iterrows():
+            logger.info(f"Dropping {vl['vessel_url']}")
+            errors.add(vl, 'dropped')
+
+    metrics.inc('rows_total', len(gc), table='gc')
+    metrics.inc('rows_total', len(sh), table='sh')
+
     if len(gc) > 0 and gcdata_csv is not None:
-        gc.to_csv(const.DATA_DIR + gcdata_csv, index_label='uuid')
+        utils.writeVesselData(gc, gcdata_csv, index_label='uuid')
 
     if len(sh) > 0 and shdata_csv is not None:
-        sh.to_csv(const.DATA_DIR + shdata_csv, index_label='uuid')
+        utils.writeVesselData(sh, shdata_csv, index_label='uuid')
 
-    if len(error_urls) > 0 and error_csv is not None:
-        error_urls = pd.Series(error_urls)
-        error_urls.to_csv(const.DATA_DIR + error_csv, index=False)
-        print(f"{len(error_urls):,.0f} error urls")
+    if error_csv is not None:
+        errors.write(error_csv)
+
+    if len(errors) > 0:
+        logger.info(f"{len(errors):,.0f} error urls")
     else:
-        print("No error urls!")
+        logger.info("No error urls!")
+
+    if skip_csv is not None:
+        skip.update(errors.select(skippable=True))
+        skip.write(skip_csv)
 
     return gc, sh
 
 
+def retryErrors(error_csv, skip_csv=None, retries=3, backoff=30.0,
+                **kwargs):
+    """Scrapes again the urls with transient errors from a previous crawl.
+
+    Only network errors, and HTTP statuses and API errors from an overloaded
+    server, are retried; see `errorlog.isTransient()`. Urls that still fail
+    are retried up to `retries` times, waiting `backoff` seconds before the
+    first retry and doubling each time. The error file is rewritten without
+    the recovered urls and with the attempts counted.
+
+    Keyword arguments:
+    error_csv -- path and file name string of the errors written by
+        `getVesselData()`; "../data/" is pre-pended to the provided string
+    skip_csv -- path and file name string of the permanent errors, which
+        errors that turn out to be permanent are added to, as per
+        `getVesselData()`; ignored if None;
+        "../data/" is pre-pended to the provided string
+    retries -- Number of times to try each url
+    backoff -- Seconds to wait before the second try
+    **kwargs -- Arguments passed to `getVesselData()` e.g. `mode`, `workers`
+
+    Return:
+    A tuple of two pandas data frame (gc, sh) of the recovered vessels; see
+    `getVesselData()`
+    """
+    errors = errorlog.ErrorLog.read(error_csv)
+    pending = errors.select(transient=True)
+    logger.info(f"Retrying {len(pending):,.0f} of {len(errors):,.0f} "
+                + "error urls")
+
+    gcs, shs = [], []
+    for attempt in range(retries):
+        if len(pending) == 0:
+            break
+
+        if attempt > 0:
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+        failed = errorlog.ErrorLog()
+        gc, sh = getVesselData(pending.toFrame()[const.VL_COLS],
+                               errors=failed, **kwargs)
+        gcs.append(gc)
+        shs.append(sh)
+
+        recovered = [url for url in pending.urls() if url not in failed]
+        metrics.inc('vessel_recovered_total', len(recovered))
+        for url in recovered:
+            errors.discard(url)
+        errors.update(failed)
+
+        pending = errors.select(transient=True, urls=set(failed.urls()))
+
+    logger.info(f"{len(errors):,.0f} error urls remain")
+    errors.write(error_csv)
+
+    if skip_csv is not None:
+        skip = errorlog.ErrorLog.read(skip_csv).select(skippable=True)
+        skip.update(errors.select(skippable=True))
+        skip.write(skip_csv)
+
+    return (pd.concat([pd.DataFrame(columns=const.GC_COLS)] + gcs),
+            pd.concat([pd.DataFrame(columns=const.SH_COLS)] + shs))
+
+
+def mergeVesselData(df, data_csv, engine='c'):
+    """Merges vessel data into a data file, replacing the rows for the same
+    vessel urls e.g. to add the vessels recovered by `retryErrors()`
+
+    Keyword arguments:
+    df -- A pandas data frame of vessel data, indexed by 'uuid'
+    data_csv -- path and file name string of the data file; written if it
+        does not exist; "../data/" is pre-pended to the provided string
+    engine -- CSV parser; see `utils.loadVesselData()`
+
+    Return:
+    The number of rows written
+    """
+    if os.path.exists(const.DATA_DIR + data_csv):
+        existing = utils.loadVesselData(data_csv, engine, index_col='uuid')
+        existing = existing[~existing['vessel_url'].isin(df['vessel_url'])]
+        df = pd.concat([existing, df])
+
+    return utils.writeVesselData(df, data_csv, index_label='uuid')
+
+
 def removeHTMLArtifacts(df):
     """Remove HTML artefacts from data frame in place
 
@@ -407,6 +814,8 @@ def removeHTMLArtifacts(df):
     df.replace(pat, value=repl, regex=True, inplace=True)
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def convertDates(df, cols):
     """Converts dates to datetime string default i.e. 'YYYY-MM-DD'.
 
@@ -419,7 +828,7 @@ def convertDates(df, cols):
     """
     dff_cols = utils.findDFCols(df, cols)
     for col in dff_cols:
-        print(f"Converting dates in {col}")
+        logger.info(f"Converting dates in {col}")
         df = dfmt.findDates(df, col)
 
     date_columns = df.select_dtypes(include=['datetime64']).columns.tolist()
@@ -429,6 +838,8 @@ def convertDates(df, cols):
     return df
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def convertLinearMeasures(df, cols):
     """Converts linear measurements (length, beam, draft) to numeric metres.
 
@@ -446,6 +857,8 @@ def convertLinearMeasures(df, cols):
     return df
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def convertWeightMeasures(df, cols):
     """Converts weight measurements (displacement, tonnage) to numeric metric
     tons.
@@ -467,6 +880,8 @@ def convertWeightMeasures(df, cols):
     return df
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def convertSpeedMeasures(df, cols):
     """Converts speed measurements to numeric knots.
 
@@ -484,35 +899,37 @@ def convertSpeedMeasures(df, cols):
     return df
 
 
-def convertHullNo(df):
+@metrics.timed('converter_seconds')
+@memtrace.traced()
+def convertHullNo(df, validate=True):
     """Use vessel identification then url to extract vessel hull type
     and number
 
+    Each row is parsed once, trying `const.HULL_ID_PATS` on `Identification`
+    then `const.HULL_URL_PATS` on `vessel_url`; see
+    `hull_no_formatting.parseHullNo()`. Use
+    `hull_no_formatting.buildHullIndex()` on the result for hull type and
+    number lookups.
+
     Keyword arguments:
     df -- A panda data frame with column names `Identification`, `vessel_url`
+    validate -- If `True`, then only extract hull types registered in
+        `const.HULL_TYPES` and store `Hull_type` as categorical; hull
+        numbers with other hull types are kept without a `Hull_type`
 
     Return:
     A pandas data frame with additional columns `Hull_type` and `Hull_no`
     """
-    df['Hull_type'] = np.nan
-    df['Hull_no'] = np.nan
-
-    pats = [r'Hull (?:symbol|name|number)\:(?: )*'
-            + r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)(?:\ |$)',
-            r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)']
-    df = hnfmt.seriesToHullNo(df, 'Identification',
-                              pats, 'Hull_type', 'Hull_no')
-
-    pats = [r'\((?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)\)$',
-            r'\((?P<ht>)(?P<hn>\d{4})\)$',
-            r'\((?P<ht>[a-zA-Z]+\(\w+\))\-?(?P<hn>\d+)\)$',
-            r'(?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)$',
-            r'\((?P<ht>[a-zA-Z]+)\-?(?P<hn>\d+)\-?\w+\)$']
-    df = hnfmt.seriesToHullNo(df, 'vessel_url', pats, 'Hull_type', 'Hull_no')
+    hull_nos = hnfmt.parseHullNos(df['Identification'], df['vessel_url'],
+                                  validate)
+    df['Hull_type'] = hull_nos['Hull_type']
+    df['Hull_no'] = hull_nos['Hull_no']
 
     return df
 
 
+@metrics.timed('converter_seconds')
+@memtrace.traced()
 def getFates(df, fate_col='Fate'):
     """Extracts fate and associated date to seperate columns with datetime
     string default e.g. df[['Scrapped', 'Sunk', 'Sold']] as format
@@ -537,10 +954,100 @@ def getFates(df, fate_col='Fate'):
             }
 
     for col_name, pat in pat_fates.items():
-        print(f"Scanning and moving relevant fate and date to {col_name}")
+        logger.info("Scanning and moving relevant fate and date to "
+                    + f"{col_name}")
         df = dfmt.findDates(df, fate_col, col_name, pat)
 
     date_columns = df.select_dtypes(include=['datetime64']).columns.tolist()
     df[date_columns] = df[date_columns].astype(str)
     df[date_columns] = df[date_columns].replace('^NaT', '', regex=True)
     return df
+
+
+def normalizeGC(gc):
+    """Normalizes vessel general characteristics data i.e. unicode normal
+    form, then linear, weight and speed measures
+
+    Keyword arguments:
+    gc -- A pandas data frame of general characteristics data e.g. from
+        `getVesselData()`
+
+    Return:
+    A pandas data frame with the normalized data
+    """
+    gc = utils.dfStrNormalize(gc)
+    gc = convertLinearMeasures(gc, const.LNMES_GC_COLS)
+    gc = convertWeightMeasures(gc, const.WTMES_GC_COLS)
+    gc = convertSpeedMeasures(gc, const.SPMES_GC_COLS)
+
+    return gc
+
+
+def normalizeSH(sh):
+    """Normalizes vessel service history data i.e. unicode normal form, then
+    dates, hull type and number, and fates
+
+    Keyword arguments:
+    sh -- A pandas data frame of service history data e.g. from
+        `getVesselData()`
+
+    Return:
+    A pandas data frame with the normalized data
+    """
+    sh = utils.dfStrNormalize(sh)
+    sh = convertDates(sh, const.DT_SH_COLS)
+    sh = convertHullNo(sh)
+    sh = getFates(sh)
+
+    return sh
+
+
+def normalizeFile(data_csv, normalize, out_csv=None, chunksize=None,
+                  engine='c'):
+    """Normalizes a vessel data file, optionally in chunks of rows so memory
+    is bounded by the chunk size rather than the file size
+
+    Every chunk is read with the columns from the file header, so the
+    suffixed columns found by `utils.findDFCols()` e.g. 'Commissioned_2' are
+    the same for every chunk, even where a chunk has no values in them. The
+    output columns are fixed by the first chunk.
+
+    Keyword arguments:
+    data_csv -- File name in `const.DATA_DIR` e.g. 'sh_data.csv'
+    normalize -- Function to normalize a data frame e.g. `normalizeSH`
+    out_csv -- File name in `const.DATA_DIR` to write to; if None, then
+        `data_csv` is overwritten
+    chunksize -- Number of rows per chunk; if None, then the whole file is
+        normalized at once
+    engine -- CSV parser for `utils.loadVesselData()` when normalizing the
+        whole file at once e.g. 'pyarrow'
+
+    Return:
+    Number of rows written
+    """
+    out_path = const.DATA_DIR + (out_csv or data_csv)
+
+    if chunksize is None:
+        df = normalize(utils.loadVesselData(data_csv, engine,
+                                            index_col='uuid'))
+        return utils.writeVesselData(df, out_csv or data_csv)
+
+    # Written to a temporary file first as the input may be the output
+    tmp_path = f"{out_path}.tmp"
+    out_cols = None
+    rows = 0
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        chunks = utils.loadVesselData(data_csv, index_col='uuid',
+                                      chunksize=chunksize)
+        for chunk in chunks:
+            chunk = normalize(chunk)
+            if out_cols is None:
+                out_cols = chunk.columns
+            chunk.reindex(columns=out_cols).to_csv(f, header=rows == 0)
+
+            rows += len(chunk)
+            logger.info(f"Normalized {rows} rows of {data_csv}")
+
+    os.replace(tmp_path, out_path)
+
+    return rows
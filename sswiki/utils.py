@@ -1,7 +1,11 @@
-import pandas as pd
-import webbrowser as wb
+import calendar
 
 import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.memtrace as memtrace
+
+pd = lazy.lazyImport('pandas')
+wb = lazy.lazyImport('webbrowser')
 
 
 def incrementDFValues(df):
@@ -20,22 +24,153 @@ def incrementDFValues(df):
     return df.mask(df.duplicated(), df.add("_" + counter))
 
 
-def loadVesselData(data_csv, **kwargs):
+def loadVesselData(data_csv, engine='c', **kwargs):
     """Load vessel data file.
 
     Keyword arguments:
-    data_csv -- File path to file
+    data_csv -- File path to file; compressed files e.g. 'gc_data.csv.gz',
+        'gc_data.csv.zst' are decompressed
+    engine -- CSV parser; 'c' for the pandas parser, or 'pyarrow' for the
+        multithreaded pyarrow parser (requires the pyarrow package), which
+        gives the same data frame. The 'pyarrow' parser only supports the
+        `index_col` and `usecols` arguments; with others e.g. `chunksize`,
+        the 'c' parser is used
     **kwargs -- Arguments passed to `read_csv`
 
     Return:
     A pandas data frame with vessel data from the data file.
     """
+    if engine == 'pyarrow' and set(kwargs) <= {'index_col', 'usecols'}:
+        return readCSVArrow(const.DATA_DIR + data_csv, **kwargs)
+
     return pd.read_csv(const.DATA_DIR + data_csv,
                        dtype='str',
                        encoding='utf-8',
                        **kwargs)
 
 
+def readCSVArrow(path, index_col=None, usecols=None):
+    """Read a csv file of strings with the multithreaded pyarrow parser
+
+    Unlike `pd.read_csv(engine='pyarrow')`, values are never type inferred,
+    so the data frame is the same as from `pd.read_csv(dtype='str')` i.e.
+    strings, with `NaN` for empty values and the pandas default NA values
+    e.g. 'NA', 'null'.
+
+    Keyword arguments:
+    path -- File path
+    index_col -- Column name to use as the index
+    usecols -- List of column names to read; if None, then all
+
+    Return:
+    A pandas data frame
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    from pandas._libs.parsers import STR_NA_VALUES
+
+    names = pd.read_csv(path, nrows=0, encoding='utf-8').columns
+    if usecols is not None:
+        usecols = list(usecols)
+        if index_col is not None and index_col not in usecols:
+            usecols.append(index_col)
+
+    convert = pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in names},
+        null_values=sorted(STR_NA_VALUES),
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+        include_columns=usecols)
+
+    df = pacsv.read_csv(path, convert_options=convert).to_pandas()
+    df = df.mask(df.isna())
+    if usecols is not None:
+        df = df[[name for name in names if name in usecols]]
+
+    if index_col is not None:
+        df = df.set_index(index_col)
+
+    return df
+
+
+def _compressChunk(data, compression, level):
+    """gzip member for a chunk; members are concatenated in the file"""
+    import gzip
+
+    return gzip.compress(data, compresslevel=level, mtime=0) \
+        if compression == 'gzip' else data
+
+
+def writeVesselData(df, data_csv, chunksize=100000, workers=None,
+                    compression='infer', level=None, **kwargs):
+    """Write vessel data file in chunks of rows with worker threads.
+
+    Chunks are formatted with `to_csv`, so the csv is the same byte for byte
+    as from `df.to_csv()`. With gzip compression each chunk is compressed as
+    a gzip member in the worker threads; with zstd compression (requires the
+    zstandard package) chunks are compressed as one frame with zstd worker
+    threads. Either is read by `pd.read_csv` and standard tools.
+
+    Keyword arguments:
+    df -- A pandas data frame with vessel data
+    data_csv -- File path to write to, in `const.DATA_DIR`
+    chunksize -- Number of rows per chunk
+    workers -- Number of worker threads; if None, then the CPU count
+    compression -- 'gzip', 'zstd', None for no compression, or 'infer' to
+        use the `data_csv` extension i.e. '.gz' or '.zst'
+    level -- Compression level; if None, then 6 for gzip and 3 for zstd
+    **kwargs -- Arguments passed to `to_csv` e.g. index_label='uuid'
+
+    Return:
+    Number of rows written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from itertools import islice
+    import os
+
+    path = const.DATA_DIR + data_csv
+    if compression == 'infer':
+        compression = {'.gz': 'gzip', '.zst': 'zstd'}.get(
+            os.path.splitext(path)[1])
+    if compression not in (None, 'gzip', 'zstd'):
+        raise ValueError(f"Unsupported compression {compression!r}")
+
+    workers = workers or os.cpu_count() or 1
+    if level is None:
+        level = 3 if compression == 'zstd' else 6
+
+    def formatChunk(start):
+        data = df.iloc[start:start + chunksize].to_csv(
+            header=start == 0, **kwargs).encode('utf-8')
+        return _compressChunk(data, compression, level)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        out = f
+        if compression == 'zstd':
+            import zstandard
+            out = zstandard.ZstdCompressor(level=level, threads=workers).\
+                stream_writer(f, closefd=False)
+
+        # Bounded look ahead so memory stays within a few chunks
+        starts = iter(range(0, max(len(df), 1), chunksize))
+        pending = [pool.submit(formatChunk, start) for start in
+                   islice(starts, workers * 2)]
+        while pending:
+            out.write(pending.pop(0).result())
+            for start in starts:
+                pending.append(pool.submit(formatChunk, start))
+                break
+
+        if compression == 'zstd':
+            out.close()
+
+    os.replace(tmp_path, path)
+
+    return len(df)
+
+
 def lengthenMonth(sf):
     """Convert short month to long month.
 
@@ -43,8 +178,12 @@ def lengthenMonth(sf):
     sf -- A panda series
 
     Return:
-    A pandas series with long month names e.g. January instead of Jan.
+    A pandas series with long month names e.g. January instead of Jan or 01.
     """
+    sf = sf.str.title()
+    sf = sf.str.replace(r'^(0?[1-9]|1[0-2])$',
+                        lambda m: calendar.month_name[int(m.group(1))],
+                        regex=True)
     sf = sf.str.replace(r'^Jan$', 'January', regex=True)
     sf = sf.str.replace(r'^Feb$', 'February', regex=True)
     sf = sf.str.replace(r'^Mar$', 'March', regex=True)
@@ -60,6 +199,7 @@ def lengthenMonth(sf):
     return sf
 
 
+@memtrace.traced()
 def dfStrNormalize(df):
     """Normalize unicode normal form for all columns in the data frame
 
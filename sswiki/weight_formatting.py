@@ -1,11 +1,14 @@
-import numpy as np
-import pandas as pd
 import re
 
 import sswiki.constants as const
+import sswiki.lazy as lazy
+import sswiki.profiling as profiling
 
+np = lazy.lazyImport('numpy')
+pd = lazy.lazyImport('pandas')
 
-def extractWeight(df, col_fr, col_to, pat, repl=None):
+
+def extractWeight(df, col_fr, col_to, pat, repl=None, label=None):
     """Extract measurement based on pattern from df['col_fr'] to df['col_to']
     with changes described in replacement
 
@@ -16,6 +19,7 @@ def extractWeight(df, col_fr, col_to, pat, repl=None):
     pat -- regex pattern of the date format to search for in df['col_fr'].
         Requires named group [xxxx]
     repl -- A string representing the replacement format. [xxxx]
+    label -- Short name of the pattern for `profiling`
 
     Return:
     A pandas series with recognized measurements [xxx]]
@@ -24,8 +28,9 @@ def extractWeight(df, col_fr, col_to, pat, repl=None):
     num_cols = len(df.columns)
     df[col_fr] = df[col_fr].str.normalize('NFKD')
 
-    df = pd.concat([df, df.loc[df[col_to].isna(), col_fr].
-                    str.extract(pat, flags=re.IGNORECASE)], axis=1)
+    df = pd.concat([df, profiling.extract(
+        df.loc[df[col_to].isna(), col_fr], pat, re.IGNORECASE, label)],
+        axis=1)
 
     if repl == 'mt':
         df.loc[df['qk'].isna() & ~df['qh'].isna(), 'qk'] = 0
@@ -92,34 +97,35 @@ def seriesToTonnes(sf):
     df = pd.DataFrame({'sf': sf})
     df['tonnes'] = np.nan
 
-    # dd,ddd long tons
-    pat = start_pat + qty_pat + long_tons_pat + end_pat
-    repl = 'lt'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
-
-    # dd,ddd short tons
-    pat = start_pat + qty_pat + short_tons_pat + end_pat
-    repl = 'st'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
-
-    # dd,ddd metric tons
-    pat = start_pat + qty_pat + metric_tons_pat + end_pat
-    repl = 'mt'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
-
-    # dd,ddd >> assumed long tons
-    pat = start_pat + qty_pat + r'.+ton(?:(?:.+)|$)' + end_pat
-    repl = 'lt'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
-
-    # dd,ddd >> assumed long tons, excluding cubic ft or cubic metres
-    pat = start_pat + qty_pat + r'(?: [^cm])' + end_pat
-    repl = 'lt'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
-
-    # ddddd >> assumed long tons
-    pat = r'^' + start_pat + r'(?P<qh>\d{2,})' + end_pat + r'$'
-    repl = 'lt'
-    df = extractWeight(df, 'sf', 'tonnes', pat, repl)
+    with profiling.cascade('tonnes'):
+        # dd,ddd long tons
+        pat = start_pat + qty_pat + long_tons_pat + end_pat
+        repl = 'lt'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'long tons')
+
+        # dd,ddd short tons
+        pat = start_pat + qty_pat + short_tons_pat + end_pat
+        repl = 'st'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'short tons')
+
+        # dd,ddd metric tons
+        pat = start_pat + qty_pat + metric_tons_pat + end_pat
+        repl = 'mt'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'metric tons')
+
+        # dd,ddd >> assumed long tons
+        pat = start_pat + qty_pat + r'.+ton(?:(?:.+)|$)' + end_pat
+        repl = 'lt'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'any tons')
+
+        # dd,ddd >> assumed long tons, excluding cubic ft or cubic metres
+        pat = start_pat + qty_pat + r'(?: [^cm])' + end_pat
+        repl = 'lt'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'number and text')
+
+        # ddddd >> assumed long tons
+        pat = r'^' + start_pat + r'(?P<qh>\d{2,})' + end_pat + r'$'
+        repl = 'lt'
+        df = extractWeight(df, 'sf', 'tonnes', pat, repl, 'number only')
 
     return df['tonnes']
@@ -0,0 +1,287 @@
+import calendar
+import html
+import re
+
+import sswiki.constants as const
+import sswiki.lazy as lazy
+
+pd = lazy.lazyImport('pandas')
+
+# Innermost templates, links, and the markup removed from values
+PAT_TEMPLATE = re.compile(r'\{\{([^{}]*)\}\}')
+PAT_LINK = re.compile(r'\[\[([^\[\]]*)\]\]')
+PAT_EXT_LINK = re.compile(r'\[(?:https?:)?//[^\s\]]+(?:\s([^\]]*))?\]')
+PAT_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+PAT_REF = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>',
+                     re.DOTALL | re.IGNORECASE)
+PAT_BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+PAT_TAG = re.compile(r'</?[a-zA-Z][^>]*>')
+PAT_QUOTES = re.compile(r"'{2,}")
+PAT_SPACE = re.compile(r'\s+')
+
+# Templates of ship name prefixes e.g. {{USS|Lang|DD-399}}
+SHIP_PREFIXES = ('USS', 'USNS', 'USRC', 'USCGC', 'USAT', 'HMS', 'HMAS',
+                 'HMCS', 'HMNZS', 'SS', 'MV', 'RMS')
+
+# Units of {{convert}} as rendered e.g. 'LT' as 'long tons'
+CONVERT_UNITS = {'LT': 'long tons', 'ST': 'short tons', 'MT': 't',
+                 'knot': 'kn', 'knots': 'kn', 'feet': 'ft', 'foot': 'ft'}
+
+
+def findTemplates(text, name):
+    """Find templates by name, allowing for nested templates and links
+
+    Keyword arguments:
+    text -- Wikitext
+    name -- Template name, case insensitive for the first letter as per
+        MediaWiki e.g. 'Infobox ship career'
+
+    Return:
+    A list of the body of each template i.e. the text between the braces,
+    in order
+    """
+    pat = re.compile(r'\{\{\s*[' + name[0].upper() + name[0].lower() + ']'
+                     + re.escape(name[1:]).replace(r'\ ', r'[ _]')
+                     + r'\s*(?=[|}])')
+    bodies = []
+    for match in pat.finditer(text):
+        depth, pos = 0, match.start()
+        while pos < len(text) - 1:
+            pair = text[pos:pos + 2]
+            if pair == '{{':
+                depth += 1
+                pos += 2
+            elif pair == '}}':
+                depth -= 1
+                pos += 2
+                if depth == 0:
+                    bodies.append(text[match.start() + 2:pos - 2])
+                    break
+            else:
+                pos += 1
+
+    return bodies
+
+
+def splitParams(body):
+    """Split a template body at the '|' separators that are not inside
+    nested templates or links
+
+    Keyword arguments:
+    body -- Template body e.g. 'Infobox ship career|Ship name=Lang'
+
+    Return:
+    A tuple (name, params); params is a list of (key, value) tuples, with
+    a `None` key for positional parameters
+    """
+    parts, depth, start = [], 0, 0
+    pos = 0
+    while pos < len(body):
+        pair = body[pos:pos + 2]
+        if pair in ('{{', '[['):
+            depth += 1
+            pos += 2
+        elif pair in ('}}', ']]'):
+            depth -= 1
+            pos += 2
+        elif body[pos] == '|' and depth == 0:
+            parts.append(body[start:pos])
+            start = pos = pos + 1
+        else:
+            pos += 1
+    parts.append(body[start:])
+
+    params = []
+    for part in parts[1:]:
+        key, sep, value = part.partition('=')
+        if sep and '{{' not in key and '[[' not in key:
+            params.append((key.strip(), value.strip()))
+        else:
+            params.append((None, part.strip()))
+
+    return parts[0].strip(), params
+
+
+def formatDate(args):
+    """Date from the year, month and day arguments of date templates e.g.
+    {{start date|1942|7|23}} as '23 July 1942'"""
+    args = [a for a in args if a.strip().isdigit()][:3]
+    if not args:
+        return ''
+
+    year, month, day = (args + [None, None])[:3]
+    if month is None:
+        return year
+    month = calendar.month_name[int(month)] if 1 <= int(month) <= 12 else ''
+    if day is None:
+        return f"{month} {year}"
+
+    return f"{int(day)} {month} {year}"
+
+
+def formatConvert(args):
+    """Input quantity of {{convert}} e.g. {{convert|376|ft|6|in|m}} as
+    '376 ft 6 in'"""
+    out = []
+    pos = 0
+    while pos + 1 < len(args) and re.match(r'^[\d.,]+$', args[pos].strip()):
+        # Quantities are rendered with thousands separators e.g. '1,500'
+        whole, point, frac = args[pos].strip().replace(',', '').partition('.')
+        quantity = f"{int(whole or 0):,}{point}{frac}"
+        unit = args[pos + 1].strip()
+        out.append(f"{quantity} {CONVERT_UNITS.get(unit, unit)}")
+        pos += 2
+
+    return " ".join(out)
+
+
+def renderTemplate(body):
+    """Text of a template without nested templates, as rendered for the
+    templates common in ship infobox values; other templates e.g. references
+    are removed"""
+    name, params = splitParams(body)
+    name = name.strip().lower().replace('_', ' ')
+    args = [value for key, value in params if key is None]
+
+    if name in ('start date', 'start date and age', 'end date',
+                'end date and age', 'date'):
+        return formatDate(args)
+    if name in ('convert', 'cvt'):
+        return formatConvert(args)
+    if name in ('nowrap', 'nobr', 'small', 'big', 'nowrap begin'):
+        return " ".join(args)
+    if name in ('ubl', 'unbulleted list', 'plainlist', 'plain list',
+                'flatlist', 'hlist', 'bulleted list', 'ublist'):
+        return " ".join(a.lstrip('*').strip() for a in args)
+    if name in ('sclass', 'sclass-', 'sclass2', 'sclass2-') and len(args) > 1:
+        return f"{args[0]}-class {args[1]}"
+    if name == 'ship' and len(args) > 1:
+        return " ".join(args[:2]) + (f" ({args[2]})" if len(args) > 2 else '')
+    if name.upper() in SHIP_PREFIXES and args:
+        return f"{name.upper()} {args[0]}" + \
+            (f" ({args[1]})" if len(args) > 1 else '')
+    if name in ('flag', 'flagcountry', 'flagu', 'lang') and args:
+        return args[-1] if name == 'lang' else args[0]
+    if name == 'navy' and args:
+        return f"{args[0]} Navy"
+
+    return ''
+
+
+def renderLink(body):
+    """Text of a wiki link e.g. [[Kearny, New Jersey|Kearny]] as 'Kearny';
+    file and category links are removed"""
+    target, _, text = body.partition('|')
+    if target.split(':', 1)[0].strip().lower() in ('file', 'image',
+                                                   'category'):
+        return ''
+
+    return text if text else target
+
+
+def plainText(value):
+    """Plain text of a wikitext value, as rendered in the infobox
+
+    Keyword arguments:
+    value -- Wikitext
+
+    Return:
+    String plain text
+    """
+    value = PAT_COMMENT.sub('', value)
+    value = PAT_REF.sub('', value)
+    value = PAT_BR.sub(' ', value)
+
+    while True:
+        value, n = PAT_LINK.subn(lambda m: renderLink(m.group(1)), value)
+        if not n:
+            break
+
+    while True:
+        value, n = PAT_TEMPLATE.subn(lambda m: renderTemplate(m.group(1)),
+                                     value)
+        if not n:
+            break
+
+    value = PAT_EXT_LINK.sub(lambda m: m.group(1) or '', value)
+    value = PAT_TAG.sub('', value)
+    value = PAT_QUOTES.sub('', value)
+    value = html.unescape(value).replace('\xa0', ' ')
+
+    return PAT_SPACE.sub(' ', value).strip()
+
+
+def infoboxLabel(key):
+    """Infobox row label for a ship infobox parameter e.g. 'Ship laid down'
+    as 'Laid down'"""
+    if key in const.WIKITEXT_LABELS:
+        return const.WIKITEXT_LABELS[key]
+
+    label = key[len('Ship '):] if key.startswith('Ship ') else key
+
+    return label[:1].upper() + label[1:]
+
+
+def infoboxParams(body):
+    """Rows of the rendered parameters of an infobox template, other than
+    those in `const.WIKITEXT_SKIP` and those that are empty
+
+    Keyword arguments:
+    body -- Template body as per `findTemplates()`
+
+    Return:
+    A list of (label, plain text) tuples, in the order of the parameters
+    """
+    _, params = splitParams(body)
+    rows = []
+    for key, value in params:
+        if key is None or key in const.WIKITEXT_SKIP:
+            continue
+        value = plainText(value)
+        if value:
+            rows.append((infoboxLabel(key), value))
+
+    return rows
+
+
+def infoboxSections(text):
+    """Vessel data from the ship infobox templates in an article's wikitext,
+    split into general characteristics and service history
+
+    The split is by template, so it needs none of the heuristics of
+    `sswiki.getVesselGenCharacteristics()` and
+    `sswiki.getVesselServiceHistory()` for the rendered html infobox. Rows
+    have the labels of the rendered infobox, see `infoboxLabel()`; each
+    service history starts with a row of the 'Ship country' for
+    `country_names.resolveCountry()`, as per the html infobox header.
+
+    Keyword arguments:
+    text -- Article wikitext
+
+    Return:
+    A tuple (gc, sh) of a pandas data frame with columns 'desc' and 'data'
+    with the rows of all {{Infobox ship characteristics}}, or None if there
+    are none, and a list of such data frames, one for each
+    {{Infobox ship career}}; `None` if there is no ship infobox
+    """
+    careers = findTemplates(text, 'Infobox ship career')
+    characteristics = findTemplates(text, 'Infobox ship characteristics')
+    if not careers and not characteristics:
+        return None
+
+    gc = None
+    if characteristics:
+        gc = pd.DataFrame([row for block in characteristics
+                           for row in infoboxParams(block)],
+                          columns=['desc', 'data'])
+
+    sh = []
+    for career in careers:
+        rows = infoboxParams(career)
+        country = [data for desc, data in rows if desc == 'Country']
+        rows = [(desc, data) for desc, data in rows if desc != 'Country']
+        if country:
+            rows.insert(0, (country[0], country[0]))
+        sh.append(pd.DataFrame(rows, columns=['desc', 'data']))
+
+    return gc, sh